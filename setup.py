@@ -5,7 +5,8 @@ from catkin_pkg.python_setup import generate_distutils_setup
 d = generate_distutils_setup(
     packages=['rqt_graphprofiler', 'diarc', 'diarc.diarc', 'diarc.qt_view'],
     package_dir={'': 'src'},
-    scripts=['scripts/rqt_graphprofiler']
+    scripts=['scripts/rqt_graphprofiler', 'scripts/rqt_graphprofiler_export', 'scripts/rqt_graphprofiler_replay',
+             'scripts/rqt_graphprofiler_loadgen', 'scripts/rqt_graphprofiler_daemon']
 )
 
 setup(**d)
@@ -7,7 +7,8 @@ class Adapter(object):
     def __init__(self, model, view):
         self._topology = model
         self._view = view
-        self._view.register_adapter(self)
+        if view is not None:
+            self._view.register_adapter(self)
 
     def reorder_blocks(self, srcIdx, lowerIdx, upperIdx):
         """ Move block with index srcIdx between blocks with lowerIdx and upperIdx. 
@@ -42,6 +43,25 @@ class Adapter(object):
         """
         raise NotImplementedError()
 
+    def activate_block(self, index):
+        """ called when the block with the given index is double clicked.
+        Does nothing unless the adapter has something to show for it.
+        """
+        pass
+
+    def block_tooltip_details(self, index):
+        """ returns text appended to the tooltip of the block with the given
+        index as it is shown, for details too costly to keep in its attributes.
+        Empty unless the adapter has something to add.
+        """
+        return ""
+
+    def band_tooltip_details(self, altitude):
+        """ returns text appended to the tooltip of the band with the given
+        altitude as it is shown. See block_tooltip_details.
+        """
+        return ""
+
 #     def update_model(self):
 #         raise NotImplementedError()
 # 
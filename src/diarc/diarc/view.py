@@ -174,6 +174,38 @@ class View(object):
         """ 
         raise NotImplementedError()
 
+    def center_on_block_item(self, index):
+        """ Scrolls the View so that the BlockItem with index is in the center.
+        This only moves the visible region, it does not change the layout.
+        :param int index: index of the target BlockItem
+        :raises: ItemDoesNotExistError
+        """
+        raise NotImplementedError()
+
+    def center_on_band_item(self, altitude):
+        """ Scrolls the View so that the BandItem with altitude is in the center.
+        This only moves the visible region, it does not change the layout.
+        :param int altitude: altitude of the target BandItem
+        :raises: ItemDoesNotExistError
+        """
+        raise NotImplementedError()
+
+    def highlight_snap_items(self, snapkeys):
+        """ Visually highlights the SnapItems with the given snapkeys and removes
+        highlighting from every other SnapItem. An empty list clears all highlighting.
+        :param list snapkeys: snapkeys of the SnapItems to highlight
+        """
+        raise NotImplementedError()
+
+    def set_block_group_headers(self, headers):
+        """ Marks runs of adjacent BlockItems as groups, each with a label.
+        Replaces all previous headers; an empty list removes them. Views are
+        not required to draw groups, the default implementation ignores them.
+        :param list headers: (first index, last index, label, tooltip) tuples,
+        where first and last are the indexes of the outermost BlockItems
+        """
+        pass
+
 
 class ViewItemAttributes(object):
     """ Visual Attributes for Items 
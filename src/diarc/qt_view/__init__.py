@@ -1,2 +1,3 @@
 from .qt_view import QtView
-__all__ = ['QtView']
+from .minimap import Minimap
+__all__ = ['QtView', 'Minimap']
@@ -0,0 +1,132 @@
+""" An overview of the whole QtView scene for fast navigation of large graphs.
+
+The scene is rendered once into a low resolution pixmap which is reused for
+every repaint of the minimap. It is only regenerated after the view relinks
+its items (QtView.layout_changed) or the minimap itself is resized. Moving the
+view just redraws the viewport rectangle on top of the cached pixmap, and
+clicking or dragging inside the minimap moves the view with a single call to
+QGraphicsView.centerOn().
+"""
+import logging
+
+from PyQt5.QtCore import Qt, QRectF, QPointF, QTimer
+from PyQt5.QtGui import QPixmap, QPainter, QPen, QColor
+from PyQt5.QtWidgets import QWidget, QSizePolicy
+
+from .scene_export import scene_bounding_rect
+
+log = logging.getLogger('diarc.qt_view.minimap')
+
+
+class Minimap(QWidget):
+    """ Displays a cached thumbnail of a QtView's scene with a draggable
+    rectangle showing the region currently visible in the view.
+    """
+    def __init__(self, view, parent=None):
+        super(Minimap, self).__init__(parent)
+        self._view = view
+        self._pixmap = None
+        # Scene area covered by the pixmap and where the pixmap is drawn
+        self._scene_rect = QRectF()
+        self._target_rect = QRectF()
+        self._dragging = False
+
+        self.setSizePolicy(QSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred))
+        self.setMinimumHeight(60)
+        self.setCursor(Qt.PointingHandCursor)
+
+        # Regenerating is deferred to the event loop so that the layout
+        # request triggered by relinking is processed first.
+        self._regenerate_timer = QTimer(self)
+        self._regenerate_timer.setSingleShot(True)
+        self._regenerate_timer.setInterval(0)
+        self._regenerate_timer.timeout.connect(self._regenerate)
+
+        view.layout_changed.connect(self.invalidate)
+        # Any scroll or zoom of the view only moves the viewport rectangle
+        for scrollbar in [view.horizontalScrollBar(), view.verticalScrollBar()]:
+            scrollbar.valueChanged.connect(self.update)
+            scrollbar.rangeChanged.connect(self.update)
+
+    def invalidate(self):
+        """ Marks the cached pixmap as outdated """
+        self._regenerate_timer.start()
+
+    def _regenerate(self):
+        """ Renders the whole scene into the cached pixmap """
+        if self.width() <= 0 or self.height() <= 0:
+            return
+        layout = self._view.layout_manager.layout()
+        if layout is not None:
+            layout.activate()
+        self._scene_rect = scene_bounding_rect(self._view.scene())
+        if self._scene_rect.isEmpty():
+            self._pixmap = None
+            self.update()
+            return
+        # Fit the scene into the widget while keeping its aspect ratio
+        scale = min(self.width() / self._scene_rect.width(),
+                    self.height() / self._scene_rect.height())
+        width = max(1, int(self._scene_rect.width() * scale))
+        height = max(1, int(self._scene_rect.height() * scale))
+        self._target_rect = QRectF((self.width() - width) / 2.0, (self.height() - height) / 2.0, width, height)
+        self._pixmap = QPixmap(width, height)
+        self._pixmap.fill(Qt.white)
+        painter = QPainter(self._pixmap)
+        self._view.scene().render(painter, QRectF(0, 0, width, height), self._scene_rect)
+        painter.end()
+        log.debug("Regenerated %dx%d minimap" % (width, height))
+        self.update()
+
+    def _scene_to_minimap(self, rect):
+        """ Maps a rectangle in scene coordinates to widget coordinates """
+        sx = self._target_rect.width() / self._scene_rect.width()
+        sy = self._target_rect.height() / self._scene_rect.height()
+        return QRectF(self._target_rect.x() + (rect.x() - self._scene_rect.x()) * sx,
+                      self._target_rect.y() + (rect.y() - self._scene_rect.y()) * sy,
+                      rect.width() * sx,
+                      rect.height() * sy)
+
+    def _minimap_to_scene(self, point):
+        """ Maps a point in widget coordinates to scene coordinates """
+        sx = self._scene_rect.width() / self._target_rect.width()
+        sy = self._scene_rect.height() / self._target_rect.height()
+        return QPointF(self._scene_rect.x() + (point.x() - self._target_rect.x()) * sx,
+                       self._scene_rect.y() + (point.y() - self._target_rect.y()) * sy)
+
+    def resizeEvent(self, event):
+        super(Minimap, self).resizeEvent(event)
+        self.invalidate()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("lightGray"))
+        if self._pixmap is None:
+            painter.end()
+            return
+        painter.drawPixmap(self._target_rect.topLeft(), self._pixmap)
+        # Outline the part of the scene visible in the view
+        visible = self._view.mapToScene(self._view.viewport().rect()).boundingRect()
+        pen = QPen(QColor("red"))
+        pen.setWidth(2)
+        painter.setPen(pen)
+        painter.setBrush(Qt.NoBrush)
+        painter.drawRect(self._scene_to_minimap(visible))
+        painter.end()
+
+    def _jump_to(self, point):
+        if self._pixmap is None:
+            return
+        self._view.centerOn(self._minimap_to_scene(point))
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._dragging = True
+            self._jump_to(event.pos())
+
+    def mouseMoveEvent(self, event):
+        if self._dragging:
+            self._jump_to(event.pos())
+
+    def mouseReleaseEvent(self, event):
+        self._dragging = False
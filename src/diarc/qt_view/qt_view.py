@@ -321,8 +321,9 @@ class BandItem(SpacerContainer.Item, QtBandItemAttributes):
         self._adapter.bring_band_to_front(self.altitude)
 
     def hoverEnterEvent(self, event):
-        if self.tooltip_text:
-            QToolTip.showText(event.screenPos(),self.tooltip_text)
+        text = (self.tooltip_text or "") + self._adapter.band_tooltip_details(self.altitude)
+        if text:
+            QToolTip.showText(event.screenPos(),text)
 
     def hoverLeaveEvent(self, event):
         QToolTip.hideText()
@@ -573,6 +574,13 @@ class BlockItem(SpacerContainer.Item, QtBlockItemAttributes):
     def mousePressEvent(self, event):
         pass
 
+    def mouseDoubleClickEvent(self, event):
+        """ Lets the adapter act on the block once this event is handled, as
+        doing so may remove this BlockItem """
+        adapter = self._adapter
+        index = self.block_index
+        QTimer.singleShot(0, lambda: adapter.activate_block(index))
+
     def mouseMoveEvent(self, event):
         """ Creates a drag event with the block information """
         if event.buttons() != Qt.LeftButton:
@@ -615,8 +623,10 @@ class BlockItem(SpacerContainer.Item, QtBlockItemAttributes):
             self.blockItem = None
 
         def hoverEnterEvent(self, event):
-            if self.blockItem.tooltip_text:
-                QToolTip.showText(event.screenPos(),self.blockItem.tooltip_text)
+            blockItem = self.blockItem
+            text = (blockItem.tooltip_text or "") + blockItem._adapter.block_tooltip_details(blockItem.block_index)
+            if text:
+                QToolTip.showText(event.screenPos(),text)
 
         def hoverLeaveEvent(self, event):
             QToolTip.hideText()
@@ -847,6 +857,11 @@ class SnapItem(SpacerContainer.Item, QtSnapItemAttributes):
         # the band is being used - populated by the adapter
         self.posBandItem = None
         self.negBandItem = None
+        # Set when the snap is the target of a search
+        self.highlighted = False
+        # Drawing resources, rebuilt only when the geometry or attributes change
+        self._label_path = None
+        self._update_colors()
         super(SnapItem,self).__init__(parent,self.container)
 
         # Qt Properties
@@ -890,12 +905,41 @@ class SnapItem(SpacerContainer.Item, QtSnapItemAttributes):
         typecheck(attrs, SnapItemAttributes, "attrs")
         self.copy_attributes(attrs)
         self.set_width(attrs.width)
+        self._update_colors()
+        self._label_path = None
         self.update(self.rect())
 
+    def _update_colors(self):
+        self._fill_brush = QBrush(self.bgcolor)
+        self._border_pen = QPen(self.border_color)
+        self._border_pen.setWidth(self.border_width)
+        self._label_brush = QBrush(self.label_color)
+
     def set_width(self, width):
         self.width = width
         self.setPreferredWidth(width)
 
+    def resizeEvent(self, event):
+        super(SnapItem, self).resizeEvent(event)
+        self._label_path = None
+
+    def _build_label_path(self):
+        """ Lays out the label text rotated by -90 degrees, centered vertically """
+        path = QPainterPath()
+        if self.label:
+            rect = self.rect()
+            fm = QFontMetrics(self.font())
+            elided = fm.elidedText(self.label, Qt.ElideRight, rect.height())
+            twidth = fm.width(elided)
+            path.addText(-twidth-(rect.height()-twidth)/2, rect.width()-2, self.font(), elided)
+            path = QTransform().rotate(-90).map(path)
+        return path
+
+    def set_highlighted(self, highlighted):
+        if highlighted != self.highlighted:
+            self.highlighted = highlighted
+            self.update(self.rect())
+
     def link(self):
         super(SnapItem, self).link()
         l = self.parent.layout()
@@ -910,9 +954,7 @@ class SnapItem(SpacerContainer.Item, QtSnapItemAttributes):
             l.addAnchor(self.posBandItem, Qt.AnchorBottom, self.upLink, Qt.AnchorTop)
             l.addAnchor(self, Qt.AnchorLeft, self.upLink, Qt.AnchorLeft)
             l.addAnchor(self, Qt.AnchorRight, self.upLink, Qt.AnchorRight)
-            self.upLink.bgcolor = self.posBandItem.bgcolor
-            self.upLink.border_color = self.posBandItem.border_color
-            self.upLink.label_color = self.posBandItem.label_color
+            self.upLink.set_band_attributes(self.posBandItem)
         else:
             self.upLink.setVisible(False)
             self.upLink.setParent(None)
@@ -924,9 +966,7 @@ class SnapItem(SpacerContainer.Item, QtSnapItemAttributes):
             l.addAnchor(self.negBandItem, Qt.AnchorTop, self.downLink, Qt.AnchorBottom)
             l.addAnchor(self, Qt.AnchorLeft, self.downLink, Qt.AnchorLeft)
             l.addAnchor(self, Qt.AnchorRight, self.downLink, Qt.AnchorRight)
-            self.downLink.bgcolor = self.negBandItem.bgcolor
-            self.downLink.border_color = self.negBandItem.border_color
-            self.downLink.label_color = self.negBandItem.label_color
+            self.downLink.set_band_attributes(self.negBandItem)
         else:
             self.downLink.setVisible(False)
             self.downLink.setParent(None)
@@ -953,31 +993,25 @@ class SnapItem(SpacerContainer.Item, QtSnapItemAttributes):
             drag.exec_(Qt.CopyAction | Qt.MoveAction)
 
     def paint(self, painter, option, widget):
-        # Paint background
-        brush = QBrush()
-        brush.setStyle(Qt.SolidPattern)
-        brush.setColor(self.bgcolor)
-        painter.fillRect(self.rect(),brush)
-        # Paint border
-        border_pen = QPen()
-        border_pen.setBrush(self.border_color)
-        border_pen.setStyle(Qt.SolidLine)
-        border_pen.setWidth(self.border_width)
-        painter.setPen(border_pen)
-        painter.drawRect(self.rect())
-        rect = self.geometry()
-        painter.setPen(self.label_color)
+        if self._label_path is None:
+            self._label_path = self._build_label_path()
+        rect = self.rect()
+        # Paint background and border
+        painter.fillRect(rect, self._fill_brush)
+        painter.setPen(self._border_pen)
+        painter.drawRect(rect)
+        if self.highlighted:
+            highlight_pen = QPen(QColor("yellow"))
+            highlight_pen.setWidth(3)
+            painter.setPen(highlight_pen)
+            painter.drawRect(rect.adjusted(1, 1, -1, -1))
         if self.draw_debug:
+            painter.setPen(self.label_color)
             if self.posBandItem:
                 painter.drawText(6,12,str(self.posBandItem.altitude))
             if self.negBandItem:
                 painter.drawText(3,rect.height()-3,str(self.negBandItem.altitude))
-#         painter.drawText(2,rect.height()/2+4,self.label)
-        painter.rotate(-90)
-        fm = painter.fontMetrics()
-        elided = fm.elidedText(self.label, Qt.ElideRight, rect.height())
-        twidth = fm.width(elided)
-        painter.drawText(-twidth-(rect.height()-twidth)/2,rect.width()-2,elided)
+        painter.fillPath(self._label_path, self._label_brush)
 
 
 class SnapBandLink(QGraphicsWidget, QtBandItemAttributes):
@@ -994,42 +1028,120 @@ class SnapBandLink(QGraphicsWidget, QtBandItemAttributes):
         self._is_uplink = is_uplink
         self._is_source = is_source
 
- 
-    def paint(self,painter,option,widget):
-        brush = QBrush()
-        brush.setStyle(Qt.SolidPattern)
-        brush.setColor(self.bgcolor)
-        painter.fillRect(self.rect(),brush)
-        pen = QPen()
-        pen.setBrush(self.border_color)
-        pen.setStyle(Qt.DashLine)
+        # Drawing resources. The arrow is rebuilt when the geometry changes and
+        # the pens and brushes when the colors change, so paint() only replays them.
+        self._arrow_path = None
+        self._update_colors()
+
+    def set_band_attributes(self, band_item):
+        """ Copies the colors of the BandItem this link attaches to """
+        self.bgcolor = band_item.bgcolor
+        self.border_color = band_item.border_color
+        self.label_color = band_item.label_color
+        self._update_colors()
+        self.update()
+
+    def _update_colors(self):
+        self._fill_brush = QBrush(self.bgcolor)
+        self._border_pen = QPen(self.border_color)
+        self._border_pen.setStyle(Qt.DashLine)
+        self._arrow_brush = QBrush(self.label_color)
+
+    def resizeEvent(self, event):
+        super(SnapBandLink, self).resizeEvent(event)
+        self._arrow_path = None
+
+    def _build_arrow_path(self):
         rect = self.rect()
-        painter.setPen(pen)
-        painter.drawRect(rect)
-        # Create arrows
         arrow_scale = 0.5
         arrow_width = rect.width()*arrow_scale
         arrow_height = arrow_width * 0.8
         arrow_margin = (rect.width()-arrow_width)/2.0
 
-        brush.setColor(self.label_color)
-        painter.setPen(Qt.NoPen)
-        painter.setBrush(brush)
-        arrow = None
         # Determine which direction to draw arrow
         if (self._is_uplink and self._is_source) or (not self._is_uplink and not self._is_source):
             # Draw pointing up
-            arrow = QPolygon([QPoint(0,arrow_height), QPoint(arrow_width,arrow_height), QPoint(arrow_width/2.0,0)])
+            arrow = QPolygonF([QPointF(0,arrow_height), QPointF(arrow_width,arrow_height), QPointF(arrow_width/2.0,0)])
         else:
             # Draw pointing down
-            arrow = QPolygon([QPoint(0,0), QPoint(arrow_width,0), QPoint(arrow_width/2.0,arrow_height)])
+            arrow = QPolygonF([QPointF(0,0), QPointF(arrow_width,0), QPointF(arrow_width/2.0,arrow_height)])
 
         # Determine which side to draw arrow on
         if self._is_uplink:
             arrow.translate(rect.x()+arrow_margin,rect.y()+rect.height()-arrow_height-arrow_margin)
         else:
             arrow.translate(rect.x()+arrow_margin,rect.y()+arrow_margin)
-        painter.drawPolygon(arrow)
+        path = QPainterPath()
+        path.addPolygon(arrow)
+        path.closeSubpath()
+        return path
+
+    def paint(self,painter,option,widget):
+        if self._arrow_path is None:
+            self._arrow_path = self._build_arrow_path()
+        rect = self.rect()
+        painter.fillRect(rect, self._fill_brush)
+        painter.setPen(self._border_pen)
+        painter.drawRect(rect)
+        painter.fillPath(self._arrow_path, self._arrow_brush)
+
+class BlockGroupHeader(QGraphicsWidget):
+    """ Outlines a run of adjacent BlockItems and labels it. It is not part of
+    the layout, LayoutManagerWidget places it around the blocks once they have
+    been laid out. """
+    MARGIN = 3
+
+    def __init__(self, parent, first_index, last_index, label, tooltip):
+        super(BlockGroupHeader, self).__init__(parent=parent)
+        self.first_index = first_index
+        self.last_index = last_index
+        self.label = label
+        self.setToolTip(tooltip)
+        self.setZValue(1)
+
+    def set_header(self, first_index, last_index, label, tooltip):
+        """ Changes the blocks covered, label and tooltip.
+        :returns: True if the header must be placed again
+        """
+        moved = (first_index, last_index) != (self.first_index, self.last_index)
+        self.first_index = first_index
+        self.last_index = last_index
+        if label != self.label:
+            self.label = label
+            self.update()
+        if tooltip != self.toolTip():
+            self.setToolTip(tooltip)
+        return moved
+
+    def place(self, block_items):
+        """ Covers the BlockItems first_index to last_index """
+        first = block_items.get(self.first_index)
+        last = block_items.get(self.last_index)
+        if first is None or last is None:
+            self.hide()
+            return
+        rect = self.parentItem().mapRectFromItem(first, first.rect())
+        rect = rect.united(self.parentItem().mapRectFromItem(last, last.rect()))
+        self.setGeometry(rect.adjusted(-self.MARGIN, -self.MARGIN, self.MARGIN, self.MARGIN))
+        self.show()
+
+    def paint(self, painter, option, widget):
+        pen = QPen(Qt.darkBlue)
+        pen.setStyle(Qt.DashLine)
+        pen.setWidth(2)
+        painter.setPen(pen)
+        painter.setBrush(Qt.NoBrush)
+        painter.drawRect(self.rect())
+        # Label in a tab on the top left corner
+        metrics = QFontMetrics(painter.font())
+        tab = QRectF(self.rect().left(), self.rect().top(),
+                     min(metrics.width(self.label) + 8, self.rect().width()), metrics.height() + 2)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(Qt.darkBlue)
+        painter.drawRect(tab)
+        painter.setPen(Qt.white)
+        painter.drawText(tab, Qt.AlignCenter, self.label)
+
 
 class LayoutManagerWidget(QGraphicsWidget):
     """ Holds the actual qt anchoredlayout and top level SpacerContainers """
@@ -1046,6 +1158,14 @@ class LayoutManagerWidget(QGraphicsWidget):
         self._block_items = TypedDict(int,BlockItem)  # index    #TypedList(BlockItem)
         self._band_items = TypedDict(int,BandItem)    # altitude    #TypedList(BandItem)
         self._snap_items = TypedDict(str,SnapItem)  # snapkey  #TypedList(SnapItem)
+        self._group_headers = list()
+
+        # Group headers are placed once the layout requested by relinking has
+        # been processed, like the Minimap regenerates its thumbnail
+        self._place_headers_timer = QTimer(self)
+        self._place_headers_timer.setSingleShot(True)
+        self._place_headers_timer.setInterval(0)
+        self._place_headers_timer.timeout.connect(self.place_group_headers)
 
     def add_block_item(self, index):
         log.debug("... Adding BlockItem %d"%index)
@@ -1162,6 +1282,36 @@ class LayoutManagerWidget(QGraphicsWidget):
         snapkey = str(snapkey)
         self._snap_items[snapkey].set_attributes(attributes)
 
+    def highlight_snap_items(self, snapkeys):
+        """ Highlights only the SnapItems whose snapkeys are listed. This only
+        repaints the affected items, it does not relink the layout. """
+        snapkeys = set([str(snapkey) for snapkey in snapkeys])
+        for snapkey, item in self._snap_items.items():
+            item.set_highlighted(snapkey in snapkeys)
+
+    def set_block_group_headers(self, headers):
+        """ Updates the existing header items in place, only creating or
+        removing the difference in number, and places them only if needed """
+        for header in self._group_headers[len(headers):]:
+            header.setParentItem(None)
+            if header.scene() is not None:
+                header.scene().removeItem(header)
+        del self._group_headers[len(headers):]
+        place = False
+        for i, (first, last, label, tooltip) in enumerate(headers):
+            if i < len(self._group_headers):
+                place |= self._group_headers[i].set_header(first, last, label, tooltip)
+            else:
+                self._group_headers.append(BlockGroupHeader(self, first, last, label, tooltip))
+                place = True
+        if place:
+            self._place_headers_timer.start()
+
+    def place_group_headers(self):
+        """ Moves the group headers around their blocks' current geometry """
+        for header in self._group_headers:
+            header.place(self._block_items)
+
     def view(self):
         return self._view
 
@@ -1195,6 +1345,9 @@ class LayoutManagerWidget(QGraphicsWidget):
         for item in self._snap_items.values():
             item.link()
 
+        if len(self._group_headers) > 0:
+            self._place_headers_timer.start()
+
         log.debug("*** Finished Linking ***\n")
         sys.stdout.flush()
 
@@ -1219,6 +1372,11 @@ class QtView(QGraphicsView, View):
     # the call happens from the correct thread.
     __update_view_signal = Signal()
 
+    # Emitted after the items in the scene have been relinked, meaning the
+    # geometry of the scene is about to change. Widgets that cache a rendering
+    # of the scene should regenerate it when they see this.
+    layout_changed = Signal()
+
     __add_block_item_signal = Signal(int)
     __remove_block_item_signal = Signal(int)
     __set_block_item_settings_signal = Signal(int, object, object)
@@ -1234,6 +1392,11 @@ class QtView(QGraphicsView, View):
     __set_snap_item_settings_signal = Signal(str, object, object, object, object)
     __set_snap_item_attributes_signal = Signal(str, SnapItemAttributes)
 
+    __center_on_block_item_signal = Signal(int)
+    __center_on_band_item_signal = Signal(int)
+    __highlight_snap_items_signal = Signal(object)
+    __set_block_group_headers_signal = Signal(object)
+
     def __init__(self):
         super(QtView, self).__init__(None)
         View.__init__(self)
@@ -1251,6 +1414,7 @@ class QtView(QGraphicsView, View):
 
         # Hook up the signals and slots
         self.__update_view_signal.connect(self.layout_manager.link)
+        self.__update_view_signal.connect(self.layout_changed)
         self.__add_block_item_signal.connect(self.layout_manager.add_block_item)
         self.__remove_block_item_signal.connect(self.layout_manager.remove_block_item)
         self.__set_block_item_settings_signal.connect(self.layout_manager.set_block_item_settings)
@@ -1263,6 +1427,10 @@ class QtView(QGraphicsView, View):
         self.__remove_snap_item_signal.connect(self.layout_manager.remove_snap_item)
         self.__set_snap_item_settings_signal.connect(self.layout_manager.set_snap_item_settings)
         self.__set_snap_item_attributes_signal.connect(self.layout_manager.set_snap_item_attributes)
+        self.__center_on_block_item_signal.connect(self.__center_on_block_item)
+        self.__center_on_band_item_signal.connect(self.__center_on_band_item)
+        self.__highlight_snap_items_signal.connect(self.layout_manager.highlight_snap_items)
+        self.__set_block_group_headers_signal.connect(self.layout_manager.set_block_group_headers)
         self.resize(1024,768)
         #QColor.setAllowX11ColorNames(True)
         #if not QColor.allowX11ColorNames():
@@ -1321,6 +1489,24 @@ class QtView(QGraphicsView, View):
     def set_snap_item_attributes(self, snapkey, attributes):
         self.__set_snap_item_attributes_signal.emit(snapkey, attributes)
 
+    def center_on_block_item(self, index):
+        self.__center_on_block_item_signal.emit(index)
+
+    def center_on_band_item(self, altitude):
+        self.__center_on_band_item_signal.emit(altitude)
+
+    def highlight_snap_items(self, snapkeys):
+        self.__highlight_snap_items_signal.emit(list(snapkeys))
+
+    def set_block_group_headers(self, headers):
+        self.__set_block_group_headers_signal.emit(list(headers))
+
+    def __center_on_block_item(self, index):
+        self.centerOn(self.layout_manager.get_block_item(index))
+
+    def __center_on_band_item(self, altitude):
+        self.centerOn(self.layout_manager.get_band_item(altitude))
+
     def wheelEvent(self,event):
         """ Implements scrollwheel zooming """
         self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
@@ -0,0 +1,119 @@
+""" Exports the complete contents of a QtView scene to image files.
+
+Unlike QWidget.render(), which only captures what is currently visible in the
+viewport, these functions render the bounding rectangle of every item in the
+scene. SVG output is streamed to disk by QSvgGenerator. PNG output is rendered
+one tile at a time, so memory use is bounded by the tile size rather than by
+the size of the graph.
+
+These functions do not require a visible window and work with the 'offscreen'
+Qt platform plugin (QT_QPA_PLATFORM=offscreen).
+"""
+import os
+import math
+import logging
+
+from PyQt5.QtCore import Qt, QRectF, QSize, QRect
+from PyQt5.QtGui import QImage, QPainter, QColor
+from PyQt5.QtWidgets import QApplication
+from PyQt5 import QtSvg
+
+log = logging.getLogger('diarc.qt_view.scene_export')
+
+
+def settle_layout(view):
+    """ Forces any pending layout work in the view to finish so that the scene
+    geometry is final before it is rendered.
+    :param QtView view: the view whose scene will be exported
+    """
+    QApplication.processEvents()
+    layout = view.layout_manager.layout()
+    if layout is not None:
+        layout.activate()
+    QApplication.processEvents()
+
+
+def scene_bounding_rect(scene, margin=10):
+    """ Returns the bounding rectangle of all items in the scene, grown by margin
+    pixels on every side.
+    :param QGraphicsScene scene: the scene to measure
+    :param int margin: padding to add around the items
+    :rtype: QRectF
+    """
+    rect = scene.itemsBoundingRect()
+    return rect.adjusted(-margin, -margin, margin, margin)
+
+
+def export_svg(scene, path, title=None, margin=10):
+    """ Renders the whole scene into an SVG file.
+    :param QGraphicsScene scene: the scene to render
+    :param str path: destination file name
+    :param str title: optional title stored in the SVG document
+    :param int margin: padding around the scene items, in pixels
+    :returns: the rectangle of the scene that was rendered
+    """
+    source = scene_bounding_rect(scene, margin)
+    width = int(math.ceil(source.width()))
+    height = int(math.ceil(source.height()))
+    generator = QtSvg.QSvgGenerator()
+    generator.setFileName(path)
+    generator.setSize(QSize(width, height))
+    generator.setViewBox(QRect(0, 0, width, height))
+    if title:
+        generator.setTitle(title)
+    painter = QPainter()
+    painter.begin(generator)
+    scene.render(painter, QRectF(0, 0, width, height), source)
+    painter.end()
+    log.debug("Exported %dx%d scene to %s" % (width, height, path))
+    return source
+
+
+def export_png(scene, path, tile_size=4096, scale=1.0, margin=10, background=Qt.white):
+    """ Renders the whole scene into one or more PNG files.
+    If the scaled scene fits within a single tile it is written to path.
+    Otherwise the image is split into a grid of tiles, each no larger than
+    tile_size x tile_size, named <path>_r<row>_c<col>.png. Only one tile is
+    held in memory at a time.
+    :param QGraphicsScene scene: the scene to render
+    :param str path: destination file name
+    :param int tile_size: maximum edge length, in pixels, of an output image
+    :param float scale: scale factor from scene units to pixels
+    :param int margin: padding around the scene items, in scene units
+    :param background: fill color for the image background
+    :returns: list of the file names written
+    """
+    source = scene_bounding_rect(scene, margin)
+    width = int(math.ceil(source.width() * scale))
+    height = int(math.ceil(source.height() * scale))
+    cols = max(1, int(math.ceil(float(width) / tile_size)))
+    rows = max(1, int(math.ceil(float(height) / tile_size)))
+
+    base, ext = os.path.splitext(path)
+    ext = ext or ".png"
+    written = list()
+    for row in range(rows):
+        for col in range(cols):
+            tile_w = min(tile_size, width - col * tile_size)
+            tile_h = min(tile_size, height - row * tile_size)
+            image = QImage(tile_w, tile_h, QImage.Format_ARGB32)
+            image.fill(QColor(background))
+            # The piece of the scene that lands on this tile
+            tile_source = QRectF(source.x() + col * tile_size / scale,
+                                 source.y() + row * tile_size / scale,
+                                 tile_w / scale,
+                                 tile_h / scale)
+            painter = QPainter()
+            painter.begin(image)
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setRenderHint(QPainter.TextAntialiasing)
+            scene.render(painter, QRectF(0, 0, tile_w, tile_h), tile_source, Qt.IgnoreAspectRatio)
+            painter.end()
+            filename = path if rows == cols == 1 else "%s_r%d_c%d%s" % (base, row, col, ext)
+            if not image.save(filename, "PNG"):
+                raise IOError("Unable to write %s" % filename)
+            written.append(filename)
+            # Release the tile before rendering the next one
+            del image
+    log.debug("Exported %dx%d scene to %d PNG tile(s)" % (width, height, len(written)))
+    return written
@@ -35,6 +35,65 @@ def qtview(args):
     view.raise_()
     sys.exit(app.exec_())
 
+def paintbench(args):
+    """ Microbenchmark of scene painting.
+    Usage: ./run.py paintbench [repaints] [vertices] [edges]
+    Builds a random topology, lays it out once and then repaints the whole
+    scene into a QImage the requested number of times.
+    """
+    import os
+    import random
+    import time
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtCore import Qt, QRectF
+    from PyQt5.QtGui import QImage, QPainter
+    from PyQt5.QtWidgets import QApplication
+    from diarc import topology
+    from diarc import base_adapter
+    from qt_view import qt_view
+    from qt_view import scene_export
+    repaints = int(args[0]) if len(args) > 0 else 50
+    num_vertices = int(args[1]) if len(args) > 1 else 40
+    num_edges = int(args[2]) if len(args) > 2 else 80
+
+    # Deterministic random topology
+    rand = random.Random(0)
+    t = topology.Topology()
+    vertices = [topology.Vertex(t) for i in range(num_vertices)]
+    for idx, v in enumerate(vertices):
+        v.block.index = idx
+    for alt in range(1, num_edges + 1):
+        e = topology.Edge(t)
+        e.posBand.altitude = alt
+        e.negBand.altitude = -alt
+        e.posBand.rank = alt
+        e.negBand.rank = alt
+        endpoints = rand.sample(vertices, min(len(vertices), rand.randint(2, 4)))
+        src = topology.Source(t, endpoints[0], e)
+        src.snap.order = len(endpoints[0].sources) - 1
+        for v in endpoints[1:]:
+            snk = topology.Sink(t, v, e)
+            snk.snap.order = len(v.sinks) - 1
+
+    app = QApplication(sys.argv)
+    view = qt_view.QtView()
+    adapter = base_adapter.BaseAdapter(t, view)
+    adapter._update_view()
+    scene_export.settle_layout(view)
+    scene = view.scene()
+    source = scene.itemsBoundingRect()
+    image = QImage(int(source.width()), int(source.height()), QImage.Format_ARGB32)
+    print "Scene: %d items, %dx%d" % (len(scene.items()), source.width(), source.height())
+
+    start = time.time()
+    for i in range(repaints):
+        image.fill(Qt.white)
+        painter = QPainter(image)
+        scene.render(painter, QRectF(image.rect()), source)
+        painter.end()
+    elapsed = time.time() - start
+    print "%d repaints in %.3f sec (%.2f ms per repaint)" % (repaints, elapsed, 1000.0 * elapsed / repaints)
+
 def rosview():
     try:
         import python_qt_binding.QtGui
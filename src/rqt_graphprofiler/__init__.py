@@ -1,2 +1,2 @@
-from .visualizer_plugin import VisualizerPlugin
-__all__ = ['VisualizerPlugin']
+# rqt loads the plugin as rqt_graphprofiler.visualizer_plugin.VisualizerPlugin. It
+# is not imported here, so that the headless tools can be used without Qt.
@@ -0,0 +1,55 @@
+# Copyright 2014 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Refresh interval that adapts to how long a refresh takes.
+
+Small graphs are refreshed often, while on large graphs the interval grows so
+that refreshing only takes a fixed fraction of the time and refreshes never
+pile up behind each other.
+"""
+
+DEFAULT_INTERVAL = 2.0
+
+
+class AdaptiveRate(object):
+    """ Chooses the interval between refreshes so that a refresh costs about
+    target_fraction of the interval, within [min_interval, max_interval].
+    Each new measurement moves the interval part of the way (1 - smoothing)
+    towards the ideal one, so single slow refreshes do not make it jump.
+    """
+    def __init__(self, min_interval=0.5, max_interval=10.0, target_fraction=0.1, smoothing=0.5):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_fraction = target_fraction
+        self.smoothing = smoothing
+        self.interval = max(min_interval, min(max_interval, DEFAULT_INTERVAL))
+        self.last_cost = 0.0
+
+    def record(self, cost):
+        """ Updates the interval from the duration of a refresh, in seconds
+        :returns: the new interval in seconds
+        """
+        self.last_cost = cost
+        ideal = cost / self.target_fraction
+        interval = self.smoothing * self.interval + (1.0 - self.smoothing) * ideal
+        # A refresh slower than the current interval takes effect at once
+        interval = max(interval, cost)
+        self.interval = max(self.min_interval, min(self.max_interval, interval))
+        return self.interval
+
+    @property
+    def rate(self):
+        """ refreshes per second """
+        return 1.0 / self.interval
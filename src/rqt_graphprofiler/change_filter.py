@@ -0,0 +1,99 @@
+# Copyright 2014 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Decides which statistics changes are worth redrawing.
+
+The model always holds the latest statistics. An item is only redrawn when
+a new value differs from the value it shows by more than an absolute and a
+relative threshold. Block and band widths are derived from memory use and
+bandwidth in discrete steps; a change of step changes the layout, any other
+change only the item's labels.
+"""
+
+# (lower bound, width) steps, from the widest down. Smaller values get the default width.
+NODE_WIDTH_STEPS = [(1073741824, 180), (1048576 * 100, 160), (1048576 * 10, 140),
+                    (1048576, 120), (1024 * 100, 100), (1024 * 10, 80)]
+NODE_DEFAULT_WIDTH = 50
+TOPIC_WIDTH_STEPS = [(1073741824, 130), (1048576 * 100, 110), (1048576 * 10, 90),
+                     (1048576, 70), (1024 * 100, 50), (1024 * 10, 30)]
+TOPIC_DEFAULT_WIDTH = 15
+
+# metric: (absolute, relative) change needed before a new value is redrawn
+DEFAULT_THRESHOLDS = {
+    'num_threads': (0, 0.0),
+    'cpu_load_mean': (1.0, 0.05),
+    'virt_mem_mean': (1048576, 0.02),
+    'hz': (0.1, 0.02),
+    'bw': (1024, 0.05),
+}
+
+
+def width_bucket(value, steps, default):
+    """ returns the width of the first step whose lower bound value exceeds """
+    for lower_bound, width in steps:
+        if value > lower_bound:
+            return width
+    return default
+
+
+def node_width(virt_mem):
+    return width_bucket(virt_mem, NODE_WIDTH_STEPS, NODE_DEFAULT_WIDTH)
+
+
+def topic_width(bw):
+    return width_bucket(bw, TOPIC_WIDTH_STEPS, TOPIC_DEFAULT_WIDTH)
+
+
+class SignificanceFilter(object):
+    """ Per metric absolute and relative change thresholds """
+    def __init__(self, thresholds=None):
+        self.thresholds = dict(DEFAULT_THRESHOLDS)
+        if thresholds is not None:
+            self.thresholds.update(thresholds)
+
+    def significant(self, metric, old, new):
+        """ returns True if new should replace old. Metrics without a
+        threshold are significant on any change. """
+        absolute, relative = self.thresholds.get(metric, (0, 0.0))
+        return abs(new - old) > max(absolute, relative * abs(old))
+
+
+class ShownValues(object):
+    """ The metric values each item was last drawn with, by node or topic name """
+    def __init__(self, significance=None):
+        self.significance = SignificanceFilter() if significance is None else significance
+        self._values = dict()  # name: dict of metric: value
+
+    def show(self, name, **values):
+        """ Records the values an item was drawn with """
+        self._values[name] = values
+
+    def forget(self, name):
+        self._values.pop(name, None)
+
+    def value(self, name, metric):
+        """ returns the value an item was drawn with, or None """
+        return self._values.get(name, dict()).get(metric)
+
+    def changed(self, name, **values):
+        """ returns True if a value differs significantly from the drawn one.
+        Items that were never drawn have nothing to redraw. """
+        shown = self._values.get(name)
+        if shown is None:
+            return False
+        for metric, value in values.items():
+            if metric in shown and self.significance.significant(metric, shown[metric], value):
+                return True
+        return False
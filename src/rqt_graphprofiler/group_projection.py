@@ -0,0 +1,184 @@
+# Copyright 2014 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Collapses groups of nodes into single super-blocks.
+
+GroupProjection sits between the TopologySnapshot of a /topology message
+and the TopologyReconciler. In 'namespace' mode nodes are grouped by the
+first depth levels of their namespace, in 'host' mode by the host in their
+uri. Every collapsed group of two or more nodes is replaced by one vertex
+named after the group ('/robot1/' or '@hostname'), topics only connecting
+members of a group disappear, and the connections of the members to other
+topics become connections of the group vertex.
+
+Projecting a snapshot is linear in its size, and since the reconciler
+only applies the differences to the applied snapshot, collapsing or
+expanding a group only adds and removes the affected nodes and
+connections of the RosSystemGraph; nothing else is rebuilt. Statistics of
+the members are combined with fold_nodes(): usage is summed, peaks are the
+largest of the members.
+"""
+
+import numpy as np
+
+from ros_topology import hostname_of
+from topology_reconciler import TopologySnapshot
+
+MODES = (None, 'namespace', 'host')
+
+# Columns of statistics_aggregation.aggregate_nodes and how groups combine them
+SUM_COLUMNS = ('num_threads', 'cpu_load_mean', 'virt_mem_mean')
+STD_COLUMNS = ('cpu_load_std', 'virt_mem_std')
+MAX_COLUMNS = ('cpu_load_max', 'virt_mem_max')
+
+
+class GroupProjection(object):
+    """ Maps nodes to collapsed groups. Groups are collapsed unless expanded. """
+    def __init__(self, mode=None, depth=1):
+        self.mode = None
+        self.depth = depth
+        self._groups_shown = set()  # names of every group vertex projected so far
+        self.set_mode(mode, depth)
+
+    def set_mode(self, mode, depth=None):
+        """ Selects how nodes are grouped, None for not at all. Collapses all groups. """
+        if mode not in MODES:
+            raise Exception("Unknown grouping '%s'" % mode)
+        self.mode = mode
+        if depth is not None:
+            self.depth = depth
+        self._expanded = set()  # names of groups shown as their members
+        self._group_of = dict()  # node name: group name, for nodes of groups with several members
+        self._vertex_of = dict()  # node name: group name, for nodes of collapsed groups
+        self._members = dict()  # group name: set of node names, for collapsed groups
+        self._hidden_topics = set()  # topics only connecting members of one collapsed group
+
+    def group_key(self, name, uri):
+        """ returns the name of the group of a node, or None if it is not grouped """
+        if self.mode == 'namespace':
+            parts = name.split('/')[1:-1]
+            if len(parts) == 0:
+                return None
+            return '/' + '/'.join(parts[:self.depth]) + '/'
+        if self.mode == 'host':
+            hostname = hostname_of(uri)
+            return None if hostname is None else '@' + hostname
+        return None
+
+    def vertex_of(self, name):
+        """ returns the name of the vertex showing a node """
+        return self._vertex_of.get(name, name)
+
+    def group_of(self, name):
+        """ returns the group a node or collapsed group vertex belongs to, or None """
+        if name in self._members:
+            return name
+        return self._group_of.get(name)
+
+    def members(self, name):
+        """ returns the nodes of a collapsed group vertex, or None for other vertices """
+        return self._members.get(name)
+
+    def hides_topic(self, name):
+        return name in self._hidden_topics
+
+    def regrouped(self, name):
+        """ returns True for nodes replaced by their group vertex, and group
+        vertices replaced by their members, in the last projection. These are
+        gone because of the grouping, not because they stopped running. """
+        return name in self._vertex_of or (name in self._groups_shown and name not in self._members)
+
+    def expand(self, group):
+        self._expanded.add(group)
+
+    def collapse(self, group):
+        self._expanded.discard(group)
+
+    def project(self, snapshot):
+        """ returns the snapshot with collapsed groups replaced by their vertex """
+        self._group_of = dict()
+        self._vertex_of = dict()
+        self._members = dict()
+        self._hidden_topics = set()
+        if self.mode is None:
+            return snapshot
+        groups = dict()  # group name: list of node names
+        for name, uri in snapshot.nodes.items():
+            group = self.group_key(name, uri)
+            if group is not None:
+                groups.setdefault(group, list()).append(name)
+        for group, names in groups.items():
+            if len(names) < 2:
+                continue
+            for name in names:
+                self._group_of[name] = group
+            if group in self._expanded:
+                continue
+            self._members[group] = set(names)
+            self._groups_shown.add(group)
+            for name in names:
+                self._vertex_of[name] = group
+        # Forget expanded groups that no longer exist
+        self._expanded &= set(groups)
+
+        projected = TopologySnapshot()
+        projected.topics = dict(snapshot.topics)
+        for name, uri in snapshot.nodes.items():
+            if name not in self._vertex_of:
+                projected.nodes[name] = uri
+        for group, names in self._members.items():
+            # The first member in name order decides the location of the group
+            projected.nodes[group] = snapshot.nodes[min(names)]
+        vertex_of = self._vertex_of
+        projected.publishers = set((vertex_of.get(node, node), topic) for node, topic in snapshot.publishers)
+        projected.subscribers = set((vertex_of.get(node, node), topic) for node, topic in snapshot.subscribers)
+
+        # Topics whose connections all lead to the same collapsed group are internal to it
+        vertices_of_topic = dict()  # topic: set of vertex names
+        for vertex, topic in projected.publishers | projected.subscribers:
+            vertices_of_topic.setdefault(topic, set()).add(vertex)
+        for topic, vertices in vertices_of_topic.items():
+            if len(vertices) == 1 and next(iter(vertices)) in self._members:
+                self._hidden_topics.add(topic)
+        if len(self._hidden_topics) > 0:
+            hidden = self._hidden_topics
+            for topic in hidden:
+                del projected.topics[topic]
+            projected.publishers = set(pair for pair in projected.publishers if pair[1] not in hidden)
+            projected.subscribers = set(pair for pair in projected.subscribers if pair[1] not in hidden)
+        return projected
+
+    def fold_nodes(self, names, columns):
+        """ Combines per node statistics, as returned by
+        statistics_aggregation.aggregate_nodes, into per vertex statistics
+        :returns: (vertex names, dict of column name: array with one value per vertex)
+        """
+        if len(self._vertex_of) == 0 or len(names) == 0:
+            return names, columns
+        vertices = [self._vertex_of.get(name, name) for name in names]
+        vertex_names = sorted(set(vertices))
+        ids = dict((vertex, i) for i, vertex in enumerate(vertex_names))
+        group = np.array([ids[vertex] for vertex in vertices], dtype=np.intp)
+        count = len(vertex_names)
+        folded = dict()
+        for column in SUM_COLUMNS:
+            folded[column] = np.bincount(group, weights=columns[column], minlength=count)
+        folded['num_threads'] = folded['num_threads'].astype(np.int64)
+        for column in STD_COLUMNS:
+            folded[column] = np.sqrt(np.bincount(group, weights=np.square(columns[column]), minlength=count))
+        for column in MAX_COLUMNS:
+            folded[column] = np.full(count, -np.inf)
+            np.maximum.at(folded[column], group, columns[column])
+        return vertex_names, folded
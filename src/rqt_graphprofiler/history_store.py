@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+# Copyright 2014 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Append only on-disk history of node, topic and host statistics.
+
+Every entity has its own file of fixed size binary records (RECORD_DTYPE)
+below root/nodes, root/topics or root/hosts, named after the url quoted
+entity name. Records are appended in time order, so a time range is found
+with a binary search over a memory map of the file, and only the pages of
+the requested range are ever read.
+
+    store = HistoryStore('/tmp/profile')
+    records = store.query('topics', '/camera/image', start=now - 600, stop=now - 540)
+    print(records['bw'].mean())
+
+Fields that do not apply to an entity (hz of a node, threads of a topic) are NaN.
+
+Appending and querying may happen in different threads.
+"""
+
+import collections
+import os
+import threading
+
+import numpy as np
+
+try:
+    from urllib import quote, unquote
+except ImportError:
+    from urllib.parse import quote, unquote
+
+RECORD_FIELDS = ('time', 'cpu_load', 'virt_mem', 'threads', 'hz', 'bw', 'dropped')
+RECORD_DTYPE = np.dtype([(field, '<f8') for field in RECORD_FIELDS])
+
+KINDS = ('nodes', 'topics', 'hosts')
+SUFFIX = '.hist'
+
+# Number of history files kept open for appending at first. flush() raises
+# it to the number of entities appended since the last flush, so that a
+# large system does not reopen every file on every update, up to half the
+# process's file descriptor limit.
+MAX_OPEN_FILES = 128
+try:
+    import resource
+    OPEN_FILES_CAP = resource.getrlimit(resource.RLIMIT_NOFILE)[0] // 2
+except ImportError:
+    OPEN_FILES_CAP = 512
+if OPEN_FILES_CAP <= 0:
+    OPEN_FILES_CAP = 512
+
+SPARKLINE_CHARS = u"▁▂▃▄▅▆▇█"
+
+
+def record(time, cpu_load=np.nan, virt_mem=np.nan, threads=np.nan, hz=np.nan, bw=np.nan, dropped=np.nan):
+    """ returns a tuple of values in RECORD_FIELDS order """
+    return (time, cpu_load, virt_mem, threads, hz, bw, dropped)
+
+
+def sparkline(values, width=24):
+    """ returns a unicode bar chart of values, resampled to at most width bars """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return u""
+    if len(values) > width:
+        # Largest value of each of width equally long runs
+        edges = np.linspace(0, len(values), width + 1).astype(np.intp)
+        values = np.maximum.reduceat(values, edges[:-1])
+    low = values.min()
+    span = values.max() - low
+    if span <= 0:
+        levels = np.zeros(len(values), dtype=np.intp)
+    else:
+        levels = ((values - low) / span * (len(SPARKLINE_CHARS) - 1)).round().astype(np.intp)
+    return u"".join(SPARKLINE_CHARS[level] for level in levels)
+
+
+class HistoryStore(object):
+    """ Time series of statistics records, one file per entity """
+    def __init__(self, root, max_open_files=MAX_OPEN_FILES):
+        self.root = root
+        self.max_open_files = max_open_files
+        self._files = collections.OrderedDict()  # (kind, name): file open for appending, least recently used first
+        self._last_time = dict()  # (kind, name): time of the last record
+        self._appended = set()  # (kind, name) appended to since the last flush
+        self._lock = threading.Lock()
+
+    def _path(self, kind, name):
+        if kind not in KINDS:
+            raise ValueError("Unknown history kind '%s'" % kind)
+        return os.path.join(self.root, kind, quote(name, safe='') + SUFFIX)
+
+    def _open(self, kind, name):
+        key = (kind, name)
+        handle = self._files.pop(key, None)
+        if handle is None:
+            path = self._path(kind, name)
+            directory = os.path.dirname(path)
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            handle = open(path, 'ab')
+            handle.seek(0, os.SEEK_END)
+            # Drop a partial record left by an interrupted write
+            size = handle.tell()
+            if size % RECORD_DTYPE.itemsize != 0:
+                handle.truncate(size - size % RECORD_DTYPE.itemsize)
+                handle.seek(0, os.SEEK_END)
+            if key not in self._last_time and handle.tell() > 0:
+                with open(path, 'rb') as existing:
+                    existing.seek(-RECORD_DTYPE.itemsize, os.SEEK_END)
+                    last = np.frombuffer(existing.read(RECORD_DTYPE.itemsize), dtype=RECORD_DTYPE)
+                    self._last_time[key] = float(last['time'][0])
+            if len(self._files) >= self.max_open_files:
+                self._files.popitem(last=False)[1].close()
+        self._files[key] = handle
+        return handle
+
+    def append(self, kind, name, values):
+        """ Appends a record, a tuple in RECORD_FIELDS order (see record()).
+        Records older than the last one of the entity are dropped, so that the
+        files stay sorted by time.
+        :returns: True if the record was stored
+        """
+        key = (kind, name)
+        with self._lock:
+            handle = self._open(kind, name)
+            if values[0] < self._last_time.get(key, -np.inf):
+                return False
+            handle.write(np.array([tuple(values)], dtype=RECORD_DTYPE).tobytes())
+            self._last_time[key] = values[0]
+            self._appended.add(key)
+        return True
+
+    def flush(self):
+        """ Makes the records appended so far visible to readers. Call once
+        per update, as the number of open files follows the entities appended
+        to in between. """
+        with self._lock:
+            for handle in self._files.values():
+                handle.flush()
+            if len(self._appended) > self.max_open_files:
+                self.max_open_files = min(len(self._appended), max(self.max_open_files, OPEN_FILES_CAP))
+            self._appended.clear()
+
+    def close(self):
+        with self._lock:
+            for handle in self._files.values():
+                handle.close()
+            self._files.clear()
+
+    def names(self, kind):
+        """ returns the names of all entities of a kind with a history """
+        directory = os.path.join(self.root, kind)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(unquote(filename[:-len(SUFFIX)]) for filename in os.listdir(directory)
+                      if filename.endswith(SUFFIX))
+
+    def query(self, kind, name, start=None, stop=None):
+        """ returns the records of an entity with start <= time < stop as a
+        read only, memory mapped record array. None means unbounded. """
+        with self._lock:
+            handle = self._files.get((kind, name))
+            if handle is not None:
+                handle.flush()
+        path = self._path(kind, name)
+        if not os.path.exists(path):
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        count = os.path.getsize(path) // RECORD_DTYPE.itemsize
+        if count == 0:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        records = np.memmap(path, dtype=RECORD_DTYPE, mode='r', shape=(count,))
+        times = records['time']
+        lo = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+        hi = count if stop is None else int(np.searchsorted(times, stop, side='left'))
+        return records[lo:hi]
+
+    def sparkline(self, kind, name, field, start=None, stop=None, width=24):
+        """ returns a unicode bar chart of a field over a time range """
+        return sparkline(self.query(kind, name, start, stop)[field], width)
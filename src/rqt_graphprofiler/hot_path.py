@@ -0,0 +1,145 @@
+# Copyright 2014 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Restricts the graph to its heaviest topics and nodes.
+
+HotPathFilter keeps the k topics with the highest bandwidth or rate, the k
+nodes with the highest CPU load or memory use, and the direct neighbours of
+both: the publishers and subscribers of a hot topic and the topics of a hot
+node. Everything else is left out of the TopologySnapshot handed to the
+reconciler, on top of the quiet lists, whose matchers stay as they are.
+
+The statistics of every node and topic, shown or not, are observed on each
+statistics update and rank() picks the top k with a heap, in O(n log k).
+Selected topics and nodes stay selected while they rank within the top
+k + k * HYSTERESIS, so that entities near the cut off do not enter and
+leave the graph on every update.
+As the reconciler only applies differences, changing k or the metric only
+adds and removes the nodes and topics entering or leaving the selection.
+"""
+
+import heapq
+
+from topology_reconciler import TopologySnapshot
+
+TOPIC_METRICS = ('bw', 'hz')
+NODE_METRICS = ('cpu_load_mean', 'virt_mem_mean')
+
+# Fraction of k by which a selected entity may fall behind before it is replaced
+HYSTERESIS = 0.1
+
+
+def top_k(k, names, values, selected=None):
+    """ returns the set of the k names with the largest values. Names of the
+    previously selected set are kept while they rank within k + k * HYSTERESIS
+    (at least k + 1), ahead of higher ranked names that were not selected. """
+    if not selected:
+        return set(name for value, name in heapq.nlargest(k, zip(values, names)))
+    ranked = [name for value, name in heapq.nlargest(k + max(1, int(k * HYSTERESIS)), zip(values, names))]
+    result = set([name for name in ranked if name in selected][:k])
+    for name in ranked:
+        if len(result) >= k:
+            break
+        result.add(name)
+    return result
+
+
+class HotPathFilter(object):
+    """ Selects the top k topics and nodes and their neighbours. Disabled while k is None. """
+    def __init__(self, k=None, topic_metric='bw', node_metric='cpu_load_mean'):
+        self.k = None
+        self.topic_metric = topic_metric
+        self.node_metric = node_metric
+        self._topics = None  # (names, dict of metric: values) observed last
+        self._nodes = None
+        self._hot_topics = None  # selected by rank(), None before the first ranking
+        self._hot_nodes = None
+        self._hidden_topics = set()  # left out of the last filtered snapshot
+        self._hidden_nodes = set()
+        self.configure(k, topic_metric, node_metric)
+
+    @property
+    def enabled(self):
+        return self.k is not None
+
+    def configure(self, k, topic_metric=None, node_metric=None):
+        """ Sets k, None to show everything, and the metrics ranked by """
+        if topic_metric is not None:
+            if topic_metric not in TOPIC_METRICS:
+                raise Exception("Unknown topic metric '%s'" % topic_metric)
+            self.topic_metric = topic_metric
+        if node_metric is not None:
+            if node_metric not in NODE_METRICS:
+                raise Exception("Unknown node metric '%s'" % node_metric)
+            self.node_metric = node_metric
+        if k is not None and k < 1:
+            k = None
+        self.k = k
+        if not self.enabled:
+            self._hidden_topics = set()
+            self._hidden_nodes = set()
+
+    def observe_topics(self, names, columns):
+        """ Keeps the latest topic statistics, as returned by statistics_aggregation.aggregate_topics """
+        self._topics = (names, columns)
+
+    def observe_nodes(self, names, columns):
+        """ Keeps the latest node statistics, as returned by statistics_aggregation.aggregate_nodes """
+        self._nodes = (names, columns)
+
+    def rank(self):
+        """ Selects the top k of the observed statistics
+        :returns: True if the selection changed
+        """
+        if not self.enabled or self._topics is None or self._nodes is None:
+            return False
+        hot_topics = top_k(self.k, self._topics[0], self._topics[1].get(self.topic_metric, ()), self._hot_topics)
+        hot_nodes = top_k(self.k, self._nodes[0], self._nodes[1].get(self.node_metric, ()), self._hot_nodes)
+        changed = hot_topics != self._hot_topics or hot_nodes != self._hot_nodes
+        self._hot_topics = hot_topics
+        self._hot_nodes = hot_nodes
+        return changed
+
+    def hides_topic(self, name):
+        return name in self._hidden_topics
+
+    def hides_node(self, name):
+        return name in self._hidden_nodes
+
+    def apply(self, snapshot):
+        """ returns the part of the snapshot connected to the selection,
+        or the whole snapshot while disabled or before the first ranking """
+        if not self.enabled or self._hot_topics is None:
+            self._hidden_topics = set()
+            self._hidden_nodes = set()
+            return snapshot
+        hot_topics = self._hot_topics
+        hot_nodes = self._hot_nodes
+        nodes = set(name for name in hot_nodes if name in snapshot.nodes)
+        topics = set(name for name in hot_topics if name in snapshot.topics)
+        for pairs in (snapshot.publishers, snapshot.subscribers):
+            for node, topic in pairs:
+                if topic in hot_topics:
+                    nodes.add(node)
+                if node in hot_nodes:
+                    topics.add(topic)
+        filtered = TopologySnapshot()
+        filtered.nodes = dict((name, snapshot.nodes[name]) for name in nodes)
+        filtered.topics = dict((name, snapshot.topics[name]) for name in topics)
+        filtered.publishers = set(pair for pair in snapshot.publishers if pair[0] in nodes and pair[1] in topics)
+        filtered.subscribers = set(pair for pair in snapshot.subscribers if pair[0] in nodes and pair[1] in topics)
+        self._hidden_nodes = set(snapshot.nodes) - nodes
+        self._hidden_topics = set(snapshot.topics) - topics
+        return filtered
@@ -0,0 +1,199 @@
+# Copyright 2014 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+A synthetic ROS system for testing the profiler at scale.
+
+SyntheticSystem invents hosts, nodes and topics of a configurable shape and
+produces the /topology, /statistics, /node_statistics and /host_statistics
+messages that rosgrapher, rosprofiler and the roscpp/rospy statistics would
+publish for it. Nodes are grouped in namespaces of NODES_PER_NAMESPACE and
+spread round robin over the hosts. Every topic has one publisher and a
+number of subscribers drawn from the fan out distribution:
+
+  fixed       every topic has round(fan_out) subscribers
+  geometric   mean fan_out, most topics have few subscribers
+  pareto      mean fan_out with a heavy tail of widely subscribed topics
+
+Churn restarts randomly chosen nodes, which then vanish from the graph and
+the statistics for restart_time seconds. All choices come from one seeded
+random generator, so a shape and seed always produce the same system.
+"""
+
+import math
+import random
+
+import rospy
+from ros_statistics_msgs.msg import HostStatistics
+from ros_statistics_msgs.msg import NodeStatistics
+from ros_topology_msgs.msg import Graph
+from ros_topology_msgs.msg import Node
+from ros_topology_msgs.msg import Topic
+from rosgraph_msgs.msg import TopicStatistics
+
+NODES_PER_NAMESPACE = 10
+FAN_OUT_DISTRIBUTIONS = ('fixed', 'geometric', 'pareto')
+
+# Ranges, sampled log uniformly, of the simulated topic and node load
+RATE_RANGE = (1.0, 100.0)  # messages per second
+MESSAGE_SIZE_RANGE = (100.0, 1048576.0)  # bytes
+MEMORY_RANGE = (1048576.0 * 10, 1048576.0 * 1000)  # bytes
+HOST_MEMORY = 1073741824.0 * 16
+HOST_CORES = 8
+
+
+def _log_uniform(rand, low, high):
+    return math.exp(rand.uniform(math.log(low), math.log(high)))
+
+
+class SyntheticSystem(object):
+    """ Hosts, nodes and topics of a made up ROS system and their statistics """
+    def __init__(self, hosts=2, nodes=20, topics=40, fan_out=2.0, fan_out_distribution='geometric',
+                 churn=0.0, restart_time=3.0, seed=0):
+        """
+        :param fan_out: mean number of subscribers per topic
+        :param churn: node restarts per second
+        """
+        if fan_out_distribution not in FAN_OUT_DISTRIBUTIONS:
+            raise Exception("Unknown fan out distribution '%s'" % fan_out_distribution)
+        if hosts < 1 or nodes < 1:
+            raise Exception("A system needs at least one host and one node")
+        self._rand = random.Random(seed)
+        self.churn = churn
+        self.restart_time = restart_time
+        self.hosts = ["host_%d" % i for i in range(hosts)]
+        self.nodes = ["/ns_%d/node_%d" % (i // NODES_PER_NAMESPACE, i) for i in range(nodes)]
+        self.host_of = dict((name, self.hosts[i % hosts]) for i, name in enumerate(self.nodes))
+        self.uri_of = dict((name, "http://%s:%d/" % (self.host_of[name], 40000 + i)) for i, name in enumerate(self.nodes))
+        self.topics = ["/ns_%d/topic_%d" % (i % max(1, nodes // NODES_PER_NAMESPACE), i) for i in range(topics)]
+        self.publisher_of = dict()  # topic: node name
+        self.subscribers_of = dict()  # topic: list of node names
+        self.rate_of = dict()  # topic: messages per second
+        self.size_of = dict()  # topic: bytes per message
+        for topic in self.topics:
+            self.publisher_of[topic] = self._rand.choice(self.nodes)
+            others = [name for name in self.nodes if name != self.publisher_of[topic]]
+            count = min(len(others), self._fan_out(fan_out, fan_out_distribution))
+            self.subscribers_of[topic] = self._rand.sample(others, count)
+            self.rate_of[topic] = _log_uniform(self._rand, *RATE_RANGE)
+            self.size_of[topic] = _log_uniform(self._rand, *MESSAGE_SIZE_RANGE)
+        self.cpu_of = dict((name, self._rand.uniform(0.0, 50.0)) for name in self.nodes)  # percent
+        self.memory_of = dict((name, _log_uniform(self._rand, *MEMORY_RANGE)) for name in self.nodes)
+        self.threads_of = dict((name, self._rand.randint(1, 16)) for name in self.nodes)
+        self._down = dict()  # node name: time it is back up
+        self._last_step = None
+        self.restarts = 0
+
+    def _fan_out(self, mean, distribution):
+        if distribution == 'fixed' or mean <= 1.0:
+            return int(round(mean))
+        if distribution == 'geometric':
+            # number of trials until the first success, with success probability 1/mean
+            return 1 + int(math.log(1.0 - self._rand.random()) / math.log(1.0 - 1.0 / mean))
+        # Pareto distribution with minimum 1 and the requested mean
+        return int(self._rand.paretovariate(mean / (mean - 1.0)))
+
+    def running(self, name):
+        return name not in self._down
+
+    def step(self, now):
+        """ Restarts nodes according to the churn rate, for the time passed since the last step """
+        for name, back_up in list(self._down.items()):
+            if now >= back_up:
+                del self._down[name]
+        if self._last_step is not None and self.churn > 0:
+            expected = self.churn * max(0.0, now - self._last_step)
+            count = int(expected) + (1 if self._rand.random() < expected - int(expected) else 0)
+            for name in self._rand.sample(self.nodes, min(count, len(self.nodes))):
+                self._down[name] = now + self.restart_time
+                self.restarts += 1
+        self._last_step = now
+
+    def _noise(self, value, spread=0.1):
+        return value * self._rand.uniform(1.0 - spread, 1.0 + spread)
+
+    def graph(self, now):
+        """ returns the ros_topology_msgs/Graph of the running nodes """
+        graph = Graph()
+        graph.timestamp = rospy.Time.from_sec(now)
+        graph.master = "http://%s:11311/" % self.hosts[0]
+        publishes = dict((name, list()) for name in self.nodes)
+        subscribes = dict((name, list()) for name in self.nodes)
+        for topic in self.topics:
+            publishes[self.publisher_of[topic]].append(topic)
+            for name in self.subscribers_of[topic]:
+                subscribes[name].append(topic)
+        for name in self.nodes:
+            if self.running(name):
+                graph.nodes.append(Node(name=name, uri=self.uri_of[name],
+                                        publishes=publishes[name], subscribes=subscribes[name]))
+        for topic in self.topics:
+            graph.topics.append(Topic(name=topic, type="std_msgs/String"))
+        return graph
+
+    def topic_statistics(self, start, stop):
+        """ returns a rosgraph_msgs/TopicStatistics for every connection
+        between running nodes, covering the window from start to stop """
+        messages = list()
+        duration = stop - start
+        for topic in self.topics:
+            node_pub = self.publisher_of[topic]
+            if not self.running(node_pub):
+                continue
+            for node_sub in self.subscribers_of[topic]:
+                if not self.running(node_sub):
+                    continue
+                delivered = int(round(self._noise(self.rate_of[topic]) * duration))
+                messages.append(TopicStatistics(
+                    topic=topic, node_pub=node_pub, node_sub=node_sub,
+                    window_start=rospy.Time.from_sec(start), window_stop=rospy.Time.from_sec(stop),
+                    delivered_msgs=delivered, dropped_msgs=0,
+                    traffic=int(delivered * self.size_of[topic])))
+        return messages
+
+    def node_statistics(self, start, stop, samples=10):
+        """ returns a ros_statistics_msgs/NodeStatistics for every running node """
+        messages = list()
+        for name in self.nodes:
+            if not self.running(name):
+                continue
+            cpu = self._noise(self.cpu_of[name], 0.3)
+            memory = self._noise(self.memory_of[name], 0.02)
+            messages.append(NodeStatistics(
+                node=name, window_start=rospy.Time.from_sec(start), window_stop=rospy.Time.from_sec(stop),
+                samples=samples, threads=self.threads_of[name],
+                cpu_load_mean=cpu, cpu_load_std=cpu * 0.1, cpu_load_max=cpu * 1.3,
+                virt_mem_mean=memory, virt_mem_std=memory * 0.01, virt_mem_max=memory * 1.02))
+        return messages
+
+    def host_statistics(self, start, stop, samples=10):
+        """ returns a ros_statistics_msgs/HostStatistics for every host, with
+        the load of its running nodes spread evenly over HOST_CORES cores """
+        cpu = dict((host, 0.0) for host in self.hosts)
+        memory = dict((host, 0.0) for host in self.hosts)
+        for name in self.nodes:
+            if self.running(name):
+                cpu[self.host_of[name]] += self.cpu_of[name]
+                memory[self.host_of[name]] += self.memory_of[name]
+        messages = list()
+        for host in self.hosts:
+            core_load = min(100.0, cpu[host] / HOST_CORES)
+            used = min(HOST_MEMORY, memory[host])
+            messages.append(HostStatistics(
+                hostname=host, window_start=rospy.Time.from_sec(start), window_stop=rospy.Time.from_sec(stop),
+                samples=samples,
+                cpu_load_mean=[self._noise(core_load) for core in range(HOST_CORES)],
+                cpu_load_max=[min(100.0, core_load * 1.3) for core in range(HOST_CORES)],
+                phymem_used_mean=used, phymem_avail_mean=HOST_MEMORY - used))
+        return messages
@@ -0,0 +1,113 @@
+# Copyright 2014 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Incrementally maintained search index over a set of names.
+
+Prefix queries use a sorted list and binary search. Substring queries use an
+inverted index of character trigrams to narrow down the candidates before
+checking them. Matching is case insensitive.
+"""
+
+import bisect
+
+GRAM_SIZE = 3
+
+
+def _grams(text):
+    """ returns the set of trigrams in text """
+    return set(text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1))
+
+
+class NameIndex(object):
+    """ Prefix and substring index of names """
+    def __init__(self):
+        self._keys = dict()  # name: lowercase name
+        self._sorted = list()  # sorted list of (lowercase name, name)
+        self._grams = dict()  # trigram: set(names)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, name):
+        return name in self._keys
+
+    def add(self, name):
+        """ Adds a name to the index. Adding a name twice has no effect. """
+        if name is None or name in self._keys:
+            return
+        key = name.lower()
+        self._keys[name] = key
+        bisect.insort(self._sorted, (key, name))
+        for gram in _grams(key):
+            self._grams.setdefault(gram, set()).add(name)
+
+    def discard(self, name):
+        """ Removes a name from the index if it is present """
+        key = self._keys.pop(name, None)
+        if key is None:
+            return
+        pos = bisect.bisect_left(self._sorted, (key, name))
+        if pos < len(self._sorted) and self._sorted[pos] == (key, name):
+            self._sorted.pop(pos)
+        for gram in _grams(key):
+            names = self._grams.get(gram)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self._grams[gram]
+
+    def prefix_matches(self, prefix, limit=None):
+        """ returns names starting with prefix, in alphabetical order """
+        prefix = prefix.lower()
+        matches = list()
+        pos = bisect.bisect_left(self._sorted, (prefix, ""))
+        while pos < len(self._sorted) and self._sorted[pos][0].startswith(prefix):
+            matches.append(self._sorted[pos][1])
+            if limit is not None and len(matches) >= limit:
+                break
+            pos += 1
+        return matches
+
+    def substring_matches(self, text, limit=None):
+        """ returns names containing text, in alphabetical order """
+        text = text.lower()
+        if len(text) < GRAM_SIZE:
+            candidates = self._keys.keys()
+        else:
+            gram_sets = [self._grams.get(gram, set()) for gram in _grams(text)]
+            gram_sets.sort(key=len)
+            candidates = set(gram_sets[0])
+            for names in gram_sets[1:]:
+                candidates &= names
+                if not candidates:
+                    break
+        matches = sorted(name for name in candidates if text in self._keys[name])
+        return matches[:limit] if limit is not None else matches
+
+    def search(self, text, limit=20):
+        """ returns names matching text. Names starting with text (with or
+        without a leading slash) come first, followed by names containing it.
+        """
+        if not text:
+            return list()
+        matches = self.prefix_matches(text, limit)
+        if not text.startswith("/"):
+            matches.extend(self.prefix_matches("/" + text, limit))
+        for name in self.substring_matches(text):
+            if len(matches) >= limit:
+                break
+            if name not in matches:
+                matches.append(name)
+        return matches[:limit]
@@ -0,0 +1,125 @@
+# Copyright 2014 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Republishes the aggregated statistics of a RosSystemGraph as /profile.
+
+Every publication is one rqt_graphprofiler/HostProfile per host, holding a
+NodeProfile for each of its nodes with a TopicProfile for every topic the
+node publishes or subscribes to. Nodes whose host is not known are listed
+under an empty hostname. The messages describe the graph as it is shown,
+so quiet listed nodes and topics are left out, and collapsed groups appear
+as one node.
+
+Messages are built only when someone subscribes, and at most once every
+min_interval seconds, so tools can follow the profile without subscribing
+to the raw, high rate statistics topics themselves.
+"""
+
+import rospy
+
+from rqt_graphprofiler.msg import HostProfile
+from rqt_graphprofiler.msg import NodeProfile
+from rqt_graphprofiler.msg import TopicProfile
+
+# Seconds between two publications at least
+DEFAULT_MIN_INTERVAL = 2.0
+
+# Largest value of the int32 message counters
+INT32_MAX = 2 ** 31 - 1
+
+
+def _count(value):
+    return int(min(INT32_MAX, max(0, round(value))))
+
+
+def topic_profile(topic, duration):
+    """ returns a TopicProfile of a Topic over duration seconds """
+    msg = TopicProfile()
+    msg.topic = topic.name
+    msg.type = topic.msgType or ''
+    msg.delivered_msgs = _count(topic.hz * duration)
+    msg.dropped_msgs = _count(topic.dropped_hz * duration)
+    msg.traffic = _count(topic.bw * duration)
+    if topic.hz > 0:
+        msg.period_mean = rospy.Duration.from_sec(1.0 / topic.hz)
+    return msg
+
+
+def node_profile(node, topics):
+    """ returns a NodeProfile of a Node
+    :param topics: dict of topic name: TopicProfile
+    """
+    msg = NodeProfile()
+    msg.name = node.name
+    msg.uri = node.location or ''
+    msg.pid = node.pid or 0
+    msg.published_topics = [topics[publisher.topic.name] for publisher in node.publishers]
+    msg.subscribed_topics = [topics[subscriber.topic.name] for subscriber in node.subscribers]
+    msg.cpu_load_mean = node.cpu_load_mean
+    msg.cpu_load_std = node.cpu_load_std
+    msg.cpu_load_max = node.cpu_load_max
+    msg.virt_mem_mean = node.virt_mem_mean
+    msg.virt_mem_std = node.virt_mem_std
+    msg.virt_mem_max = node.virt_mem_max
+    msg.real_mem_mean = node.real_mem_mean
+    msg.real_mem_std = node.real_mem_std
+    msg.real_mem_max = node.real_mem_max
+    return msg
+
+
+def host_profiles(rsg, window_start, window_stop):
+    """ returns a HostProfile for every host of a RosSystemGraph, covering
+    the window between the rospy.Time window_start and window_stop """
+    duration = (window_stop - window_start).to_sec()
+    topics = dict((name, topic_profile(topic, duration)) for name, topic in rsg.topics.items())
+    profiles = dict()  # hostname: HostProfile
+    for name in sorted(rsg.nodes):
+        node = rsg.nodes[name]
+        hostname = node.host.name if node.host is not None else ''
+        msg = profiles.get(hostname)
+        if msg is None:
+            msg = profiles[hostname] = HostProfile(hostname=hostname, window_start=window_start,
+                                                   window_stop=window_stop)
+            host = node.host
+            if host is not None and host.cpu_load_mean is not None:
+                msg.cpu_load_mean = host.cpu_load_mean
+                msg.phymem_used_mean = host.phymem_used_mean
+                msg.phymem_avail_mean = host.phymem_avail_mean
+        msg.nodes.append(node_profile(node, topics))
+    return [profiles[name] for name in sorted(profiles)]
+
+
+class ProfilePublisher(object):
+    """ Publishes the HostProfiles of a RosSystemGraph on /profile, at most once every min_interval seconds """
+    def __init__(self, topic='/profile', min_interval=DEFAULT_MIN_INTERVAL):
+        self.min_interval = min_interval
+        self._publisher = rospy.Publisher(topic, HostProfile, queue_size=100)
+        self._last_publish = None
+
+    def publish(self, rsg):
+        """ Publishes the profile of rsg, unless the last one is too recent or nobody listens """
+        now = rospy.get_rostime()
+        if self._last_publish is not None and (now - self._last_publish).to_sec() < self.min_interval:
+            return
+        if self._publisher.get_num_connections() == 0:
+            return
+        window_start = now - rospy.Duration.from_sec(self.min_interval) if self._last_publish is None \
+            else self._last_publish
+        self._last_publish = now
+        for msg in host_profiles(rsg, window_start, now):
+            self._publisher.publish(msg)
+
+    def unregister(self):
+        self._publisher.unregister()
@@ -0,0 +1,73 @@
+# Copyright 2014 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Matching of node and topic names against a quiet list (blacklist).
+
+A quiet list entry is either
+  an exact name           /rosout
+  a namespace             /camera/  or  /camera/*   (everything below /camera)
+  a glob pattern          /rosprofiler_*  or  /robot?/odom
+The entries are compiled once, and the result for each name is remembered,
+so checking a name that was seen before costs a single dictionary lookup.
+"""
+
+import fnmatch
+import re
+
+# Largest number of names whose result is remembered
+MEMO_SIZE = 65536
+
+# The profiling infrastructure itself, which is quiet unless configured otherwise
+DEFAULT_TOPIC_QUIET_LIST = ['/clock', '/topology', '/statistics']
+DEFAULT_NODE_QUIET_LIST = ['/rosout', '/rosgrapher', '/rosprofiler_*', '/rqt_gui_py_node_*']
+
+
+class QuietListMatcher(object):
+    """ Callable returning True for names matched by any quiet list entry """
+    def __init__(self, patterns=()):
+        self.patterns = list(patterns)
+        self._exact = set()
+        self._namespaces = list()
+        globs = list()
+        for pattern in self.patterns:
+            if pattern.endswith("/*") and not any(c in pattern[:-2] for c in "*?["):
+                self._namespaces.append(pattern[:-1])
+            elif pattern.endswith("/"):
+                self._namespaces.append(pattern)
+            elif any(c in pattern for c in "*?["):
+                globs.append(fnmatch.translate(pattern))
+            else:
+                self._exact.add(pattern)
+        self._namespaces = tuple(self._namespaces)
+        self._glob = re.compile("|".join("(?:%s)" % glob for glob in globs)) if globs else None
+        self._memo = dict()  # name: bool
+
+    def __call__(self, name):
+        result = self._memo.get(name)
+        if result is None:
+            result = self._match(name)
+            if len(self._memo) < MEMO_SIZE:
+                self._memo[name] = result
+        return result
+
+    def __contains__(self, name):
+        return self(name)
+
+    def _match(self, name):
+        if name in self._exact:
+            return True
+        if self._namespaces and name.startswith(self._namespaces):
+            return True
+        return self._glob is not None and self._glob.match(name) is not None
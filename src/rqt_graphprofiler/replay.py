@@ -0,0 +1,149 @@
+# Copyright 2014 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Replays recorded /topology and statistics messages into a ROSProfileAdapter.
+
+The messages of a bag file are passed to the adapter's callbacks in the
+order they were recorded, and statistics updates are requested every
+update_interval seconds of recorded time. The ROS clock follows the
+recorded time, so no master is needed and a replay always produces the same
+updates, whether it runs at the recorded speed, N times faster or as fast
+as possible. Durations of the adapter's update methods are collected in
+Timings.
+
+    adapter = ROSProfileAdapter(view, live=False)
+    replay = Replay(adapter, 'profile.bag', speed=None)
+    replay.run()
+    print(replay.timings.summary())
+"""
+
+import time
+
+import numpy as np
+import rosbag
+import rospy
+
+# Seconds of recorded time between statistics updates
+DEFAULT_UPDATE_INTERVAL = 2.0
+
+# topic: name of the ROSProfileAdapter callback receiving its messages
+DEFAULT_TOPICS = {
+    '/topology': '_topology_callback',
+    '/statistics': '_topic_statistics_callback',
+    '/node_statistics': '_node_statistics_callback',
+    '/host_statistics': '_host_statistics_callback',
+}
+
+# Adapter methods timed during a replay
+TIMED_METHODS = ('topology_update', 'statistics_update', '_update_view')
+
+
+def set_ros_time(stamp):
+    """ Makes rospy.get_time() and rospy.get_rostime() return stamp, as a
+    simulated clock would, without a running node """
+    rospy.rostime.set_rostime_initialized(True)
+    rospy.rostime._set_rostime(stamp)
+
+
+class Timings(object):
+    """ Wall clock durations of labelled calls """
+    def __init__(self):
+        self.durations = dict()  # label: list of seconds
+
+    def add(self, label, seconds):
+        self.durations.setdefault(label, list()).append(seconds)
+
+    def wrap(self, obj, method_name, label=None):
+        """ Times every call of a method of obj from now on """
+        label = method_name if label is None else label
+        method = getattr(obj, method_name)
+
+        def timed(*args, **kwargs):
+            start = time.time()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.add(label, time.time() - start)
+        setattr(obj, method_name, timed)
+
+    def summary(self):
+        """ returns one line of call count, total, mean, 95th percentile and maximum per label """
+        lines = ["%-20s %7s %10s %9s %9s %9s" % ("", "calls", "total ms", "mean ms", "p95 ms", "max ms")]
+        for label in sorted(self.durations):
+            durations = np.array(self.durations[label]) * 1000.0
+            lines.append("%-20s %7d %10.1f %9.2f %9.2f %9.2f" % (
+                label, len(durations), durations.sum(), durations.mean(),
+                np.percentile(durations, 95), durations.max()))
+        return "\n".join(lines)
+
+
+class Replay(object):
+    """ Feeds the messages of a bag file to a ROSProfileAdapter created with live=False """
+    def __init__(self, adapter, bag_path, speed=1.0, update_interval=DEFAULT_UPDATE_INTERVAL,
+                 topics=None, on_update=None):
+        """
+        :param speed: recorded seconds replayed per second, None for as fast as possible
+        :param topics: dict of recorded topic: adapter callback name, defaults to DEFAULT_TOPICS
+        :param on_update: called with the recorded time after every statistics update
+        """
+        self._adapter = adapter
+        self.bag_path = bag_path
+        self.speed = speed
+        self.update_interval = update_interval
+        self.topics = DEFAULT_TOPICS if topics is None else topics
+        self.on_update = on_update
+        self.messages = 0
+        self.updates = 0
+        self.timings = Timings()
+        for method_name in TIMED_METHODS:
+            self.timings.wrap(adapter, method_name)
+
+    def _update(self, stamp):
+        set_ros_time(stamp)
+        self._adapter.statistics_update()
+        self.updates += 1
+        if self.on_update is not None:
+            self.on_update(stamp)
+
+    def run(self, start=None, stop=None):
+        """ Replays the messages recorded between the rospy.Time start and stop
+        (None for the beginning and end of the bag)
+        :returns: wall clock seconds the replay took
+        """
+        callbacks = dict((topic, getattr(self._adapter, name)) for topic, name in self.topics.items())
+        wall_start = time.time()
+        first = None
+        next_update = None
+        bag = rosbag.Bag(self.bag_path)
+        try:
+            for topic, msg, stamp in bag.read_messages(topics=list(callbacks), start_time=start, end_time=stop):
+                if first is None:
+                    first = stamp
+                    next_update = first + rospy.Duration(self.update_interval)
+                while stamp >= next_update:
+                    self._update(next_update)
+                    next_update += rospy.Duration(self.update_interval)
+                if self.speed:
+                    delay = (stamp - first).to_sec() / self.speed - (time.time() - wall_start)
+                    if delay > 0:
+                        time.sleep(delay)
+                set_ros_time(stamp)
+                callbacks[topic](msg)
+                self.messages += 1
+        finally:
+            bag.close()
+        if next_update is not None:
+            self._update(next_update)
+        return time.time() - wall_start
@@ -0,0 +1,121 @@
+# Copyright 2014 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Streaming, exponentially decayed statistics.
+
+Each estimate keeps a constant amount of state and is updated once per
+received sample. The weight of a sample halves every half_life seconds of
+message time, so the estimates follow changes smoothly without keeping old
+samples around.
+"""
+
+import math
+
+DEFAULT_HALF_LIFE = 4.0
+
+# Topic connections without samples for this many half lives are forgotten. This
+# is judged by the local time the samples arrived, as the clocks of the hosts
+# reporting them may differ from ours.
+STALE_HALF_LIVES = 4.0
+
+
+class DecayedStatistic(object):
+    """ Exponentially weighted mean, variance and decaying peak of a value """
+    __slots__ = ('mean', 'var', 'peak', 'last_time')
+
+    def __init__(self):
+        self.mean = 0.0
+        self.var = 0.0
+        self.peak = 0.0
+        self.last_time = None
+
+    @property
+    def std(self):
+        return math.sqrt(self.var)
+
+    def update(self, value, time, half_life, peak=None):
+        """ Adds a sample taken at time (in seconds). peak is the largest value
+        seen during the sample, and defaults to value. """
+        peak = value if peak is None else peak
+        if self.last_time is None:
+            self.mean = value
+            self.var = 0.0
+            self.peak = peak
+        else:
+            decay = 0.5 ** (max(time - self.last_time, 0.0) / half_life)
+            alpha = 1.0 - decay
+            diff = value - self.mean
+            increment = alpha * diff
+            self.mean += increment
+            self.var = decay * (self.var + diff * increment)
+            self.peak = max(peak, self.peak * decay)
+        self.last_time = time if self.last_time is None else max(time, self.last_time)
+
+
+class NodeEstimate(object):
+    """ Decayed cpu and memory usage of a node """
+    __slots__ = ('cpu_load', 'virt_mem', 'num_threads')
+
+    def __init__(self):
+        self.cpu_load = DecayedStatistic()
+        self.virt_mem = DecayedStatistic()
+        self.num_threads = 0
+
+    def update(self, time, half_life, threads, cpu_load_mean, cpu_load_max, virt_mem_mean, virt_mem_max):
+        self.num_threads = threads
+        self.cpu_load.update(cpu_load_mean, time, half_life, cpu_load_max)
+        self.virt_mem.update(virt_mem_mean, time, half_life, virt_mem_max)
+
+
+class TopicEstimate(object):
+    """ Decayed message, byte and drop rates of every publisher-subscriber
+    connection of a topic """
+    __slots__ = ('connections',)
+
+    def __init__(self):
+        # (node_pub, node_sub): [hz, bw, dropped DecayedStatistic, local arrival time]
+        self.connections = dict()
+
+    def update(self, time, half_life, node_pub, node_sub, duration, delivered_msgs, traffic, arrival,
+               dropped_msgs=0):
+        """ Adds a sample stamped time by the reporting host, which arrived
+        at the local time arrival (both in seconds) """
+        if duration <= 0:
+            return
+        rates = self.connections.get((node_pub, node_sub))
+        if rates is None:
+            # Connections of a topic are reported from several subscriber threads
+            rates = self.connections.setdefault((node_pub, node_sub),
+                                                [DecayedStatistic(), DecayedStatistic(), DecayedStatistic(), arrival])
+        rates[0].update(delivered_msgs / duration, time, half_life)
+        rates[1].update(traffic / duration, time, half_life)
+        rates[2].update(dropped_msgs / duration, time, half_life)
+        rates[3] = max(rates[3], arrival)
+
+    def rates(self, now, half_life):
+        """ returns the (hz, bw, dropped hz) per subscriber, or None if there
+        are no current connections. Connections without samples arriving for
+        STALE_HALF_LIVES half lives before the local time now are dropped. """
+        for key, (hz, bw, dropped, arrival) in list(self.connections.items()):
+            if now - arrival > STALE_HALF_LIVES * half_life:
+                self.connections.pop(key, None)
+        connections = list(self.connections.items())
+        if len(connections) == 0:
+            return None
+        unique_subs = len(set(node_sub for (node_pub, node_sub), rates in connections))
+        hz = sum(rates[0].mean for key, rates in connections) / unique_subs
+        bw = sum(rates[1].mean for key, rates in connections) / unique_subs
+        dropped = sum(rates[2].mean for key, rates in connections) / unique_subs
+        return hz, bw, dropped
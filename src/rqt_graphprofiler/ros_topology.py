@@ -22,39 +22,182 @@ Renaming Looks like this
   Edge = Topic
   Sink = Subscriber
   Source = Publisher
+
+Hosts are not part of the diarc topology. Each node refers to the Host named
+in its uri, and the graph keeps the hosts that currently run nodes.
 """
 
+try:
+    from urlparse import urlparse
+except ImportError:
+    from urllib.parse import urlparse
+
 from diarc.topology import Topology
 from diarc.topology import Vertex
 from diarc.topology import Edge
 from diarc.topology import Source
 from diarc.topology import Sink
 from diarc.util import typecheck
+from name_index import NameIndex
+
+
+class IndexAllocator(object):
+    """ Hands out unique integers in O(1). Released values are reused before
+    new ones are taken from a counter that starts at start and moves by step.
+    """
+    def __init__(self, start=0, step=1):
+        self._start = start
+        self._step = step
+        self._next = start
+        self._free = list()
+
+    def allocate(self):
+        if len(self._free) > 0:
+            return self._free.pop()
+        value = self._next
+        self._next += self._step
+        return value
+
+    def release(self, value):
+        """ Makes a value available again. None is ignored. """
+        if value is not None:
+            self._free.append(value)
+
+    def reset(self, count=0):
+        """ Forgets released values and continues after the first count values """
+        self._next = self._start + count * self._step
+        del self._free[:]
+
+    @property
+    def fragmentation(self):
+        """ fraction of the values handed out so far that are currently free """
+        issued = (self._next - self._start) // self._step
+        return float(len(self._free)) / issued if issued > 0 else 0.0
+
+
+def hostname_of(uri):
+    """ returns the host name part of a node's XML-RPC uri in lower case, or None """
+    if not uri:
+        return None
+    return urlparse(uri).hostname
+
+
+class Host(object):
+    """ A machine running ROS nodes """
+    def __init__(self, name):
+        self.name = name
+        self.nodes = set()
+        # Averages over the cores of the host, from HostStatistics. None until reported.
+        self.cpu_load_mean = None
+        self.phymem_used_mean = None
+        self.phymem_avail_mean = None
 
 
 class RosSystemGraph(Topology):
     """ Ros version of Topology """
     def __init__(self):
         super(RosSystemGraph, self).__init__()
+        # Search indexes, maintained as nodes and topics come and go
+        self.node_index = NameIndex()
+        self.topic_index = NameIndex()
+        # Name lookups, maintained by the Node and Topic constructors and release()
+        self._nodes = dict()
+        self._topics = dict()
+        self._hosts = dict()
+        # Placement values, reclaimed when nodes and topics are released
+        self.block_indexes = IndexAllocator(0, 1)
+        self.pos_altitudes = IndexAllocator(1, 1)
+        self.neg_altitudes = IndexAllocator(-1, -1)
+        self.pos_ranks = IndexAllocator(1, 1)
+        self.neg_ranks = IndexAllocator(1, 1)
 
     @property
     def nodes(self):
-        """ dictionary of nodes indexed by name """
-        return dict([(v.name, v) for v in self.vertices])
+        """ dictionary of nodes indexed by name. This is the graph's own index,
+        it must not be modified by the caller. """
+        return self._nodes
 
     @property
     def topics(self):
-        """ dictionary of topics indexed by name """
-        return dict(filter(lambda x: None not in x, [(topic.name, topic) for topic in self.edges]))
-
-    def nextFreeNodeIndex(self):
-        """ returns the next available node index """
-        return max(self.blocks.keys()) + 1 if len(self.blocks) > 0 else 0
+        """ dictionary of topics indexed by name. This is the graph's own index,
+        it must not be modified by the caller. """
+        return self._topics
 
-    def nextFreeAltitudes(self):
-        """ returns a 2-tuple of (posAltitude,negAltitude) of the avaliable altitudes """
-        altitudes = [band.altitude for band in self.bands.values()] + [0]
-        return (max(altitudes) + 1, min(altitudes) - 1)
+    @property
+    def hosts(self):
+        """ dictionary of hosts running nodes, indexed by name. This is the
+        graph's own index, it must not be modified by the caller. """
+        return self._hosts
+
+    def find_host(self, hostname):
+        """ returns the Host called hostname, also if only the part before
+        the first dot matches, or None. Host names are not case sensitive. """
+        hostname = hostname.lower() if hostname else hostname
+        host = self._hosts.get(hostname)
+        if host is None and hostname:
+            short = hostname.split('.')[0]
+            for name, candidate in self._hosts.items():
+                if name.split('.')[0] == short:
+                    return candidate
+        return host
+
+    def _move_node(self, node, hostname):
+        """ Moves node from its current host to the one called hostname (None for no host) """
+        if node.host is not None:
+            node.host.nodes.discard(node)
+            if len(node.host.nodes) == 0 and self._hosts.get(node.host.name) is node.host:
+                del self._hosts[node.host.name]
+        node.host = None
+        if hostname is not None:
+            node.host = self._hosts.get(hostname)
+            if node.host is None:
+                node.host = self._hosts[hostname] = Host(hostname)
+            node.host.nodes.add(node)
+
+    def order_blocks(self, key):
+        """ Renumbers block indexes to consecutive values, ordered by key(node).
+        Nodes with equal keys keep their relative order. """
+        nodes = sorted(self.vertices, key=lambda node: (key(node), node.block.index))
+        for node in nodes:
+            node.block.index = None
+        for i, node in enumerate(nodes):
+            node.block.index = i
+        self.block_indexes.reset(len(nodes))
+
+    def fragmentation(self):
+        """ returns the largest fraction of unused block indexes or altitudes """
+        return max(self.block_indexes.fragmentation, self.pos_altitudes.fragmentation, self.neg_altitudes.fragmentation)
+
+    def compact(self):
+        """ Renumbers block indexes, band altitudes and ranks, and snap orders
+        to consecutive values, keeping their relative order.
+        """
+        blocks = sorted([v.block for v in self.vertices], key=lambda block: block.index)
+        pos_bands = sorted([e.posBand for e in self.edges], key=lambda band: band.altitude)
+        neg_bands = sorted([e.negBand for e in self.edges], key=lambda band: -band.altitude)
+        # Unset everything first so that the new values never collide with old ones
+        for block in blocks:
+            block.index = None
+        for band in pos_bands + neg_bands:
+            band.altitude = None
+        for i, block in enumerate(blocks):
+            block.index = i
+        for i, band in enumerate(pos_bands):
+            band.altitude = i + 1
+        for i, band in enumerate(neg_bands):
+            band.altitude = -(i + 1)
+        for bands, ranks in [(pos_bands, self.pos_ranks), (neg_bands, self.neg_ranks)]:
+            bands = sorted(bands, key=lambda band: band.rank)
+            for band in bands:
+                band.rank = None
+            for i, band in enumerate(bands):
+                band.rank = i + 1
+            ranks.reset(len(bands))
+        self.block_indexes.reset(len(blocks))
+        self.pos_altitudes.reset(len(pos_bands))
+        self.neg_altitudes.reset(len(neg_bands))
+        for node in self.vertices:
+            node.compact()
 
 
 class Node(Vertex):
@@ -63,10 +206,13 @@ class Node(Vertex):
         super(Node, self).__init__(rsg)
 
         # dumb placement - just get the next free index
-        self.block.index = rsg.nextFreeNodeIndex()
+        self.block.index = rsg.block_indexes.allocate()
+        self.publisher_orders = IndexAllocator()
+        self.subscriber_orders = IndexAllocator()
 
         self.name = name
-        self.location = None
+        self.host = None
+        self._location = None
         self.pid = None
         self.num_threads = 0
         self.cpu_load_mean = 0
@@ -78,6 +224,42 @@ class Node(Vertex):
         self.real_mem_mean = 0
         self.real_mem_std = 0
         self.real_mem_max = 0
+        # True while the node is missing from the graph but not yet removed
+        self.stale = False
+        rsg.node_index.add(name)
+        if name is not None:
+            rsg._nodes[name] = self
+
+    def release(self):
+        rsg = self._topology
+        rsg.node_index.discard(self.name)
+        if rsg._nodes.get(self.name) is self:
+            del rsg._nodes[self.name]
+        rsg._move_node(self, None)
+        index = self.block.index
+        super(Node, self).release()
+        rsg.block_indexes.release(index)
+
+    @property
+    def location(self):
+        """ XML-RPC uri of the node. Setting it moves the node to the Host in the uri. """
+        return self._location
+
+    @location.setter
+    def location(self, uri):
+        self._location = uri
+        self._topology._move_node(self, hostname_of(uri))
+
+    def compact(self):
+        """ Renumbers the snap orders of this node to consecutive values """
+        for connections, orders in [(self.publishers, self.publisher_orders),
+                                    (self.subscribers, self.subscriber_orders)]:
+            snaps = sorted([c.snap for c in connections], key=lambda snap: snap.order)
+            for snap in snaps:
+                snap.order = None
+            for i, snap in enumerate(snaps):
+                snap.order = i
+            orders.reset(len(snaps))
 
     @property
     def publishers(self):
@@ -101,16 +283,36 @@ class Topic(Edge):
         typecheck(rsg, RosSystemGraph, "rsg")
         super(Topic, self).__init__(rsg)
 
-        # Dumb placement - just get the enxt free altitudes
-        self.posBand.altitude, self.negBand.altitude = rsg.nextFreeAltitudes()
-        self.posBand.rank = self.posBand.altitude
-        self.negBand.rank = self.posBand.altitude
+        # Dumb placement - just get the next free altitudes
+        self.posBand.altitude = rsg.pos_altitudes.allocate()
+        self.negBand.altitude = rsg.neg_altitudes.allocate()
+        self.posBand.rank = rsg.pos_ranks.allocate()
+        self.negBand.rank = rsg.neg_ranks.allocate()
 
         self.name = name
         self.msgType = msgType
 
         self.hz = 0
         self.bw = 0
+        # Messages dropped per second and subscriber
+        self.dropped_hz = 0
+        # True while the topic is missing from the graph but not yet removed
+        self.stale = False
+        rsg.topic_index.add(name)
+        if name is not None:
+            rsg._topics[name] = self
+
+    def release(self):
+        rsg = self._topology
+        rsg.topic_index.discard(self.name)
+        if rsg._topics.get(self.name) is self:
+            del rsg._topics[self.name]
+        # Reordering permutes these values, so reclaim the current ones
+        values = [(rsg.pos_altitudes, self.posBand.altitude), (rsg.neg_altitudes, self.negBand.altitude),
+                  (rsg.pos_ranks, self.posBand.rank), (rsg.neg_ranks, self.negBand.rank)]
+        super(Topic, self).release()
+        for allocator, value in values:
+            allocator.release(value)
 
     @property
     def publishers(self):
@@ -133,11 +335,17 @@ class Publisher(Source):
         typecheck(topic, Topic, "topic")
         super(Publisher, self).__init__(rsg, node, topic)
         # Dumb placement
-        self.snap.order = max(filter(lambda x: isinstance(x, int), [pub.snap.order for pub in node.publishers] + [-1])) + 1
+        self.snap.order = node.publisher_orders.allocate()
 
         self.bandwidth = None
         self.msgType = None
 
+    def release(self):
+        node = self.node
+        order = self.snap.order
+        super(Publisher, self).release()
+        node.publisher_orders.release(order)
+
     @property
     def topic(self):
         """ topic for this publisher """
@@ -160,11 +368,17 @@ class Subscriber(Sink):
         super(Subscriber, self).__init__(rsg, node, topic)
 
         # Dumb placement
-        self.snap.order = max(filter(lambda x: isinstance(x, int), [sub.snap.order for sub in node.subscribers] + [-1])) + 1
+        self.snap.order = node.subscriber_orders.allocate()
 
         self.bandwidth = None
         self.msgType = None
 
+    def release(self):
+        node = self.node
+        order = self.snap.order
+        super(Subscriber, self).release()
+        node.subscriber_orders.release(order)
+
     @property
     def topic(self):
         """ topic for this subscriber """
@@ -14,11 +14,12 @@
 
 from __future__ import print_function
 
-import threading
 import copy
-import math
+import threading
+import time
 import numpy as np
-import random
+import colorsys
+import zlib
 
 import rospy
 from ros_statistics_msgs.msg import HostStatistics
@@ -32,49 +33,112 @@ from rosgraph_msgs.msg import TopicStatistics
 
 # from diarc import topology
 from diarc.base_adapter import BaseAdapter
+from diarc.snapkey import parse_snapkey
 from diarc.view import BlockItemAttributes
 from diarc.view import BandItemAttributes
 from diarc.view import SnapItemAttributes
 import ros_topology as rsg
+from statistics_buffer import StatisticsBuffer
+from statistics_buffer import NODE_FIELDS, TOPIC_FIELDS, HOST_FIELDS
+from statistics_aggregation import aggregate_nodes, aggregate_topics, aggregate_hosts
+from rolling_statistics import NodeEstimate, TopicEstimate, DEFAULT_HALF_LIFE
+from quiet_list import QuietListMatcher
+from topology_reconciler import TopologyReconciler, TopologySnapshot, RemovalGrace, graph_fingerprint
+from group_projection import GroupProjection
+from hot_path import HotPathFilter
+from profile_publisher import ProfilePublisher
+from adaptive_rate import AdaptiveRate
+from change_filter import ShownValues, SignificanceFilter, node_width, topic_width
+import history_store
+
+# Seconds a node or topic missing from /topology is kept, shown as stale, before it is removed
+DEFAULT_REMOVAL_GRACE = 5.0
+
+# Fraction of unused block indexes or band altitudes above which they are renumbered
+COMPACT_FRAGMENTATION = 0.5
+
+# Seconds between log messages summarizing ignored statistics
+FILTER_REPORT_PERIOD = 30.0
+
+# Seconds of history shown in tooltip sparklines
+HISTORY_SPAN = 600.0
+
+
+def _generate_palette(hues=64, shades=((0.45, 0.75), (0.62, 0.65), (0.32, 0.60))):
+    """ Returns a fixed list of "#rrggbb" colors. Hues are spread around the
+    color wheel by the golden ratio so that neighbouring entries are easy to
+    tell apart, and each hue is repeated at several lightness/saturation levels.
+    """
+    palette = list()
+    for lightness, saturation in shades:
+        for i in range(hues):
+            hue = (i * 0.618033988749895) % 1.0
+            r, g, b = colorsys.hls_to_rgb(hue, lightness, saturation)
+            palette.append("#%02x%02x%02x" % (int(r * 255), int(g * 255), int(b * 255)))
+    return palette
+
+
+def _probe_step(name, size):
+    """ returns the distance between probed palette slots for a name, which
+    is coprime to size so that no slot is probed twice """
+    if size < 2:
+        return 1
+    step = 1 + (zlib.adler32(name) & 0xffffffff) % (size - 1)
+    while _gcd(step, size) != 1:
+        step = step % (size - 1) + 1
+    return step
+
+
+def _gcd(a, b):
+    while b:
+        a, b = b, a % b
+    return a
 
 
 class ColorMapper(object):
-    def __init__(self):
-        self._choices = list()
-        # Reds
-        self._choices.extend(["IndianRed", "DarkSalmon", "Crimson"])
-        # Pinks
-        self._choices.extend(["HotPink", "DeepPink"])
-        # Oranges
-        self._choices.extend(["Coral", "OrangeRed", "DarkOrange"])
-        # Yellows
-        self._choices.extend(["Gold", "DarkKhaki"])
-        # Purples
-        self._choices.extend(["Thistle", "Orchid", "MediumPurple", "DarkOrchid", "Purple", "Indigo", "DarkSlateBlue"])
-        # Greens
-        self._choices.extend(["LawnGreen", "LimeGreen", "MediumSeaGreen", "ForestGreen", "OliveDrab", "Olive", "DarkOliveGreen", "DarkCyan"])
-        # Blues
-        self._choices.extend(["PaleTurquoise", "Turquoise", "CadetBlue", "SteelBlue", "DodgerBlue"])
-        # Browns
-#         self._choices.extend(["Cornsilk","Tan","RosyBrown","SandyBrown","Goldenrod","DarkGoldenrod","SaddleBrown"])
-        self._used_colors = dict()
+    """ Maps names to colors that stay the same while the name is shown.
+    A name's preferred palette slot is the crc32 of the name, so a name whose
+    preferred slot is free gets the same color in every session. Otherwise
+    up to MAX_PROBES further slots are tried, stepping by a second hash
+    (adler32) of the name. The probe sequence depends on the name only, but
+    which of its slots is free depends on the names shown before it, so the
+    color of a colliding name can differ between sessions. If all probed
+    slots are taken, the name shares its preferred color. Releasing a name
+    never changes the color of any other name.
+    """
+    MAX_PROBES = 8
+
+    def __init__(self, palette=None):
+        self._palette = palette if palette is not None else _generate_palette()
+        self._slot_owner = [None] * len(self._palette)
+        self._used_colors = dict()  # name: palette slot
 
     def get_unique_color(self, name):
-        if name not in self._used_colors:
-            if len(self._choices) > 0:
-                self._used_colors[name] = random.choice(self._choices)
-                self._choices.remove(self._used_colors[name])
-            else:
-                self._used_colors[name] = "Gray"
-        return self._used_colors[name]
+        slot = self._used_colors.get(name)
+        if slot is None:
+            slot = self._assign_slot(name)
+        return self._palette[slot]
+
+    def _assign_slot(self, name):
+        size = len(self._palette)
+        preferred = (zlib.crc32(name) & 0xffffffff) % size
+        step = _probe_step(name, size)
+        slot = preferred
+        for probe in range(min(self.MAX_PROBES, size)):
+            candidate = (preferred + probe * step) % size
+            if self._slot_owner[candidate] is None:
+                self._slot_owner[candidate] = name
+                slot = candidate
+                break
+        self._used_colors[name] = slot
+        return slot
 
     def release_unique_color(self, name):
-        if name in self._used_colors:
-            if not self._used_colors[name] == "Gray":
-                self._choices.append(self._used_colors[name])
-            self._used_colors.pop(name)
-        else:
+        slot = self._used_colors.pop(name, None)
+        if slot is None:
             rospy.logwarn("Unknown name mapped to color!")
+        elif self._slot_owner[slot] == name:
+            self._slot_owner[slot] = None
 
 
 class ROSProfileAdapter(BaseAdapter):
@@ -84,62 +148,189 @@ class ROSProfileAdapter(BaseAdapter):
     Publishes this combined information as /profile
     """
 
-    def __init__(self, view):
+    def __init__(self, view, live=True):
+        """ With live False nothing is subscribed and no timer is started;
+        messages are passed to the callbacks and updates are requested by the
+        caller instead, for example when replaying a recording. With view
+        None only the model is kept up to date, nothing is drawn. """
         super(ROSProfileAdapter, self).__init__(rsg.RosSystemGraph(), view)
+        self._live = live
         self._topology.hide_disconnected_snaps = True
 
         self._colormapper = ColorMapper()
+        # Serializes changes to the model. Topology updates come from the /topology
+        # subscriber, the statistics timer and the GUI, and reentrant calls are
+        # made while holding it, like topology_update() from statistics_update().
+        self._lock = threading.RLock()
+        self._reconciler = TopologyReconciler(self._topology)
+        # Collapses namespaces or hosts into single blocks before reconciling
+        self._projection = GroupProjection()
+        # Optionally shows only the heaviest topics and nodes and their neighbours
+        self._hot_path = HotPathFilter()
+        self._removal_grace = RemovalGrace(seconds=DEFAULT_REMOVAL_GRACE)
+        self._stale_nodes = set()
+        self._stale_topics = set()
         # Determines whether or not to update the visualization when new data is received
         self._auto_update = True
 
         self._TOPIC_QUIET_LIST = list()
         self._NODE_QUIET_LIST = list()
+        self._topic_quiet = QuietListMatcher()
+        self._node_quiet = QuietListMatcher()
+        # Statistics dropped since the last summary was logged
+        self._ignored_topic_statistics = 0
+        self._ignored_node_statistics = 0
+        self._untracked_statistics = set()
+        # Set by the first update, the clock of a replay only starts with its first message
+        self._last_filter_report = None
 
         # Data Buffers
         # To improve accuracy, we hold onto data in the buffer for two evaluation
         # periods (length of statistics timer). So we buffer the buffer...
         self._last_topology_received = Graph()
-        self._node_statistics_buffer = dict()  # name: list(NodeStatistics())
-        self._host_statistics_buffer = dict()  # hostname: list(HostStatistics())
-        self._topic_statistics_buffer = dict()  # hostname: list(TopicStatistics()
-        self._previous_node_statistics_buffer = dict()
-        self._previous_host_statistics_buffer = dict()
-        self._previous_topic_statistics_buffer = dict()
+        # Fingerprint of the graph and quiet lists the model was last updated with
+        self._applied_topology_fingerprint = None
+        # Number of /topology messages received, and ignored because nothing had changed
+        self._topology_messages = 0
+        self.skipped_topology_messages = 0
+        self._node_statistics_buffer = StatisticsBuffer(NODE_FIELDS)  # name: ring of NodeStatistics fields
+        self._host_statistics_buffer = StatisticsBuffer(HOST_FIELDS)  # hostname: ring of HostStatistics fields
+        self._topic_statistics_buffer = StatisticsBuffer(TOPIC_FIELDS)  # topic: ring of TopicStatistics fields
+        self._previous_node_statistics = dict()  # name: record array drained last update
+        self._previous_host_statistics = dict()
+        self._previous_topic_statistics = dict()
+
+        # Statistics are either combined over the last two timer periods ('window')
+        # or exponentially decayed as each message arrives ('decay')
+        self._statistics_mode = 'window'
+        self._half_life = DEFAULT_HALF_LIFE
+        self._node_estimates = dict()  # name: NodeEstimate
+        self._topic_estimates = dict()  # name: TopicEstimate
+        # Set when samples buffered in the previous mode are to be dropped
+        self._discard_buffered_statistics = False
+
+        # The model always holds the latest statistics, but only items whose
+        # drawn values changed significantly get new attributes, and the layout
+        # is relinked only if a width changed.
+        self._shown_nodes = ShownValues()
+        self._shown_topics = ShownValues()
+        self._changed_nodes = set()
+        self._changed_topics = set()
+        self._relayout_needed = False
+
+        # Optional on-disk time series of the aggregated statistics
+        self._history = None
+        self._host_load = dict()  # reported hostname: (cpu_load_mean, phymem_used_mean, phymem_avail_mean)
+
+        # Keeps the nodes of each host next to each other, under a header
+        self._group_by_host = False
+        self._group_headers = list()  # last sent to the view
+
+        # Called with the RosSystemGraph and the time after every statistics update
+        self._statistics_listener = None
 
         # Callbacks
-        self.node_statistics_subscriber = rospy.Subscriber('/node_statistics', NodeStatistics, self._node_statistics_callback)
-        self.topic_statistics_subscriber = rospy.Subscriber('/statistics', TopicStatistics, self._topic_statistics_callback)
-        self.host_statistics_subscriber = rospy.Subscriber('/host_statistics', HostStatistics, self._host_statistics_callback)
-        self.topology_subscriber = rospy.Subscriber('/topology', Graph, self._topology_callback)
-        self._lock = threading.Lock()
+        if live:
+            self.node_statistics_subscriber = rospy.Subscriber('/node_statistics', NodeStatistics, self._node_statistics_callback)
+            self.topic_statistics_subscriber = rospy.Subscriber('/statistics', TopicStatistics, self._topic_statistics_callback)
+            self.host_statistics_subscriber = rospy.Subscriber('/host_statistics', HostStatistics, self._host_statistics_callback)
+            self.topology_subscriber = rospy.Subscriber('/topology', Graph, self._topology_callback)
+        # Republishes the aggregated statistics for other tools
+        self._profile_publisher = ProfilePublisher() if live else None
 
         # Timers
-        self._stats_timer = rospy.Timer(rospy.Duration(2.0), lambda x: self.statistics_update())
+        # The statistics timer is a one shot timer, re-armed after every update
+        # with an interval adapted to how long the update took.
+        self._refresh_rate = AdaptiveRate()
+        self._stats_timer = None
+        self._schedule_statistics_update()
 
     def set_topic_quiet_list(self, topic_names):
         rospy.loginfo("Updating topic quiet list to %r" % topic_names)
         self._TOPIC_QUIET_LIST = copy.copy(topic_names)
+        self._topic_quiet = QuietListMatcher(topic_names)
 
     def get_topic_quiet_list(self):
         return copy.copy(self._TOPIC_QUIET_LIST)
 
     def set_node_quiet_list(self, node_names):
         self._NODE_QUIET_LIST = copy.copy(node_names)
+        self._node_quiet = QuietListMatcher(node_names)
 
     def get_node_quiet_list(self):
         return copy.copy(self._NODE_QUIET_LIST)
 
+    def set_removal_grace(self, seconds=None, messages=None):
+        """ Sets how long nodes and topics that disappear from /topology are
+        kept, shown as stale, before they are removed: for seconds, for a
+        number of /topology messages, or until either limit is reached.
+        Without any limit they are removed immediately. """
+        self._removal_grace.seconds = seconds
+        self._removal_grace.messages = messages
+
     def enable_auto_update(self):
         """ Automatically update the visualization when information is received """
         self._auto_update = True
-        self._stats_timer = rospy.Timer(rospy.Duration(2.0), lambda x: self.statistics_update())
+        self._schedule_statistics_update()
 
     def disable_auto_update(self):
         """ buffer information received from ROS, but do not automatically update the visualization """
         self._auto_update = False
-        self._stats_timer.shutdown()
+        if self._stats_timer is not None:
+            self._stats_timer.shutdown()
         self._stats_timer = None
 
+    def set_refresh_bounds(self, min_interval=None, max_interval=None, target_fraction=None):
+        """ Configures the automatic statistics refresh. The interval between
+        refreshes stays within [min_interval, max_interval] seconds and is chosen
+        so that refreshing takes about target_fraction of the time. """
+        if min_interval is not None:
+            self._refresh_rate.min_interval = min_interval
+        if max_interval is not None:
+            self._refresh_rate.max_interval = max_interval
+        if target_fraction is not None:
+            self._refresh_rate.target_fraction = target_fraction
+
+    def get_refresh_interval(self):
+        """ returns (interval between refreshes, duration of the last refresh) in seconds """
+        return self._refresh_rate.interval, self._refresh_rate.last_cost
+
+    def _schedule_statistics_update(self):
+        if not self._live:
+            return
+        if self._stats_timer is not None:
+            self._stats_timer.shutdown()
+        self._stats_timer = rospy.Timer(rospy.Duration(self._refresh_rate.interval),
+                                        self._statistics_timer_callback, oneshot=True)
+
+    def _statistics_timer_callback(self, event):
+        start = time.time()
+        self.statistics_update()
+        self._refresh_rate.record(time.time() - start)
+        if self._auto_update:
+            self._schedule_statistics_update()
+
+    def set_statistics_mode(self, mode, half_life=None):
+        """ Selects how statistics are combined over time.
+        'window' combines all samples received during the last two updates.
+        'decay' keeps exponentially weighted averages that are updated as each
+        message arrives, where a sample's weight halves every half_life seconds.
+        """
+        if mode not in ['window', 'decay']:
+            raise Exception("Unknown statistics mode '%s'" % mode)
+        rospy.loginfo("Using '%s' statistics" % mode)
+        self._statistics_mode = mode
+        if half_life is not None:
+            self._half_life = float(half_life)
+        self._node_estimates.clear()
+        self._topic_estimates.clear()
+        # The buffers have a single reader, the thread doing the statistics
+        # updates, so the next update discards what they hold
+        self._discard_buffered_statistics = True
+
+    def get_statistics_mode(self):
+        return self._statistics_mode
+
     def show_disconnected_topics(self):
         self._topology.hide_disconnected_snaps = False
         self.topology_update()
@@ -148,6 +339,49 @@ class ROSProfileAdapter(BaseAdapter):
         self._topology.hide_disconnected_snaps = True
         self.topology_update()
 
+    def search(self, text, limit=20):
+        """ Returns up to limit (kind, name) tuples of nodes and topics matching
+        text, where kind is either 'node' or 'topic'. """
+        nodes = self._topology.node_index.search(text, limit)
+        topics = self._topology.topic_index.search(text, limit)
+        return ([("node", name) for name in nodes] + [("topic", name) for name in topics])[:limit]
+
+    def show_node(self, name):
+        """ Centers the view on a node and highlights its snaps, without relinking """
+        node = self._topology.nodes.get(self._projection.vertex_of(name))
+        if node is None or not isinstance(node.block.index, int):
+            return False
+        self._view.center_on_block_item(node.block.index)
+        self._view.highlight_snap_items(self._visible_snapkeys(node.publishers + node.subscribers))
+        return True
+
+    def show_topic(self, name):
+        """ Centers the view on a topic's band and highlights the snaps connected to it """
+        topic = self._topology.topics.get(name)
+        if topic is None:
+            return False
+        snapkeys = self._visible_snapkeys(topic.publishers + topic.subscribers)
+        altitudes = [band.altitude for band in [topic.posBand, topic.negBand] if self._view.has_band_item(band.altitude)]
+        if len(altitudes) > 0:
+            self._view.center_on_band_item(altitudes[0])
+        elif len(snapkeys) > 0:
+            self._view.center_on_block_item(parse_snapkey(snapkeys[0])[0])
+        else:
+            return False
+        self._view.highlight_snap_items(snapkeys)
+        return True
+
+    def _visible_snapkeys(self, connections):
+        """ returns snapkeys of the connections' snaps that are drawn in the view """
+        snapkeys = list()
+        for connection in connections:
+            snap = connection.snap
+            if isinstance(snap.order, int) and isinstance(snap.block.index, int):
+                snapkey = snap.snapkey()
+                if self._view.has_snap_item(snapkey):
+                    snapkeys.append(snapkey)
+        return snapkeys
+
     def _node_statistics_callback(self, data):
         """ Buffers NodeStatistics data """
 #         latency = rospy.get_rostime() - data.window_stop
@@ -156,165 +390,387 @@ class ROSProfileAdapter(BaseAdapter):
 #         if margin.to_sec() > 0:
 #             rospy.logerr("Data from '%s' too old by %f secs"%(data.node,-margin.to_sec()))
 #             return
-        # If we have not collected any data from this node yet, initialize the node's buffer
-        if data.node not in self._node_statistics_buffer:
-            self._node_statistics_buffer[data.node] = list()
-        self._node_statistics_buffer[data.node].append(data)
+        if self._node_quiet(data.node):
+            self._ignored_node_statistics += 1
+            return
+        if self._statistics_mode == 'decay':
+            estimate = self._node_estimates.get(data.node)
+            if estimate is None:
+                estimate = self._node_estimates.setdefault(data.node, NodeEstimate())
+            estimate.update(data.window_stop.to_sec(), self._half_life, data.threads,
+                            data.cpu_load_mean, data.cpu_load_max, data.virt_mem_mean, data.virt_mem_max)
+            return
+        self._node_statistics_buffer.append(data.node, (
+            data.samples, data.threads,
+            data.cpu_load_mean, data.cpu_load_std, data.cpu_load_max,
+            data.virt_mem_mean, data.virt_mem_std, data.virt_mem_max))
 
     def _topic_statistics_callback(self, data):
         """ Buffers TopicStatistics data """
+        if self._topic_quiet(data.topic):
+            self._ignored_topic_statistics += 1
+            return
+        if self._statistics_mode == 'decay':
+            estimate = self._topic_estimates.get(data.topic)
+            if estimate is None:
+                estimate = self._topic_estimates.setdefault(data.topic, TopicEstimate())
+            stop = data.window_stop.to_sec()
+            estimate.update(stop, self._half_life, data.node_pub, data.node_sub,
+                            stop - data.window_start.to_sec(), data.delivered_msgs, data.traffic,
+                            rospy.get_time(), data.dropped_msgs)
+            return
         # Buffer Topic Statistics Data.
-        if data.topic not in self._topic_statistics_buffer:
-            self._topic_statistics_buffer[data.topic] = list()
-        self._topic_statistics_buffer[data.topic].append(data)
+        buf = self._topic_statistics_buffer
+        buf.append(data.topic, (
+            data.window_start.to_sec(), data.window_stop.to_sec(),
+            data.delivered_msgs, data.dropped_msgs, data.traffic, buf.symbol(data.node_sub)))
 
     def _host_statistics_callback(self, data):
         """ Buffers HostStatistics data """
         # This information is useful for drawing NodeStatistics information
-        # in context to nodes running on other machines
-        if data.hostname not in self._host_statistics_buffer:
-            self._host_statistics_buffer[data.hostname] = list()
-        self._host_statistics_buffer[data.hostname].append(data)
+        # in context to nodes running on other machines. Per core cpu values
+        # are reduced to a single number for the host.
+        self._host_statistics_buffer.append(data.hostname, (
+            data.window_start.to_sec(), data.window_stop.to_sec(), data.samples,
+            np.mean(data.cpu_load_mean) if len(data.cpu_load_mean) > 0 else 0.0,
+            np.max(data.cpu_load_max) if len(data.cpu_load_max) > 0 else 0.0,
+            data.phymem_used_mean, data.phymem_avail_mean))
 
     def _topology_callback(self, data):
-        self._last_topology_received = copy.copy(data)
+        self._topology_messages += 1
+        # rospy does not reuse message instances, so keeping a reference is safe.
+        # Every message is kept, so that a later update applies the latest graph
+        # even if this one is not applied now.
+        self._last_topology_received = data
+        # Most messages repeat the previous graph, which needs no reconciliation or
+        # redraw, unless stale entities might have to be removed now
+        if graph_fingerprint(data, self._NODE_QUIET_LIST, self._TOPIC_QUIET_LIST) == self._applied_topology_fingerprint \
+                and not self._removal_grace.pending():
+            self.skipped_topology_messages += 1
+            return
         if self._auto_update:
             self.topology_update()
 
     def topology_update(self):
         """ Updates the model with current topology information """
-        data = self._last_topology_received
+        with self._lock:
+            reported = TopologySnapshot.from_graph(self._last_topology_received,
+                                                   ignore_node=self._node_quiet,
+                                                   ignore_topic=self._topic_quiet)
+            projected = self._projection.project(self._hot_path.apply(reported))
+            desired, stale_nodes, stale_topics = self._removal_grace.retain(
+                projected, self._reconciler.applied, rospy.get_time(), self._topology_messages,
+                ignore_node=self._regrouped_or_quiet_node, ignore_topic=self._hidden_or_quiet_topic)
+            changes = self._reconciler.reconcile(desired)
+            self._mark_stale(stale_nodes, stale_topics)
+            self._applied_topology_fingerprint = graph_fingerprint(self._last_topology_received,
+                                                                   self._NODE_QUIET_LIST, self._TOPIC_QUIET_LIST)
+            # Nodes and topics hidden in a collapsed group still exist and keep their statistics
+            for name in changes.removed_topics:
+                self._shown_topics.forget(name)
+                if name in reported.topics:
+                    continue
+                self._colormapper.release_unique_color(name)
+                self._topic_estimates.pop(name, None)
+                self._topic_statistics_buffer.discard(name)
+            for name in changes.removed_nodes:
+                self._shown_nodes.forget(name)
+                if name in reported.nodes:
+                    continue
+                self._node_estimates.pop(name, None)
+                self._node_statistics_buffer.discard(name)
+            if not changes.empty():
+                rospy.loginfo("Topology changed: %s" % changes.summary())
+            if (changes.removed_nodes or changes.removed_topics) and self._topology.fragmentation() > COMPACT_FRAGMENTATION:
+                rospy.logdebug("Compacting block indexes and band altitudes")
+                self._topology.compact()
+            if self._group_by_host and (changes.added_nodes or changes.moved_nodes):
+                self._order_blocks_by_host()
+            self._update_view()
+
+    def _regrouped_or_quiet_node(self, name):
+        # Nodes leaving the graph only because of the grouping go without a grace period
+        return self._node_quiet(name) or self._hot_path.hides_node(name) or self._projection.regrouped(name)
+
+    def _hidden_or_quiet_topic(self, name):
+        return self._topic_quiet(name) or self._hot_path.hides_topic(name) or self._projection.hides_topic(name)
+
+    def set_hot_path(self, k, topic_metric=None, node_metric=None):
+        """ Shows only the k topics with the highest topic_metric ('bw' or
+        'hz'), the k nodes with the highest node_metric ('cpu_load_mean' or
+        'virt_mem_mean') and their direct neighbours. k None shows everything.
+        The selection follows the statistics of every update. """
+        with self._lock:
+            self._hot_path.configure(k, topic_metric, node_metric)
+            self._hot_path.rank()
+            self.topology_update()
 
-        # Remove any topics from Ros System Graph not currently known by the profiling system
-        rsgTopics = self._topology.topics
-        allCurrentTopicNames = [t.name for t in data.topics]
-        for topic in rsgTopics.values():
-            if topic.name in self._TOPIC_QUIET_LIST:
-                print("Removing Topic", topic.name, "found in quiet list")
-                self._colormapper.release_unique_color(topic.name)
-                topic.release()
-            elif topic.name not in allCurrentTopicNames:
-                print("Removing Topic", topic.name, "not found in ", allCurrentTopicNames)
-                self._colormapper.release_unique_color(topic.name)
-                topic.release()
-
-        # Add any topics not currently in the Ros System Graph
-        for topic in data.topics:
-            if topic.name not in rsgTopics and topic.name not in self._TOPIC_QUIET_LIST:
-                topic = rsg.Topic(self._topology, topic.name, topic.type)
-
-        # Get all the nodes we currently know about
-        rsgNodes = self._topology.nodes
+    def get_hot_path(self):
+        """ returns (k, topic metric, node metric) """
+        return self._hot_path.k, self._hot_path.topic_metric, self._hot_path.node_metric
 
-        # Remove any nodes from RosSystemGraph not currently known to master
-        allCurrentNodeNames = [n.name for n in data.nodes]
-        for node in rsgNodes.values():
-            if node.name in self._NODE_QUIET_LIST:
-                print("Removing node", node.name, "found on quiet list")
-                node.release()
-            elif node.name not in allCurrentNodeNames:
-                print("Removing Node", node.name, "not found in ", allCurrentNodeNames)
-                node.release()
-                # TODO: Remove any of the nodes publishers or subscribers now
-
-        # Add any nodes not currently in the Ros System Graph
-        for node in data.nodes:
-            # Skip any nodes that are on the quiet list
-            if node.name in self._NODE_QUIET_LIST:
-                continue
-            rsg_node = None
-            if node.name not in rsgNodes:  # and name not in QUIET_NAMES:
-                rsg_node = rsg.Node(self._topology, node.name)
-                rsg_node.location = node.uri
+    def set_collapse_mode(self, mode, depth=None):
+        """ Collapses the nodes of each namespace (mode 'namespace', using
+        the first depth levels of the namespace) or host (mode 'host') into
+        one block. None shows every node. All groups start out collapsed. """
+        with self._lock:
+            self._projection.set_mode(mode, depth)
+            self.topology_update()
+
+    def get_collapse_mode(self):
+        return self._projection.mode
+
+    def activate_block(self, index):
+        """ Expands the group of a collapsed block, or collapses the group
+        of a block that is a member of an expanded group """
+        with self._lock:
+            node = None
+            for candidate in self._topology.nodes.values():
+                if candidate.block.index == index:
+                    node = candidate
+                    break
+            if node is None:
+                return
+            if self._projection.members(node.name) is not None:
+                self._projection.expand(node.name)
+            else:
+                group = self._projection.group_of(node.name)
+                if group is None:
+                    return
+                self._projection.collapse(group)
+            self.topology_update()
+
+    def set_group_by_host(self, enabled):
+        """ Places the nodes running on the same host next to each other,
+        under a header showing the load of the host """
+        with self._lock:
+            self._group_by_host = enabled
+            if enabled:
+                self._order_blocks_by_host()
+            self._update_view()
+
+    def get_group_by_host(self):
+        return self._group_by_host
+
+    def _order_blocks_by_host(self):
+        # Nodes with unknown hosts go first
+        self._topology.order_blocks(lambda node: node.host.name if node.host is not None else "")
+
+    def _update_view(self):
+        if self._view is None:
+            return
+        super(ROSProfileAdapter, self)._update_view()
+        self._update_group_headers()
+
+    def _update_group_headers(self):
+        """ Sends the view a header for every run of adjacent nodes on the same host """
+        if self._view is None:
+            return
+        if not self._group_by_host:
+            if len(self._group_headers) > 0:
+                self._view.set_block_group_headers([])
+                self._group_headers = list()
+            return
+        runs = list()  # [host, first index, last index]
+        for index, node in sorted((node.block.index, node) for node in self._topology.nodes.values()):
+            if len(runs) > 0 and runs[-1][0] is node.host:
+                runs[-1][2] = index
             else:
-                rsg_node = self._topology.nodes[node.name]
-                if not rsg_node.location == node.uri:
-                    rospy.logerr("rsg_node and data.node uri's do not match for name %s" % node.name)
-
-            # Filter published and subscribed topics we are ignoring
-            publishes_list = [p for p in node.publishes if p not in self._TOPIC_QUIET_LIST]
-            subscribes_list = [s for s in node.subscribes if s not in self._TOPIC_QUIET_LIST]
-
-            # Add and remove publishers for this node only
-            # Compile two dictionaries, one of existing topics and one of the most recently
-            # reported topics. Remove existing publishers that are not mentioned in the
-            # current list, add publishers that not in the existing list but in the current list,
-            # and update publishers that occur in both lists.
-            existing_rsg_node_pub_topics = dict([(publisher.topic.name, publisher) for publisher in rsg_node.publishers])
-            current_node_prof_pub_topics = dict([(topic_name, self._topology.topics[topic_name]) for topic_name in publishes_list])
-            for existing_topic_name in existing_rsg_node_pub_topics.keys():
-                # Remove Publisher
-                if existing_topic_name not in current_node_prof_pub_topics.keys():
-                    existing_rsg_node_pub_topics[existing_topic_name].release()
-            for current_topic_name in current_node_prof_pub_topics.keys():
-                # Add Publisher
-                if current_topic_name not in existing_rsg_node_pub_topics.keys():
-                    publisher = rsg.Publisher(self._topology, rsg_node, current_node_prof_pub_topics[current_topic_name])
-
-            # Add and remove subscribers for this node only.
-            # This follows the same patteren as the publishers above.
-            existing_rsg_node_sub_topics = dict([(subscriber.topic.name, subscriber) for subscriber in rsg_node.subscribers])
-            current_node_prof_sub_topics = dict([(topic_name, self._topology.topics[topic_name]) for topic_name in subscribes_list])
-            for existing_topic_name in existing_rsg_node_sub_topics.keys():
-                # Remove Subscriber
-                if existing_topic_name not in current_node_prof_sub_topics.keys():
-                    existing_rsg_node_sub_topics[existing_topic_name].release()
-            for current_topic_name in current_node_prof_sub_topics.keys():
-                # Add Subscriber
-                if current_topic_name not in existing_rsg_node_sub_topics.keys():
-                    subscriber = rsg.Subscriber(self._topology, rsg_node, current_node_prof_sub_topics[current_topic_name])
-
-        self._update_view()
+                runs.append([node.host, index, index])
+        headers = [(first, last) + self._host_header(host) for host, first, last in runs if host is not None]
+        # Called on every statistics update, while headers rarely change
+        if headers != self._group_headers:
+            self._view.set_block_group_headers(headers)
+            self._group_headers = headers
+
+    def _host_header(self, host):
+        """ returns the (label, tooltip) of the header of a host """
+        node_cpu = sum(node.cpu_load_mean for node in host.nodes)
+        node_mem = sum(node.virt_mem_mean for node in host.nodes)
+        tooltip = "Host:\t%s\nNodes:\t%d\nNode CPU:\t%d\nNode MEM:\t%s" % (
+            host.name, len(host.nodes), node_cpu, sizeof_fmt(node_mem))
+        if host.cpu_load_mean is None:
+            return "%s  CPU: %d" % (host.name, node_cpu), tooltip
+        total = host.phymem_used_mean + host.phymem_avail_mean
+        tooltip += "\nHost CPU:\t%d%%\nHost MEM:\t%s / %s" % (
+            host.cpu_load_mean, sizeof_fmt(host.phymem_used_mean), sizeof_fmt(total))
+        label = "%s  CPU: %d%%  MEM: %s / %s" % (
+            host.name, host.cpu_load_mean, sizeof_fmt(host.phymem_used_mean), sizeof_fmt(total))
+        return label, tooltip
+
+    def _mark_stale(self, stale_nodes, stale_topics):
+        """ Flags the nodes and topics kept during their removal grace period """
+        nodes = self._topology.nodes
+        topics = self._topology.topics
+        for names, previous, entities in [(stale_nodes, self._stale_nodes, nodes),
+                                          (stale_topics, self._stale_topics, topics)]:
+            for name in previous - names:
+                if name in entities:
+                    entities[name].stale = False
+            for name in names:
+                entities[name].stale = True
+        self._stale_nodes = stale_nodes
+        self._stale_topics = stale_topics
 
     def statistics_update(self):
         """ Updates the model with current statistics information """
-        rospy.logdebug("Updating Statistics")
-        # Combine current buffers with previous buffers for evaluation
-        node_statistics_buffer = dict(self._node_statistics_buffer.items() + self._previous_node_statistics_buffer.items())
-        host_statistics_buffer = dict(self._host_statistics_buffer.items() + self._previous_host_statistics_buffer.items())
-        topic_statistics_buffer = dict(self._topic_statistics_buffer.items() + self._previous_topic_statistics_buffer.items())
+        with self._lock:
+            rospy.logdebug("Updating Statistics")
+            if self._discard_buffered_statistics:
+                self._discard_buffered_statistics = False
+                self._node_statistics_buffer.drain()
+                self._topic_statistics_buffer.drain()
+                self._previous_node_statistics = dict()
+                self._previous_topic_statistics = dict()
+            if self._statistics_mode == 'decay':
+                self._read_decayed_statistics()
+            else:
+                self._aggregate_window_statistics()
+            self._aggregate_host_statistics()
+            if self._history is not None:
+                self._history.flush()
+            self._report_filtered_statistics()
+            if self._profile_publisher is not None:
+                self._profile_publisher.publish(self._topology)
+            # Stale entities whose grace ran out are removed even while no new
+            # graph message arrives, as is a new hot path selection
+            if (self._hot_path.rank() or self._removal_grace.expired(rospy.get_time())) and self._auto_update:
+                self.topology_update()
+            elif self._relayout_needed:
+                self._update_view()
+            else:
+                self._push_changed_attributes()
+                self._update_group_headers()
+            self._changed_nodes.clear()
+            self._changed_topics.clear()
+            self._relayout_needed = False
+            if self._statistics_listener is not None:
+                self._statistics_listener(self._topology, rospy.get_time())
+
+    def set_statistics_listener(self, listener):
+        """ Calls listener(RosSystemGraph, time in seconds) after every
+        statistics update, in the thread doing the update. None for no listener. """
+        self._statistics_listener = listener
+
+    def set_history_store(self, store):
+        """ Records the aggregated statistics of every update in a
+        history_store.HistoryStore, and adds sparklines of the recent history to
+        tooltips. None stops recording. """
+        self._history = store
+
+    def get_history_store(self):
+        return self._history
+
+    def _record_history(self, kind, name, now, **values):
+        if self._history is not None:
+            self._history.append(kind, name, history_store.record(now, **values))
+
+    def set_significance_thresholds(self, thresholds):
+        """ Sets the change needed before a new statistic is redrawn.
+        :param dict thresholds: metric name: (absolute, relative) change
+        """
+        significance = SignificanceFilter(thresholds)
+        self._shown_nodes.significance = significance
+        self._shown_topics.significance = significance
+
+    def _update_node(self, node, num_threads, cpu_load, virt_mem):
+        """ Stores the statistics of a node, recording whether its item must be redrawn """
+        node.num_threads = num_threads
+        node.cpu_load_mean = cpu_load
+        node.virt_mem_mean = virt_mem
+        width = self._shown_nodes.value(node.name, 'width')
+        relayout = width is not None and node_width(virt_mem) != width
+        if relayout or self._shown_nodes.changed(node.name, num_threads=num_threads, cpu_load_mean=cpu_load,
+                                                 virt_mem_mean=virt_mem):
+            self._changed_nodes.add(node.name)
+            self._relayout_needed |= relayout
+
+    def _update_topic(self, topic, hz, bw):
+        """ Stores the statistics of a topic, recording whether its item must be redrawn """
+        topic.hz = hz
+        topic.bw = bw
+        width = self._shown_topics.value(topic.name, 'width')
+        relayout = width is not None and topic_width(bw) != width
+        if relayout or self._shown_topics.changed(topic.name, hz=hz, bw=bw):
+            self._changed_topics.add(topic.name)
+            self._relayout_needed |= relayout
+
+    def _push_changed_attributes(self):
+        """ Sends new attributes to the view items of changed nodes and topics only """
+        if self._view is None:
+            return
+        nodes = self._topology.nodes
+        for name in self._changed_nodes:
+            node = nodes.get(name)
+            if node is None or not self._view.has_block_item(node.block.index):
+                continue
+            self._view.set_block_item_attributes(node.block.index, self._block_attributes(node.block))
+        topics = self._topology.topics
+        for name in self._changed_topics:
+            topic = topics.get(name)
+            if topic is None:
+                continue
+            for band in [topic.posBand, topic.negBand]:
+                if self._view.has_band_item(band.altitude):
+                    self._view.set_band_item_attributes(band.altitude, self._band_attributes(band))
+
+    def _report_filtered_statistics(self):
+        """ Periodically logs how many statistics messages were ignored """
+        now = rospy.get_time()
+        if self._last_filter_report is None:
+            self._last_filter_report = now
+        if now - self._last_filter_report < FILTER_REPORT_PERIOD:
+            return
+        if self._ignored_node_statistics or self._ignored_topic_statistics or self._untracked_statistics:
+            rospy.loginfo("Ignored %d statistics messages of quiet listed nodes and %d of quiet listed topics, "
+                          "and statistics of %d untracked nodes or topics in the last %.0f seconds" %
+                          (self._ignored_node_statistics, self._ignored_topic_statistics,
+                           len(self._untracked_statistics), now - self._last_filter_report))
+        self._ignored_node_statistics = 0
+        self._ignored_topic_statistics = 0
+        self._untracked_statistics.clear()
+        self._last_filter_report = now
+
+    def _read_decayed_statistics(self):
+        """ Copies the current exponentially decayed estimates into the model """
+        now = rospy.get_time()
+        estimates = sorted(self._node_estimates.items())
+        columns = dict()
+        columns['num_threads'] = np.array([estimate.num_threads for name, estimate in estimates], dtype=np.int64)
+        for prefix in ('cpu_load', 'virt_mem'):
+            moments = [getattr(estimate, prefix) for name, estimate in estimates]
+            columns[prefix + '_mean'] = np.array([moment.mean for moment in moments], dtype=np.float64)
+            columns[prefix + '_std'] = np.array([moment.std for moment in moments], dtype=np.float64)
+            columns[prefix + '_max'] = np.array([moment.peak for moment in moments], dtype=np.float64)
+        self._apply_node_statistics([name for name, estimate in estimates], columns, now)
 
-        # TODO: Requires a lock with the callback and other threads
-        rsgNodes = self._topology.nodes
-        for node_name, data_buffer in node_statistics_buffer.items():
-            # Don't process node statistics that we do not have in our internal topology
-            # (we don't have a place to store the information).
-            if node_name not in rsgNodes:
-                if node_name not in self._NODE_QUIET_LIST:
-                    rospy.logwarn("Received Statistics Information for untracked node %s" % node_name)
+        rsgTopics = self._topology.topics
+        names = list()
+        hz = list()
+        bw = list()
+        for topic_name, estimate in list(self._topic_estimates.items()):
+            rates = estimate.rates(now, self._half_life)
+            if rates is None:
                 continue
-            # Populate datasets for this node
-            samples = list()
-            num_threads = list()
-            cpu_load_mean = list()
-            cpu_load_std = list()
-            cpu_load_max = list()
-            virt_mem_mean = list()
-            virt_mem_std = list()
-            virt_mem_max = list()
-            # TODO: Real memory
-            for data in data_buffer:
-                samples.append(data.samples)
-                num_threads.append(data.threads)
-                cpu_load_mean.append(data.cpu_load_mean)
-                cpu_load_std.append(data.cpu_load_std)
-                cpu_load_max.append(data.cpu_load_max)
-                virt_mem_mean.append(data.virt_mem_mean)
-                virt_mem_std.append(data.virt_mem_std)
-                virt_mem_max.append(data.virt_mem_max)
-            rsgNodes[node_name].num_threads = max(num_threads)
-            rsgNodes[node_name].cpu_load_mean = np.mean(np.array(cpu_load_mean))
-            #rsgNodes[node_name].cpu_load_std = math.sqrt(sum(
-            #        [math.pow(sd, 2)/n for sd, n in zip(cpu_load_std, samples)]))
-            rsgNodes[node_name].cpu_load_std = math.sqrt(sum(
-                    [math.pow(sd, 2)/(n if abs(n) > 0.00001 else 0.00001) for sd, n in zip(cpu_load_std, samples)]))
-            rsgNodes[node_name].cpu_load_max = max(cpu_load_max)
-            rsgNodes[node_name].virt_mem_mean = np.mean(np.array(virt_mem_mean))
-            #rsgNodes[node_name].virt_mem_std = math.sqrt(sum(
-            #        [math.pow(sd, 2)/n for sd, n in zip(virt_mem_std, samples)]))
-            rsgNodes[node_name].virt_mem_std = math.sqrt(sum(
-                    [math.pow(sd, 2)/(n if abs(n) > 0.00001 else 0.00001) for sd, n in zip(virt_mem_std, samples)]))
-            rsgNodes[node_name].virt_mem_max = max(virt_mem_max)
+            names.append(topic_name)
+            hz.append(rates[0])
+            bw.append(rates[1])
+            if topic_name not in rsgTopics:
+                continue
+            self._update_topic(rsgTopics[topic_name], rates[0], rates[1])
+            rsgTopics[topic_name].dropped_hz = rates[2]
+            self._record_history('topics', topic_name, now, hz=rates[0], bw=rates[1])
+        self._hot_path.observe_topics(names, {'hz': hz, 'bw': bw})
+
+    def _aggregate_window_statistics(self):
+        """ Combines the samples buffered during the last two updates into the model """
+        # Combine the samples of this period with those of the previous period for evaluation
+        node_statistics = self._node_statistics_buffer.drain()
+        topic_statistics = self._topic_statistics_buffer.drain()
+
+        now = rospy.get_time()
+        names, columns = aggregate_nodes(node_statistics, self._previous_node_statistics)
+        self._apply_node_statistics(names, columns, now)
 
         # Process Topic Statistics Data
         # TODO: we are not currently processing all the topic data found in TopicStatistics() message
@@ -322,63 +778,85 @@ class ROSProfileAdapter(BaseAdapter):
         #       Eventually we want to be able to draw each connections individual contribution to the
         #       whole topic, but for now just lump it all together
         rsgTopics = self._topology.topics
-        for topic_name, data_buffer in topic_statistics_buffer.items():
+        names, columns = aggregate_topics(topic_statistics, self._previous_topic_statistics)
+        self._hot_path.observe_topics(names, columns)
+        for i, topic_name in enumerate(names):
             # Don't process topic statistics that we do not have in our internal topology
             # (We don't have a place to store the information)
             if topic_name not in rsgTopics:
-                if topic_name not in self._TOPIC_QUIET_LIST:
-                    rospy.logwarn("Received Statistics Information for untracked topic %s" % topic_name)
+                if not self._hidden_or_quiet_topic(topic_name):
+                    self._untracked_statistics.add(topic_name)
                 continue
-            # populate datasets for this topic
-            delivered_msgs = list()
-            traffic = list()
-            period_mean = list()
-            window_start = list()
-            window_stop = list()
-            node_sub = list()  # we need to know the number of subscribers
-            for data in data_buffer:
-                delivered_msgs.append(data.delivered_msgs)
-                traffic.append(data.traffic)
-                period_mean.append(data.period_mean)
-                window_start.append(data.window_start.to_sec())
-                window_stop.append(data.window_stop.to_sec())
-                node_sub.append(data.node_sub)
-            start_time = min(window_start)
-            stop_time = max(window_stop)
-            unique_subs = len(set(node_sub))
-            # avoid divide by 0 errors
-            if stop_time == start_time or unique_subs == 0:
+            # hz and bw in bytes per second are both approximated per subscriber
+            self._update_topic(rsgTopics[topic_name], columns['hz'][i], columns['bw'][i])
+            rsgTopics[topic_name].dropped_hz = columns['dropped_hz'][i]
+            self._record_history('topics', topic_name, now, hz=columns['hz'][i], bw=columns['bw'][i],
+                                 dropped=columns['dropped'][i])
+
+        # Keep this period's samples for the next evaluation
+        self._previous_node_statistics = node_statistics
+        self._previous_topic_statistics = topic_statistics
+
+    def _apply_node_statistics(self, names, columns, now):
+        """ Stores per node statistics columns, as returned by aggregate_nodes,
+        in the model. Members of collapsed groups are combined first. """
+        if self._history is not None:
+            for i, node_name in enumerate(names):
+                self._record_history('nodes', node_name, now, cpu_load=columns['cpu_load_mean'][i],
+                                     virt_mem=columns['virt_mem_mean'][i], threads=columns['num_threads'][i])
+        self._hot_path.observe_nodes(names, columns)
+        names, columns = self._projection.fold_nodes(names, columns)
+        rsgNodes = self._topology.nodes
+        for i, node_name in enumerate(names):
+            # Don't process node statistics that we do not have in our internal topology
+            # (we don't have a place to store the information).
+            if node_name not in rsgNodes:
+                if not self._hot_path.hides_node(node_name):
+                    self._untracked_statistics.add(node_name)
                 continue
-            # Approximate the hz (per subscriber)
-            total_msgs_sent = sum(delivered_msgs)
-            messages_sent = total_msgs_sent / unique_subs
-            hz = messages_sent / (stop_time - start_time)
-            rsgTopics[topic_name].hz = hz
-            # Approximate the bw in bytes per seconds (per subscriber)
-            bytes_sent = sum(traffic) / unique_subs
-            bw = bytes_sent / (stop_time - start_time)
-            rsgTopics[topic_name].bw = bw
-
-        # Reset data buffers
-        self._previous_node_statistics_buffer = copy.copy(self._node_statistics_buffer)
-        self._previous_host_statistics_buffer = copy.copy(self._host_statistics_buffer)
-        self._previous_topic_statistics_buffer = copy.copy(self._topic_statistics_buffer)
-        self._node_statistics_buffer.clear()
-        self._host_statistics_buffer.clear()
-        self._topic_statistics_buffer.clear()
-
-        self._update_view()
+            # TODO: Real memory
+            node = rsgNodes[node_name]
+            self._update_node(node, int(columns['num_threads'][i]), columns['cpu_load_mean'][i], columns['virt_mem_mean'][i])
+            node.cpu_load_std = columns['cpu_load_std'][i]
+            node.cpu_load_max = columns['cpu_load_max'][i]
+            node.virt_mem_std = columns['virt_mem_std'][i]
+            node.virt_mem_max = columns['virt_mem_max'][i]
+
+    def _aggregate_host_statistics(self):
+        """ Combines the host samples buffered during the last two updates """
+        host_statistics = self._host_statistics_buffer.drain()
+        now = rospy.get_time()
+        names, columns = aggregate_hosts(host_statistics, self._previous_host_statistics)
+        for i, hostname in enumerate(names):
+            self._host_load[hostname] = (columns['cpu_load_mean'][i], columns['phymem_used_mean'][i],
+                                         columns['phymem_avail_mean'][i])
+            self._record_history('hosts', hostname, now, cpu_load=columns['cpu_load_mean'][i],
+                                 virt_mem=columns['phymem_used_mean'][i])
+        self._previous_host_statistics = host_statistics
+        # Hosts only appear in the graph with their first node, so apply every known load
+        for hostname, load in self._host_load.items():
+            host = self._topology.find_host(hostname)
+            if host is not None:
+                host.cpu_load_mean, host.phymem_used_mean, host.phymem_avail_mean = load
 
     def get_block_item_attributes(self, block_index):
         """ Overloads the BaseAdapters stock implementation of this method """
-        block = self._topology.blocks[block_index]
+        return self._block_attributes(self._topology.blocks[block_index])
+
+    def _block_attributes(self, block):
         attrs = BlockItemAttributes()
         attrs.bgcolor = None
-        attrs.border_color = "black"
+        attrs.border_color = "gray" if block.vertex.stale else "black"
         attrs.border_width = 5
         #attrs.label = block.vertex.name
         attrs.tooltip_text = "Node:\t%s\nCPU:\t%d\nMEM:\t%s\nThreads:\t%d" % (block.vertex.name, block.vertex.cpu_load_mean, sizeof_fmt(block.vertex.virt_mem_mean), block.vertex.num_threads)
-        attrs.label_color = "black"
+        attrs.label_color = "gray" if block.vertex.stale else "black"
+        if block.vertex.stale:
+            attrs.tooltip_text += "\n(not running)"
+        members = self._projection.members(block.vertex.name)
+        if members is not None:
+            attrs.tooltip_text = attrs.tooltip_text.replace("Node:", "Group:", 1)
+            attrs.tooltip_text += "\nNodes:\t%d (double-click to expand)" % len(members)
 #         attrs.spacerwidth = block.vertex.
         #attrs.spacerwidth = 30
         #attrs.label = block.vertex.name
@@ -404,57 +882,65 @@ class ROSProfileAdapter(BaseAdapter):
         thrstr = thrstr.ljust(thrlen)
         attrs.label = "%s\n%s\n%s\n%s" % (topstr, cpustr, memstr, thrstr)
         #attrs.width = 15
-        if block.vertex.virt_mem_mean > 1073741824:
-            attrs.spacerwidth = 180
-            attrs.width = 180
-        elif block.vertex.virt_mem_mean > 1048576*100:
-            attrs.spacerwidth = 160
-            attrs.width = 160
-        elif block.vertex.virt_mem_mean > 1048576*10:
-            attrs.spacerwidth = 140
-            attrs.width = 140
-        elif block.vertex.virt_mem_mean > 1048576:
-            attrs.spacerwidth = 120
-            attrs.width = 120
-        elif block.vertex.virt_mem_mean > 1024*100:
-            attrs.spacerwidth = 100
-            attrs.width = 100
-        elif block.vertex.virt_mem_mean > 1024*10:
-            attrs.spacerwidth = 80
-            attrs.width = 80
-        else:
-            attrs.spacerwidth = 50
-            attrs.width = 50
+        attrs.width = node_width(block.vertex.virt_mem_mean)
+        attrs.spacerwidth = attrs.width
+        self._shown_nodes.show(block.vertex.name, width=attrs.width, num_threads=block.vertex.num_threads,
+                               cpu_load_mean=block.vertex.cpu_load_mean, virt_mem_mean=block.vertex.virt_mem_mean)
         return attrs
 
     def get_band_item_attributes(self, band_altitude):
         """ Overloads the BaseAdapters stock implementation of this method """
-        band = self._topology.bands[band_altitude]
+        return self._band_attributes(self._topology.bands[band_altitude])
+
+    def _band_attributes(self, band):
         attrs = BandItemAttributes()
-        attrs.bgcolor = self._colormapper.get_unique_color(band.edge.name)
-        attrs.border_color = "red"
+        attrs.bgcolor = "lightGray" if band.edge.stale else self._colormapper.get_unique_color(band.edge.name)
+        attrs.border_color = "gray" if band.edge.stale else "red"
         attrs.tooltip_text = "Topic:\t%s\nBw:\t%s/sec\nHz:\t%.1f" % (band.edge.name, sizeof_fmt(band.edge.bw), band.edge.hz)
+        # Topics between hosts use the network
+        hosts = set(connection.vertex.host.name for connection in band.edge.sources + band.edge.sinks
+                    if connection.vertex.host is not None)
+        if len(hosts) > 1:
+            attrs.border_color = "gray" if band.edge.stale else "darkOrange"
+            attrs.tooltip_text += "\nHosts:\t%s" % ", ".join(sorted(hosts))
         #attrs.label = band.edge.name
         #attrs.label_color = "white"
         #attrs.width = 15
         attrs.label = "%s, Bw: %s/sec, Hz: %.1f" % (band.edge.name, sizeof_fmt(band.edge.bw), band.edge.hz)
         #attrs.width = 15
-        if band.edge.bw > 1073741824:
-            attrs.width = 130
-        elif band.edge.bw > 1048576*100:
-            attrs.width = 110
-        elif band.edge.bw > 1048576*10:
-            attrs.width = 90
-        elif band.edge.bw > 1048576:
-            attrs.width = 70
-        elif band.edge.bw > 1024*100:
-            attrs.width = 50
-        elif band.edge.bw > 1024*10:
-            attrs.width = 30
-        else:
-            attrs.width = 15
+        attrs.width = topic_width(band.edge.bw)
+        self._shown_topics.show(band.edge.name, width=attrs.width, hz=band.edge.hz, bw=band.edge.bw)
         return attrs
 
+    def block_tooltip_details(self, index):
+        """ Overloads the Adapter method to add sparklines of a node's history.
+        They are read only when a tooltip is shown, so they are always current
+        and updates never query the history. """
+        block = self._topology.blocks.get(index)
+        if block is None or self._projection.members(block.vertex.name) is not None:
+            return u""
+        return self._history_tooltip('nodes', block.vertex.name, [("CPU", 'cpu_load'), ("MEM", 'virt_mem')])
+
+    def band_tooltip_details(self, altitude):
+        """ Overloads the Adapter method to add sparklines of a topic's history """
+        band = self._topology.bands.get(altitude)
+        if band is None:
+            return u""
+        return self._history_tooltip('topics', band.edge.name, [("Bw", 'bw'), ("Hz", 'hz')])
+
+    def _history_tooltip(self, kind, name, fields):
+        """ returns tooltip lines with sparklines of the last HISTORY_SPAN seconds of fields """
+        history = self._history
+        if history is None:
+            return u""
+        records = history.query(kind, name, start=rospy.get_time() - HISTORY_SPAN)
+        if len(records) == 0:
+            return u""
+        lines = [u"\nLast %d min:" % (HISTORY_SPAN / 60)]
+        for label, field in fields:
+            lines.append(u"%s:\t%s" % (label, history_store.sparkline(records[field])))
+        return u"\n".join(lines)
+
     def get_snap_item_attributes(self, snapkey):
         """ Default method for providing some stock settings for snaps """
         attrs = SnapItemAttributes()
@@ -0,0 +1,225 @@
+# Copyright 2014 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Periodic snapshots of a RosSystemGraph written to rotating files.
+
+SnapshotWriter records the aggregated statistics of every node, topic and
+host, and the topology whenever it changed, in one of two formats:
+
+  jsonl   profile.jsonl, one JSON object per snapshot with "time", "nodes",
+          "topics" and "hosts" lists and, if it changed, a "topology"
+          object of nodes, topics, publishers and subscribers
+  csv     nodes.csv, topics.csv and hosts.csv with one row per entity and
+          snapshot, and connections.csv with one row per connection each
+          time the topology changed
+
+Each file is rotated like logging.handlers.RotatingFileHandler: once it
+would grow beyond max_bytes it is renamed to name.1, name.1 to name.2 and
+so on, keeping at most backups old files. CSV files start with a header
+row after every rotation.
+
+No Qt is used, so the writer can run in a headless profiler:
+
+    writer = SnapshotWriter('/var/log/profile', 'jsonl', interval=10.0)
+    adapter = ROSProfileAdapter(None)
+    adapter.set_statistics_listener(writer.update)
+"""
+
+import csv
+import io
+import json
+import os
+import threading
+
+FORMATS = ('jsonl', 'csv')
+
+# Bytes per file and number of rotated files kept by default
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUPS = 5
+
+NODE_COLUMNS = ('time', 'name', 'host', 'stale', 'num_threads', 'cpu_load_mean', 'cpu_load_std', 'cpu_load_max',
+                'virt_mem_mean', 'virt_mem_std', 'virt_mem_max')
+TOPIC_COLUMNS = ('time', 'name', 'type', 'stale', 'publishers', 'subscribers', 'hz', 'bw')
+HOST_COLUMNS = ('time', 'name', 'nodes', 'cpu_load_mean', 'phymem_used_mean', 'phymem_avail_mean')
+CONNECTION_COLUMNS = ('time', 'node', 'topic', 'direction')
+
+
+def _value(value):
+    """ returns a value json can write; numpy scalars become python numbers """
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+class RotatingFile(object):
+    """ A text file rotated to path.1 ... path.<backups> once it reaches max_bytes """
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, backups=DEFAULT_BACKUPS, header=None):
+        """
+        :param header: written at the start of every new file
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.header = header
+        self._file = None
+        self._size = 0
+        self._open()
+
+    def _open(self):
+        self._file = io.open(self.path, 'ab')
+        self._size = self._file.tell()
+        if self._size == 0 and self.header:
+            self._write(self.header)
+
+    def _write(self, data):
+        self._file.write(data)
+        self._size += len(data)
+
+    def _rotate(self):
+        self._file.close()
+        if self.backups > 0:
+            for i in range(self.backups - 1, 0, -1):
+                source = "%s.%d" % (self.path, i)
+                if os.path.exists(source):
+                    os.rename(source, "%s.%d" % (self.path, i + 1))
+            os.rename(self.path, self.path + ".1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def write(self, data):
+        """ Appends data (bytes), rotating first if the file would grow too large """
+        header = len(self.header) if self.header else 0
+        if self._size > header and self._size + len(data) > self.max_bytes:
+            self._rotate()
+        self._write(data)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _csv_line(row):
+    stream = io.BytesIO()
+    csv.writer(stream, lineterminator='\n').writerow(row)
+    return stream.getvalue()
+
+
+def topology_of(rsg):
+    """ returns a dict of the nodes, topics, publishers and subscribers of a RosSystemGraph """
+    nodes = rsg.nodes
+    return {
+        'nodes': dict((name, node.location) for name, node in nodes.items()),
+        'topics': dict((name, topic.msgType) for name, topic in rsg.topics.items()),
+        'publishers': sorted([name, publisher.topic.name] for name, node in nodes.items()
+                             for publisher in node.publishers),
+        'subscribers': sorted([name, subscriber.topic.name] for name, node in nodes.items()
+                              for subscriber in node.subscribers),
+    }
+
+
+class SnapshotWriter(object):
+    """ Writes a snapshot of a RosSystemGraph at most every interval seconds """
+    def __init__(self, directory, file_format='jsonl', interval=10.0,
+                 max_bytes=DEFAULT_MAX_BYTES, backups=DEFAULT_BACKUPS):
+        if file_format not in FORMATS:
+            raise Exception("Unknown snapshot format '%s'" % file_format)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.format = file_format
+        self.interval = interval
+        self._last_snapshot = None
+        self._last_topology = None
+        self.snapshots = 0
+        # write() runs in the statistics thread, close() usually does not
+        self._lock = threading.Lock()
+
+        def open_file(name, columns=None):
+            return RotatingFile(os.path.join(directory, name), max_bytes, backups,
+                                None if columns is None else _csv_line(columns))
+        if file_format == 'jsonl':
+            self._files = {'profile': open_file('profile.jsonl')}
+        else:
+            self._files = {
+                'nodes': open_file('nodes.csv', NODE_COLUMNS),
+                'topics': open_file('topics.csv', TOPIC_COLUMNS),
+                'hosts': open_file('hosts.csv', HOST_COLUMNS),
+                'connections': open_file('connections.csv', CONNECTION_COLUMNS),
+            }
+
+    def update(self, rsg, now):
+        """ Writes a snapshot unless the last one is less than interval seconds old.
+        Matches the listener of ROSProfileAdapter.set_statistics_listener. """
+        if self._last_snapshot is not None and now - self._last_snapshot < self.interval:
+            return
+        self.write(rsg, now)
+
+    def write(self, rsg, now):
+        """ Writes a snapshot of rsg taken at now (in seconds), unless the writer is closed """
+        with self._lock:
+            self._write(rsg, now)
+
+    def _write(self, rsg, now):
+        if len(self._files) == 0:
+            return
+        self._last_snapshot = now
+        nodes = [(now, name, node.host.name if node.host is not None else None, node.stale,
+                  node.num_threads, node.cpu_load_mean, node.cpu_load_std, node.cpu_load_max,
+                  node.virt_mem_mean, node.virt_mem_std, node.virt_mem_max)
+                 for name, node in sorted(rsg.nodes.items())]
+        topics = [(now, name, topic.msgType, topic.stale, len(topic.publishers), len(topic.subscribers),
+                   topic.hz, topic.bw)
+                  for name, topic in sorted(rsg.topics.items())]
+        hosts = [(now, name, len(host.nodes), host.cpu_load_mean, host.phymem_used_mean, host.phymem_avail_mean)
+                 for name, host in sorted(rsg.hosts.items())]
+        topology = topology_of(rsg)
+        if topology == self._last_topology:
+            topology = None
+        else:
+            self._last_topology = topology
+
+        if self.format == 'jsonl':
+            snapshot = {'time': now}
+            for key, columns, rows in [('nodes', NODE_COLUMNS, nodes), ('topics', TOPIC_COLUMNS, topics),
+                                       ('hosts', HOST_COLUMNS, hosts)]:
+                snapshot[key] = [dict((column, _value(value)) for column, value in zip(columns[1:], row[1:]))
+                                 for row in rows]
+            if topology is not None:
+                snapshot['topology'] = topology
+            self._files['profile'].write(json.dumps(snapshot, sort_keys=True).encode('utf-8') + b'\n')
+        else:
+            for key, rows in [('nodes', nodes), ('topics', topics), ('hosts', hosts)]:
+                out = self._files[key]
+                for row in rows:
+                    out.write(_csv_line([_value(value) for value in row]))
+            if topology is not None:
+                out = self._files['connections']
+                for direction in ('publishers', 'subscribers'):
+                    for node, topic in topology[direction]:
+                        out.write(_csv_line([now, node, topic, direction[:-1]]))
+        for out in self._files.values():
+            out.flush()
+        self.snapshots += 1
+
+    def close(self):
+        """ Closes the files; later snapshots are ignored """
+        with self._lock:
+            for out in self._files.values():
+                out.close()
+            self._files = dict()
@@ -0,0 +1,126 @@
+# Copyright 2014 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Reduces buffered statistics samples to one set of values per node or topic.
+
+The samples of every entity are concatenated into a single columnar record
+array sorted by entity, and each statistic is computed for all entities at
+once with NumPy group-by reductions (ufunc.reduceat and bincount) instead of
+a Python loop per entity.
+"""
+
+import numpy as np
+
+# Sample counts below this are treated as this when pooling standard deviations
+MIN_SAMPLES = 0.00001
+
+
+def group_records(*buffers):
+    """ Concatenates dicts of name: record array into one record array.
+    Records of the same name from different dicts are grouped together.
+    :returns: (names, records, starts, group) where the records of names[i]
+    are records[starts[i]:starts[i+1]] and group[j] is the index of the
+    name of records[j]
+    """
+    names = sorted(set(name for buf in buffers for name, records in buf.items() if len(records) > 0))
+    if len(names) == 0:
+        return names, None, np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    ids = dict((name, i) for i, name in enumerate(names))
+    arrays = list()
+    group_ids = list()
+    for buf in buffers:
+        for name in sorted(buf.keys()):
+            if len(buf[name]) > 0:
+                arrays.append(buf[name])
+                group_ids.append(ids[name])
+    group = np.repeat(group_ids, [len(records) for records in arrays])
+    records = np.concatenate(arrays)
+    if len(buffers) > 1:
+        order = np.argsort(group, kind='mergesort')
+        records = records[order]
+        group = group[order]
+    counts = np.bincount(group, minlength=len(names))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return names, records, starts, group
+
+
+def _pooled_std(std, samples, starts):
+    """ sqrt(sum(std^2 / n)) per group """
+    samples = np.where(np.abs(samples) > MIN_SAMPLES, samples, MIN_SAMPLES)
+    return np.sqrt(np.add.reduceat(std ** 2 / samples, starts))
+
+
+def aggregate_nodes(*buffers):
+    """ Computes per node statistics from buffers of statistics_buffer.NODE_FIELDS records
+    :returns: (names, dict of column name: array with one value per name)
+    """
+    names, records, starts, group = group_records(*buffers)
+    if len(names) == 0:
+        return names, dict()
+    counts = np.bincount(group, minlength=len(names)).astype(np.float64)
+    columns = dict()
+    columns['num_threads'] = np.maximum.reduceat(records['threads'], starts).astype(np.int64)
+    columns['cpu_load_mean'] = np.add.reduceat(records['cpu_load_mean'], starts) / counts
+    columns['cpu_load_std'] = _pooled_std(records['cpu_load_std'], records['samples'], starts)
+    columns['cpu_load_max'] = np.maximum.reduceat(records['cpu_load_max'], starts)
+    columns['virt_mem_mean'] = np.add.reduceat(records['virt_mem_mean'], starts) / counts
+    columns['virt_mem_std'] = _pooled_std(records['virt_mem_std'], records['samples'], starts)
+    columns['virt_mem_max'] = np.maximum.reduceat(records['virt_mem_max'], starts)
+    return names, columns
+
+
+def aggregate_topics(*buffers):
+    """ Computes the per subscriber hz, bandwidth and rate of dropped messages
+    (dropped_hz) of each topic, and the total number of dropped messages, from
+    buffers of statistics_buffer.TOPIC_FIELDS records. Topics whose samples
+    cover no time or have no subscribers are left out.
+    :returns: (names, dict of column name: array with one value per name)
+    """
+    names, records, starts, group = group_records(*buffers)
+    if len(names) == 0:
+        return names, dict()
+    start_time = np.minimum.reduceat(records['window_start'], starts)
+    stop_time = np.maximum.reduceat(records['window_stop'], starts)
+    # Count distinct (topic, subscriber) pairs
+    subs = records['node_sub'].astype(np.int64)
+    pairs = np.unique(group.astype(np.int64) * (subs.max() + 1) + subs)
+    unique_subs = np.bincount(pairs // (subs.max() + 1), minlength=len(names))
+    duration = stop_time - start_time
+    valid = (duration != 0) & (unique_subs != 0)
+    duration = duration[valid]
+    unique_subs = unique_subs[valid]
+    columns = dict()
+    columns['hz'] = np.add.reduceat(records['delivered_msgs'], starts)[valid] / unique_subs / duration
+    columns['bw'] = np.add.reduceat(records['traffic'], starts)[valid] / unique_subs / duration
+    columns['dropped'] = np.add.reduceat(records['dropped_msgs'], starts)[valid]
+    columns['dropped_hz'] = columns['dropped'] / unique_subs / duration
+    return [name for name, keep in zip(names, valid) if keep], columns
+
+
+def aggregate_hosts(*buffers):
+    """ Computes per host cpu and memory use from buffers of
+    statistics_buffer.HOST_FIELDS records
+    :returns: (names, dict of column name: array with one value per name)
+    """
+    names, records, starts, group = group_records(*buffers)
+    if len(names) == 0:
+        return names, dict()
+    counts = np.bincount(group, minlength=len(names)).astype(np.float64)
+    columns = dict()
+    columns['cpu_load_mean'] = np.add.reduceat(records['cpu_load_mean'], starts) / counts
+    columns['cpu_load_max'] = np.maximum.reduceat(records['cpu_load_max'], starts)
+    columns['phymem_used_mean'] = np.add.reduceat(records['phymem_used_mean'], starts) / counts
+    columns['phymem_avail_mean'] = np.add.reduceat(records['phymem_avail_mean'], starts) / counts
+    return names, columns
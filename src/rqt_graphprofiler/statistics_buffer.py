@@ -0,0 +1,144 @@
+# Copyright 2014 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Bounded storage for statistics samples received between two updates.
+
+Each node, topic and host gets a ring buffer of fixed capacity, backed by a
+preallocated NumPy record array holding only the numeric fields used for
+aggregation. When a buffer is not drained in time its oldest samples are
+overwritten, so memory use does not depend on how long updates are paused.
+
+The buffers are written by the rospy subscriber threads and drained by the
+statistics timer thread without a lock; there must be only one thread
+draining. Writers take a ticket from an itertools.count, which is atomic
+under the GIL, mark the slot it selects as being written with -(ticket + 1),
+fill it and then publish ticket + 1 in that slot's sequence number. The
+reader only collects slots whose sequence number shows they are complete
+and keeps its own read cursor, so a sample that is still being written when
+the buffer is drained is picked up by the next drain instead of being lost.
+After copying, the reader checks the sequence numbers again and leaves out
+slots a writer started to overwrite in the meantime.
+"""
+
+import itertools
+import numpy as np
+
+DEFAULT_CAPACITY = 64
+
+NODE_FIELDS = ('samples', 'threads',
+               'cpu_load_mean', 'cpu_load_std', 'cpu_load_max',
+               'virt_mem_mean', 'virt_mem_std', 'virt_mem_max')
+
+# node_sub is stored as an integer id, see StatisticsBuffer.symbol()
+TOPIC_FIELDS = ('window_start', 'window_stop', 'delivered_msgs', 'dropped_msgs', 'traffic', 'node_sub')
+
+HOST_FIELDS = ('window_start', 'window_stop', 'samples',
+               'cpu_load_mean', 'cpu_load_max',
+               'phymem_used_mean', 'phymem_avail_mean')
+
+
+class RingBuffer(object):
+    """ Fixed capacity FIFO of numeric records for many writers and one reader """
+    def __init__(self, fields, capacity=DEFAULT_CAPACITY):
+        self._data = np.zeros(capacity, dtype=[(field, np.float64) for field in fields])
+        # ticket + 1 of the record last completed in each slot, -(ticket + 1)
+        # while a record is being written, 0 if never written
+        self._sequence = np.zeros(capacity, dtype=np.int64)
+        self._capacity = capacity
+        self._tickets = itertools.count()
+        self._tail = 0  # ticket of the next record to drain
+        self.dropped = 0  # records overwritten before they were drained
+
+    def __len__(self):
+        return max(0, int(np.abs(self._sequence).max()) - self._tail)
+
+    def append(self, values):
+        """ Stores a tuple of values, one per field, overwriting the oldest
+        record if the buffer is full. """
+        ticket = next(self._tickets)
+        slot = ticket % self._capacity
+        self._sequence[slot] = -(ticket + 1)
+        self._data[slot] = values
+        self._sequence[slot] = ticket + 1
+
+    def drain(self):
+        """ Returns a copy of all the completed records not drained yet, oldest first """
+        # Tickets taken so far, including records still being written
+        newest = int(np.abs(self._sequence).max())
+        if newest - self._tail > self._capacity:
+            # Writers lapped the reader
+            self.dropped += newest - self._capacity - self._tail
+            self._tail = newest - self._capacity
+        tickets = np.arange(self._tail, newest)
+        slots = tickets % self._capacity
+        sequence = self._sequence[slots]
+        # Stop at the first record that is still being written, or not
+        # started yet. Slots holding a later ticket were overwritten.
+        incomplete = np.flatnonzero((sequence != tickets + 1) & (np.abs(sequence) <= tickets + 1))
+        if len(incomplete) > 0:
+            tickets = tickets[:incomplete[0]]
+            slots = slots[:incomplete[0]]
+            sequence = sequence[:incomplete[0]]
+        records = self._data[slots]
+        # Leave out records overwritten before or while they were being copied
+        intact = (sequence == tickets + 1) & (self._sequence[slots] == tickets + 1)
+        if not intact.all():
+            self.dropped += int((~intact).sum())
+            records = records[intact]
+        self._tail += len(tickets)
+        return records
+
+
+class StatisticsBuffer(object):
+    """ A collection of ring buffers, one per entity name """
+    def __init__(self, fields, capacity=DEFAULT_CAPACITY):
+        self.fields = fields
+        self.capacity = capacity
+        self._rings = dict()  # name: RingBuffer
+        self._symbols = dict()  # string: integer id
+
+    def __len__(self):
+        return len(self._rings)
+
+    def symbol(self, text):
+        """ returns a stable integer id for a string, so that string valued
+        message fields can be stored in the numeric buffers """
+        return self._symbols.setdefault(text, len(self._symbols))
+
+    def append(self, name, values):
+        """ Buffers one record of values for the entity name """
+        ring = self._rings.get(name)
+        if ring is None:
+            # Another thread may be adding the same name
+            ring = self._rings.setdefault(name, RingBuffer(self.fields, self.capacity))
+        ring.append(values)
+
+    def drain(self):
+        """ Returns a dict of name: record array of the samples buffered since
+        the last drain. Entities without new samples are left out. """
+        drained = dict()
+        for name, ring in list(self._rings.items()):
+            records = ring.drain()
+            if len(records) > 0:
+                drained[name] = records
+        return drained
+
+    def discard(self, name):
+        """ Forgets the buffer of an entity that no longer exists """
+        self._rings.pop(name, None)
+
+    def dropped(self):
+        """ returns the total number of samples overwritten before they were drained """
+        return sum(ring.dropped for ring in list(self._rings.values()))
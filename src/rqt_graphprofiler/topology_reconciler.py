@@ -0,0 +1,244 @@
+# Copyright 2014 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Brings a RosSystemGraph in line with the latest reported ROS graph.
+
+Each /topology message is reduced to a TopologySnapshot of names and
+(node, topic) pairs. The differences to the snapshot applied last are found
+with set operations, so reconciling is linear in the size of the graph, and
+are then applied to the RosSystemGraph in one batch.
+"""
+
+import ros_topology as rsg
+
+
+def graph_fingerprint(graph, ignored_nodes=(), ignored_topics=()):
+    """ returns a hash of the structure of a ros_topology_msgs/Graph and the
+    names being ignored. Messages with equal fingerprints (almost certainly)
+    produce the same snapshot. """
+    return hash((tuple((node.name, node.uri, tuple(node.publishes), tuple(node.subscribes)) for node in graph.nodes),
+                 tuple((topic.name, topic.type) for topic in graph.topics),
+                 frozenset(ignored_nodes), frozenset(ignored_topics)))
+
+
+class TopologySnapshot(object):
+    """ The nodes, topics and connections of a ros_topology_msgs/Graph """
+    def __init__(self):
+        self.nodes = dict()  # name: uri
+        self.topics = dict()  # name: message type
+        self.publishers = set()  # (node name, topic name)
+        self.subscribers = set()  # (node name, topic name)
+
+    @classmethod
+    def from_graph(cls, graph, ignore_node=None, ignore_topic=None):
+        """ Creates a snapshot of a Graph message.
+        :param ignore_node: returns True for node names to leave out
+        :param ignore_topic: returns True for topic names to leave out
+        Connections to topics not listed in the graph are left out as well.
+        """
+        snapshot = cls()
+        for topic in graph.topics:
+            if ignore_topic is None or not ignore_topic(topic.name):
+                snapshot.topics[topic.name] = topic.type
+        topics = snapshot.topics
+        for node in graph.nodes:
+            if ignore_node is not None and ignore_node(node.name):
+                continue
+            snapshot.nodes[node.name] = node.uri
+            snapshot.publishers.update((node.name, topic) for topic in node.publishes if topic in topics)
+            snapshot.subscribers.update((node.name, topic) for topic in node.subscribes if topic in topics)
+        return snapshot
+
+
+class TopologyChanges(object):
+    """ Names and (node, topic) pairs added and removed by a reconciliation """
+    def __init__(self):
+        self.added_nodes = set()
+        self.removed_nodes = set()
+        self.moved_nodes = set()  # nodes whose uri changed
+        self.added_topics = set()
+        self.removed_topics = set()
+        self.added_publishers = set()
+        self.removed_publishers = set()
+        self.added_subscribers = set()
+        self.removed_subscribers = set()
+
+    def empty(self):
+        return not (self.added_nodes or self.removed_nodes or self.moved_nodes or
+                    self.added_topics or self.removed_topics or
+                    self.added_publishers or self.removed_publishers or
+                    self.added_subscribers or self.removed_subscribers)
+
+    def summary(self):
+        """ returns a one line description of the number of changes """
+        return "nodes +%d -%d ~%d, topics +%d -%d, publishers +%d -%d, subscribers +%d -%d" % (
+            len(self.added_nodes), len(self.removed_nodes), len(self.moved_nodes),
+            len(self.added_topics), len(self.removed_topics),
+            len(self.added_publishers), len(self.removed_publishers),
+            len(self.added_subscribers), len(self.removed_subscribers))
+
+
+class TopologyReconciler(object):
+    """ Applies TopologySnapshots to a RosSystemGraph. The graph should not
+    be modified by anything else. """
+    def __init__(self, graph):
+        self._graph = graph
+        self._applied = TopologySnapshot()
+        self._publishers = dict()  # (node name, topic name): Publisher
+        self._subscribers = dict()  # (node name, topic name): Subscriber
+
+    @property
+    def applied(self):
+        """ the snapshot the graph currently matches """
+        return self._applied
+
+    def reconcile(self, desired):
+        """ Adds and removes nodes, topics, publishers and subscribers so that
+        the graph matches the snapshot desired.
+        :rtype: TopologyChanges
+        """
+        applied = self._applied
+        changes = TopologyChanges()
+        desired_nodes = set(desired.nodes)
+        applied_nodes = set(applied.nodes)
+        desired_topics = set(desired.topics)
+        applied_topics = set(applied.topics)
+        changes.added_nodes = desired_nodes - applied_nodes
+        changes.removed_nodes = applied_nodes - desired_nodes
+        changes.moved_nodes = set(name for name in desired_nodes & applied_nodes
+                                  if desired.nodes[name] != applied.nodes[name])
+        changes.added_topics = desired_topics - applied_topics
+        changes.removed_topics = applied_topics - desired_topics
+        changes.added_publishers = desired.publishers - applied.publishers
+        changes.removed_publishers = applied.publishers - desired.publishers
+        changes.added_subscribers = desired.subscribers - applied.subscribers
+        changes.removed_subscribers = applied.subscribers - desired.subscribers
+
+        nodes = self._graph.nodes
+        topics = self._graph.topics
+
+        # Releasing a node or topic releases its connections as well
+        for removed, connections in [(changes.removed_publishers, self._publishers),
+                                     (changes.removed_subscribers, self._subscribers)]:
+            for key in removed:
+                connection = connections.pop(key)
+                if key[0] not in changes.removed_nodes and key[1] not in changes.removed_topics:
+                    connection.release()
+        for name in changes.removed_topics:
+            topics[name].release()
+        for name in changes.removed_nodes:
+            nodes[name].release()
+
+        for name in sorted(changes.added_topics):
+            rsg.Topic(self._graph, name, desired.topics[name])
+        for name in desired_topics & applied_topics:
+            topics[name].msgType = desired.topics[name]
+        for name in sorted(changes.added_nodes):
+            rsg.Node(self._graph, name).location = desired.nodes[name]
+        for name in changes.moved_nodes:
+            nodes[name].location = desired.nodes[name]
+        for node_name, topic_name in sorted(changes.added_publishers):
+            self._publishers[(node_name, topic_name)] = rsg.Publisher(self._graph, nodes[node_name], topics[topic_name])
+        for node_name, topic_name in sorted(changes.added_subscribers):
+            self._subscribers[(node_name, topic_name)] = rsg.Subscriber(self._graph, nodes[node_name], topics[topic_name])
+
+        self._applied = desired
+        return changes
+
+
+class RemovalGrace(object):
+    """ Delays the removal of nodes and topics that disappear from the graph,
+    so that restarting nodes and briefly missing topics keep their place in
+    the layout. An entity is kept, as stale, while it has been missing for
+    less than seconds and for fewer than messages graph messages. A limit of
+    None is not checked; with both None entities are removed at once.
+    """
+    def __init__(self, seconds=None, messages=None):
+        self.seconds = seconds
+        self.messages = messages
+        self._missing_nodes = dict()  # name: (time, message count) when first missed
+        self._missing_topics = dict()
+
+    def pending(self):
+        """ returns True while any entity is being kept as stale """
+        return bool(self._missing_nodes or self._missing_topics)
+
+    def expired(self, now):
+        """ returns True if the grace period of a stale entity ran out by now.
+        Limits counted in messages expire when the next message is retained. """
+        if self.seconds is None:
+            return False
+        for missing in (self._missing_nodes, self._missing_topics):
+            for since in missing.values():
+                if now - since[0] >= self.seconds:
+                    return True
+        return False
+
+    def _keep(self, since, now, count):
+        if self.seconds is None and self.messages is None:
+            return False
+        if self.seconds is not None and now - since[0] >= self.seconds:
+            return False
+        if self.messages is not None and count - since[1] >= self.messages:
+            return False
+        return True
+
+    def _stale(self, missing, reported, applied, now, count, ignore):
+        for name in list(missing):
+            if name in reported:
+                del missing[name]
+        stale = set()
+        for name in applied:
+            if name in reported:
+                continue
+            # Ignored entities are removed immediately
+            if ignore is not None and ignore(name):
+                missing.pop(name, None)
+                continue
+            since = missing.setdefault(name, (now, count))
+            if self._keep(since, now, count):
+                stale.add(name)
+            else:
+                del missing[name]
+        return stale
+
+    def retain(self, reported, applied, now, count, ignore_node=None, ignore_topic=None):
+        """ Adds the entities of the applied snapshot that are missing from
+        the reported one but still within their grace period back in.
+        :param float now: the current time in seconds
+        :param int count: the number of graph messages received so far
+        :returns: (snapshot to apply, stale node names, stale topic names)
+        """
+        stale_nodes = self._stale(self._missing_nodes, reported.nodes, applied.nodes, now, count, ignore_node)
+        stale_topics = self._stale(self._missing_topics, reported.topics, applied.topics, now, count, ignore_topic)
+        if not stale_nodes and not stale_topics:
+            return reported, stale_nodes, stale_topics
+        desired = TopologySnapshot()
+        desired.nodes = dict(reported.nodes)
+        desired.topics = dict(reported.topics)
+        desired.publishers = set(reported.publishers)
+        desired.subscribers = set(reported.subscribers)
+        for name in stale_nodes:
+            desired.nodes[name] = applied.nodes[name]
+        for name in stale_topics:
+            desired.topics[name] = applied.topics[name]
+        # Stale entities keep the connections they had
+        for pairs, applied_pairs in [(desired.publishers, applied.publishers),
+                                     (desired.subscribers, applied.subscribers)]:
+            for node_name, topic_name in applied_pairs:
+                if (node_name in stale_nodes or topic_name in stale_topics) and \
+                        node_name in desired.nodes and topic_name in desired.topics:
+                    pairs.add((node_name, topic_name))
+        return desired, stale_nodes, stale_topics
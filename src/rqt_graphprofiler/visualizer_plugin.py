@@ -29,18 +29,25 @@ import PyQt5
 from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
-from PyQt5 import QtSvg
 
 
 from qt_gui.plugin import Plugin
 import rosprofiler_adapter
 
 from diarc import qt_view
+from diarc.qt_view import scene_export
 
 from blacklist import BlacklistDialog
+from history_store import HistoryStore
+from quiet_list import DEFAULT_TOPIC_QUIET_LIST, DEFAULT_NODE_QUIET_LIST
 
-TOPIC_BLACKLIST = ['/clock', '/topology', '/statistics']
-NODE_BLACKLIST = ['/rosout', '/rosgrapher', '/rosprofiler_fe411d', '/rqt_gui_py_node_6307']
+TOPIC_BLACKLIST = list(DEFAULT_TOPIC_QUIET_LIST)
+NODE_BLACKLIST = list(DEFAULT_NODE_QUIET_LIST)
+# Entries of the hot path metric selectors and the metrics passed to ROSProfileAdapter.set_hot_path
+HOT_TOPIC_METRICS = [("by Bandwidth", 'bw'), ("by Rate", 'hz')]
+HOT_NODE_METRICS = [("by CPU", 'cpu_load_mean'), ("by Memory", 'virt_mem_mean')]
+# Entries of the collapse selector and the mode passed to ROSProfileAdapter.set_collapse_mode
+COLLAPSE_MODES = [("No Collapsing", None), ("Collapse Namespaces", 'namespace'), ("Collapse Hosts", 'host')]
 
 # set this environment variable to enable diarc debug printing
 if 'DIARC_DEBUG' in os.environ:
@@ -61,22 +68,27 @@ class VisualizerPlugin(Plugin):
         # Add argument(s) to the parser.
         parser.add_argument("-q", "--quiet", action="store_true",
                             dest="quiet", help="Put plugin in silent mode")
+        parser.add_argument("--history-dir", dest="history_dir", default=None,
+                            help="Record the statistics history in this directory")
         args, unknowns = parser.parse_known_args(context.argv())
 
-        context.add_widget(VisualizerWidget())
+        self._widget = VisualizerWidget(history_dir=args.history_dir)
+        context.add_widget(self._widget)
 
     def shutdown_plugin(self):
-        pass
+        self._widget.shutdown()
 
     def save_settings(self, plugin_settings, instance_settings):
-        pass
+        instance_settings.set_value('splitter', self._widget.save_splitter_state())
 
     def restore_settings(self, plugin_settings, instance_settings):
-        pass
+        state = instance_settings.value('splitter')
+        if state is not None:
+            self._widget.restore_splitter_state(state)
 
 
 class VisualizerWidget(QWidget):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, history_dir=None):
         super(VisualizerWidget, self).__init__(parent)
         self.setWindowTitle('Graph Profiler Visualizer')
         vbox = QVBoxLayout()
@@ -87,26 +99,85 @@ class VisualizerWidget(QWidget):
         refresh_button.setIcon(QIcon.fromTheme('view-refresh'))
         auto_refresh_checkbox = QCheckBox("Auto Refresh")
         hide_disconnected_topics = QCheckBox("Hide Disconnected Topics")
+        minimap_checkbox = QCheckBox("Minimap")
+        smooth_statistics_checkbox = QCheckBox("Smooth Statistics")
+        group_by_host_checkbox = QCheckBox("Group by Host")
+        group_by_host_checkbox.setToolTip("Place nodes running on the same host next to each other")
+        collapse_combo = QComboBox()
+        for text, mode in COLLAPSE_MODES:
+            collapse_combo.addItem(text)
+        collapse_combo.setToolTip("Show the nodes of a namespace or host as one block, double-click a block to expand it")
+        self._hot_path_k = QSpinBox()
+        self._hot_path_k.setRange(0, 1000)
+        self._hot_path_k.setSpecialValueText("All")
+        self._hot_path_k.setPrefix("Top ")
+        self._hot_path_k.setToolTip("Show only the heaviest topics and nodes and their neighbours")
+        # Typing changes the value with every key, so apply it once typing pauses
+        self._hot_path_timer = QTimer(self)
+        self._hot_path_timer.setSingleShot(True)
+        self._hot_path_timer.setInterval(500)
+        self._hot_topic_metric = QComboBox()
+        for text, metric in HOT_TOPIC_METRICS:
+            self._hot_topic_metric.addItem(text)
+        self._hot_node_metric = QComboBox()
+        for text, metric in HOT_NODE_METRICS:
+            self._hot_node_metric.addItem(text)
+        smooth_statistics_checkbox.setToolTip("Show exponentially decayed averages instead of the last two update periods")
+        self._search_box = QLineEdit()
+        self._search_box.setPlaceholderText("Find node or topic")
+        self._search_model = QStringListModel()
+        self._search_results = dict()  # display text: (kind, name)
+        search_completer = QCompleter(self._search_model, self._search_box)
+        search_completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self._search_box.setCompleter(search_completer)
         topic_blacklist_button = QPushButton("Topic Blacklist")
         node_blacklist_button = QPushButton("Node Blacklist")
         save_svg_button = QPushButton("Save SVG")
+        save_png_button = QPushButton("Save PNG")
+        self._refresh_rate_label = QLabel()
+        self._refresh_rate_label.setToolTip("Interval between statistics updates (duration of the last update)")
 
         refresh_button.clicked.connect(self._refresh)
         topic_blacklist_button.clicked.connect(self._edit_topic_blacklist)
         node_blacklist_button.clicked.connect(self._edit_node_blacklist)
         save_svg_button.clicked.connect(self._save_svg)
+        save_png_button.clicked.connect(self._save_png)
         auto_refresh_checkbox.setCheckState(2)
         auto_refresh_checkbox.stateChanged.connect(self._autorefresh_changed)
         hide_disconnected_topics.setCheckState(2)
         hide_disconnected_topics.stateChanged.connect(self._hidedisconnectedtopics_changed)
+        minimap_checkbox.setCheckState(2)
+        minimap_checkbox.stateChanged.connect(self._minimap_changed)
+        smooth_statistics_checkbox.setCheckState(0)
+        smooth_statistics_checkbox.stateChanged.connect(self._smooth_statistics_changed)
+        group_by_host_checkbox.setCheckState(0)
+        group_by_host_checkbox.stateChanged.connect(self._group_by_host_changed)
+        self._hot_path_k.valueChanged.connect(lambda value: self._hot_path_timer.start())
+        self._hot_path_timer.timeout.connect(self._hot_path_changed)
+        self._hot_topic_metric.currentIndexChanged.connect(self._hot_path_changed)
+        self._hot_node_metric.currentIndexChanged.connect(self._hot_path_changed)
+        collapse_combo.currentIndexChanged.connect(lambda index: self._adapter.set_collapse_mode(COLLAPSE_MODES[index][1]))
+        self._search_box.textEdited.connect(self._search_edited)
+        self._search_box.returnPressed.connect(lambda: self._search_selected(self._search_box.text()))
+        search_completer.activated[str].connect(self._search_selected)
 
         toolbar_layout.addWidget(refresh_button)
         toolbar_layout.addWidget(auto_refresh_checkbox)
+        toolbar_layout.addWidget(self._refresh_rate_label)
         toolbar_layout.addStretch(0)
+        toolbar_layout.addWidget(self._search_box)
+        toolbar_layout.addWidget(minimap_checkbox)
+        toolbar_layout.addWidget(smooth_statistics_checkbox)
+        toolbar_layout.addWidget(group_by_host_checkbox)
+        toolbar_layout.addWidget(collapse_combo)
+        toolbar_layout.addWidget(self._hot_path_k)
+        toolbar_layout.addWidget(self._hot_topic_metric)
+        toolbar_layout.addWidget(self._hot_node_metric)
         toolbar_layout.addWidget(hide_disconnected_topics)
         toolbar_layout.addWidget(topic_blacklist_button)
         toolbar_layout.addWidget(node_blacklist_button)
         toolbar_layout.addWidget(save_svg_button)
+        toolbar_layout.addWidget(save_png_button)
         vbox.addLayout(toolbar_layout)
 
         # Initialize the Visualizer
@@ -114,7 +185,42 @@ class VisualizerWidget(QWidget):
         self._adapter = rosprofiler_adapter.ROSProfileAdapter(self._view)
         self._adapter.set_topic_quiet_list(TOPIC_BLACKLIST)
         self._adapter.set_node_quiet_list(NODE_BLACKLIST)
-        vbox.addWidget(self._view)
+        self._history = None
+        if history_dir is not None:
+            self._history = HistoryStore(history_dir)
+            self._adapter.set_history_store(self._history)
+
+        # Overview of the whole graph for quick navigation. rqt already shows
+        # the plugin in a dock, so the minimap is resized in a splitter
+        # below the view rather than docked itself.
+        self._minimap = qt_view.Minimap(self._view)
+        self._splitter = QSplitter(Qt.Vertical)
+        self._splitter.addWidget(self._view)
+        self._splitter.addWidget(self._minimap)
+        self._splitter.setStretchFactor(0, 1)
+        self._splitter.setStretchFactor(1, 0)
+        self._splitter.setCollapsible(0, False)
+        self._splitter.setSizes([600, 120])
+        vbox.addWidget(self._splitter)
+
+        # The refresh interval adapts to the graph size, show its current value
+        self._refresh_rate_timer = QTimer(self)
+        self._refresh_rate_timer.timeout.connect(self._show_refresh_rate)
+        self._refresh_rate_timer.start(1000)
+        self._show_refresh_rate()
+
+    def save_splitter_state(self):
+        return self._splitter.saveState()
+
+    def restore_splitter_state(self, state):
+        self._splitter.restoreState(state)
+
+    def shutdown(self):
+        """ Stops recording the statistics history """
+        if self._history is not None:
+            self._adapter.set_history_store(None)
+            self._history.close()
+            self._history = None
 
     def _edit_topic_blacklist(self):
         """ Opens topic blacklist Dialog and modifies the blacklist """
@@ -131,24 +237,18 @@ class VisualizerWidget(QWidget):
         self._adapter.topology_update()
 
     def _save_svg(self):
-        newPath, _filter = QFileDialog.getSaveFileName(self, "Save SVG", '', "SVG files (*.svg)")
-        
-        if newPath is "":
+        """ Saves the whole graph, not just the visible part, as an SVG image """
+        path, _filter = QFileDialog.getSaveFileName(self, "Save SVG", '', "SVG files (*.svg)")
+        if path == "":
+            return
+        scene_export.export_svg(self._view.scene(), path, title="rqt_graphprofiler")
+
+    def _save_png(self):
+        """ Saves the whole graph as a PNG image, split into tiles if it is very large """
+        path, _filter = QFileDialog.getSaveFileName(self, "Save PNG", '', "PNG files (*.png)")
+        if path == "":
             return
-        
-        path = newPath
-        generator = QtSvg.QSvgGenerator()
-        generator.setFileName(path)
-        rect = self.geometry()
-        generator.setSize(QSize(rect.width(), rect.height()))
-        generator.setViewBox(QRect(0, 0, rect.width(), rect.height()))
-        generator.setTitle("SVG Generator Example Drawing")
-        
-        painter = QPainter()
-        painter.begin(generator)
-        #self.paint(painter)
-        self._view.render(painter)
-        painter.end()
+        scene_export.export_png(self._view.scene(), path)
 
     def _autorefresh_changed(self, value):
         if value == 2:
@@ -171,6 +271,51 @@ class VisualizerWidget(QWidget):
         else:
             raise Exception()
 
+    def _search_edited(self, text):
+        """ Offers the nodes and topics matching the text typed so far """
+        self._search_results.clear()
+        entries = list()
+        for kind, name in self._adapter.search(str(text)):
+            entry = "%s (%s)" % (name, kind)
+            self._search_results[entry] = (kind, name)
+            entries.append(entry)
+        self._search_model.setStringList(entries)
+
+    def _search_selected(self, text):
+        """ Jumps to the selected node or topic """
+        text = str(text)
+        if text not in self._search_results:
+            results = self._adapter.search(text, limit=1)
+            if len(results) == 0:
+                return
+            kind, name = results[0]
+        else:
+            kind, name = self._search_results[text]
+        if kind == "node":
+            self._adapter.show_node(name)
+        else:
+            self._adapter.show_topic(name)
+
+    def _minimap_changed(self, value):
+        self._minimap.setVisible(value == 2)
+
+    def _smooth_statistics_changed(self, value):
+        self._adapter.set_statistics_mode('decay' if value == 2 else 'window')
+
+    def _group_by_host_changed(self, value):
+        self._adapter.set_group_by_host(value == 2)
+
+    def _hot_path_changed(self, value=None):
+        self._hot_path_timer.stop()
+        k = self._hot_path_k.value()
+        self._adapter.set_hot_path(k if k > 0 else None,
+                                   HOT_TOPIC_METRICS[self._hot_topic_metric.currentIndex()][1],
+                                   HOT_NODE_METRICS[self._hot_node_metric.currentIndex()][1])
+
+    def _show_refresh_rate(self):
+        interval, cost = self._adapter.get_refresh_interval()
+        self._refresh_rate_label.setText("Every %.1f s (%d ms)" % (interval, cost * 1000))
+
     def _refresh(self):
         self._adapter.topology_update()
         self._adapter.statistics_update()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+""" Times the aggregation of buffered topic and node statistics.
+
+Builds 2000 topics and 2000 nodes with 10 samples each, checks the vectorized
+results against a straightforward per entity loop and reports how long each
+takes. Run it directly:
+
+  python test/benchmark_statistics_aggregation.py [entities] [samples]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'rqt_graphprofiler'))
+from statistics_buffer import StatisticsBuffer, NODE_FIELDS, TOPIC_FIELDS
+from statistics_aggregation import aggregate_nodes, aggregate_topics
+
+
+def fill_buffers(entities, samples):
+    rand = np.random.RandomState(0)
+    topics = StatisticsBuffer(TOPIC_FIELDS, capacity=samples)
+    nodes = StatisticsBuffer(NODE_FIELDS, capacity=samples)
+    for i in range(entities):
+        for j in range(samples):
+            topics.append("/topic_%d" % i, (j, j + 1.0, rand.randint(1, 100), rand.randint(0, 3), rand.randint(1, 100000),
+                                            topics.symbol("/sub_%d" % rand.randint(0, 4))))
+            nodes.append("/node_%d" % i, (rand.randint(0, 20), rand.randint(1, 8),
+                                          rand.rand(), rand.rand(), rand.rand(),
+                                          rand.rand() * 1e8, rand.rand() * 1e6, rand.rand() * 1e8))
+    return topics.drain(), nodes.drain()
+
+
+def loop_topics(buf):
+    results = dict()
+    for name, data in buf.items():
+        duration = data['window_stop'].max() - data['window_start'].min()
+        subs = len(set(data['node_sub']))
+        results[name] = (sum(data['delivered_msgs']) / subs / duration, sum(data['traffic']) / subs / duration)
+    return results
+
+
+def loop_nodes(buf):
+    results = dict()
+    for name, data in buf.items():
+        samples = [n if abs(n) > 0.00001 else 0.00001 for n in data['samples']]
+        results[name] = (max(data['threads']),
+                         np.mean(data['cpu_load_mean']),
+                         np.sqrt(sum([sd ** 2 / n for sd, n in zip(data['cpu_load_std'], samples)])),
+                         max(data['virt_mem_max']))
+    return results
+
+
+def main(argv):
+    entities = int(argv[1]) if len(argv) > 1 else 2000
+    samples = int(argv[2]) if len(argv) > 2 else 10
+    topics, nodes = fill_buffers(entities, samples)
+
+    names, columns = aggregate_topics(topics)
+    expected = loop_topics(topics)
+    for i, name in enumerate(names):
+        assert np.allclose((columns['hz'][i], columns['bw'][i]), expected[name])
+    names, columns = aggregate_nodes(nodes)
+    expected = loop_nodes(nodes)
+    for i, name in enumerate(names):
+        assert np.allclose((columns['num_threads'][i], columns['cpu_load_mean'][i],
+                            columns['cpu_load_std'][i], columns['virt_mem_max'][i]), expected[name])
+
+    repeat = 5
+    print("%d topics and %d nodes, %d samples each" % (entities, entities, samples))
+    for label, func, buf in [("topics, vectorized", aggregate_topics, topics),
+                             ("topics, loop", loop_topics, topics),
+                             ("nodes, vectorized", aggregate_nodes, nodes),
+                             ("nodes, loop", loop_nodes, nodes)]:
+        best = min(timeit.repeat(lambda: func(buf), number=1, repeat=repeat))
+        print("%-20s %8.2f ms" % (label, best * 1000.0))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
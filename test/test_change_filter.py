@@ -0,0 +1,26 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'rqt_graphprofiler'))
+from change_filter import ShownValues, SignificanceFilter
+
+
+def test_thresholds():
+    significance = SignificanceFilter({'bw': (1024, 0.05)})
+    assert not significance.significant('bw', 0, 500)
+    assert significance.significant('bw', 0, 2000)
+    assert not significance.significant('bw', 100000, 104000)
+    assert not significance.significant('hz', 1.0, 1.01)
+    assert significance.significant('other', 1.0, 1.01)
+
+
+def test_changes_are_judged_against_drawn_values():
+    shown = ShownValues()
+    assert not shown.changed('/t', bw=500.0)
+    shown.show('/t', width=15, bw=0.0, hz=0.0)
+    assert shown.value('/t', 'width') == 15
+    assert not shown.changed('/t', bw=500.0, hz=0.05)
+    # Small steps add up, as they are not drawn
+    assert shown.changed('/t', bw=1500.0, hz=0.05)
+    shown.forget('/t')
+    assert shown.value('/t', 'width') is None
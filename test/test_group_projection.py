@@ -0,0 +1,86 @@
+import os
+import sys
+
+import numpy as np
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(this_dir, '..', 'src', 'diarc'))
+sys.path.insert(0, os.path.join(this_dir, '..', 'src', 'rqt_graphprofiler'))
+from group_projection import GroupProjection
+from topology_reconciler import TopologySnapshot
+
+
+def system():
+    snapshot = TopologySnapshot()
+    snapshot.nodes = {'/a/n1': 'http://h1:1/', '/a/n2': 'http://h1:2/', '/b/n3': 'http://H2:3/',
+                      '/top': 'http://h2:4/'}
+    snapshot.topics = {'/internal': 'std_msgs/String', '/external': 'std_msgs/String'}
+    snapshot.publishers = set([('/a/n1', '/internal'), ('/a/n1', '/external')])
+    snapshot.subscribers = set([('/a/n2', '/internal'), ('/b/n3', '/external')])
+    return snapshot
+
+
+def test_no_mode_returns_snapshot_unchanged():
+    snapshot = system()
+    projection = GroupProjection()
+    assert projection.project(snapshot) is snapshot
+    assert projection.vertex_of('/a/n1') == '/a/n1'
+
+
+def test_namespace_groups_collapse():
+    projection = GroupProjection('namespace')
+    projected = projection.project(system())
+    # /b/ has a single node and is not grouped, /top is not in a namespace
+    assert sorted(projected.nodes) == ['/a/', '/b/n3', '/top']
+    assert projected.nodes['/a/'] == 'http://h1:1/'
+    assert sorted(projected.topics) == ['/external']
+    assert projected.publishers == set([('/a/', '/external')])
+    assert projected.subscribers == set([('/b/n3', '/external')])
+    assert projection.members('/a/') == set(['/a/n1', '/a/n2'])
+    assert projection.vertex_of('/a/n2') == '/a/'
+    assert projection.hides_topic('/internal')
+    assert projection.regrouped('/a/n1')
+    assert not projection.regrouped('/a/')
+
+
+def test_expand_and_collapse():
+    projection = GroupProjection('namespace')
+    projection.project(system())
+    projection.expand('/a/')
+    projected = projection.project(system())
+    assert sorted(projected.nodes) == ['/a/n1', '/a/n2', '/b/n3', '/top']
+    assert projection.group_of('/a/n1') == '/a/'
+    assert projection.members('/a/') is None
+    # The group vertex left the graph because of the grouping
+    assert projection.regrouped('/a/')
+    assert not projection.regrouped('/a/n1')
+    projection.collapse('/a/')
+    assert '/a/' in projection.project(system()).nodes
+
+
+def test_host_groups_ignore_case():
+    projection = GroupProjection('host')
+    projected = projection.project(system())
+    assert sorted(projected.nodes) == ['@h1', '@h2']
+    assert projection.members('@h2') == set(['/b/n3', '/top'])
+
+
+def test_fold_nodes_sums_usage_and_takes_peaks():
+    projection = GroupProjection('namespace')
+    projection.project(system())
+    columns = {
+        'num_threads': np.array([1, 2, 3]),
+        'cpu_load_mean': np.array([1.0, 2.0, 3.0]),
+        'cpu_load_std': np.array([3.0, 4.0, 1.0]),
+        'cpu_load_max': np.array([5.0, 7.0, 1.0]),
+        'virt_mem_mean': np.array([10.0, 20.0, 30.0]),
+        'virt_mem_std': np.zeros(3),
+        'virt_mem_max': np.array([10.0, 20.0, 30.0]),
+    }
+    names, folded = projection.fold_nodes(['/a/n1', '/a/n2', '/b/n3'], columns)
+    assert names == ['/a/', '/b/n3']
+    assert list(folded['num_threads']) == [3, 3]
+    assert list(folded['cpu_load_mean']) == [3.0, 3.0]
+    assert list(folded['cpu_load_std']) == [5.0, 1.0]
+    assert list(folded['cpu_load_max']) == [7.0, 1.0]
+    assert list(folded['virt_mem_mean']) == [30.0, 30.0]
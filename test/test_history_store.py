@@ -0,0 +1,38 @@
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'rqt_graphprofiler'))
+from history_store import HistoryStore, record
+
+
+def test_query_returns_time_range():
+    root = tempfile.mkdtemp()
+    try:
+        store = HistoryStore(root)
+        for t in range(10):
+            store.append('topics', '/a/b', record(float(t), bw=t * 10.0))
+        assert not store.append('topics', '/a/b', record(5.0))
+        records = store.query('topics', '/a/b', start=3.0, stop=6.0)
+        assert list(records['bw']) == [30.0, 40.0, 50.0]
+        assert store.names('topics') == ['/a/b']
+        store.close()
+    finally:
+        shutil.rmtree(root)
+
+
+def test_open_files_follow_appended_entities():
+    root = tempfile.mkdtemp()
+    try:
+        store = HistoryStore(root, max_open_files=4)
+        for t in range(2):
+            for i in range(10):
+                store.append('nodes', '/n%d' % i, record(float(t), cpu_load=i))
+            store.flush()
+        assert store.max_open_files == 10
+        assert len(store._files) == 10
+        assert len(store.query('nodes', '/n0')) == 2
+        store.close()
+    finally:
+        shutil.rmtree(root)
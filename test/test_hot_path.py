@@ -0,0 +1,30 @@
+import os
+import sys
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(this_dir, '..', 'src', 'diarc'))
+sys.path.insert(0, os.path.join(this_dir, '..', 'src', 'rqt_graphprofiler'))
+from hot_path import HotPathFilter, top_k
+
+
+def test_top_k():
+    assert top_k(2, ['/a', '/b', '/c'], [1.0, 3.0, 2.0]) == set(['/b', '/c'])
+
+
+def test_selected_names_kept_near_the_cut_off():
+    names = ['/a', '/b', '/c', '/d']
+    # /c falls to third place, still within k + 1
+    assert top_k(2, names, [4.0, 2.0, 2.5, 1.0], selected=set(['/a', '/b'])) == set(['/a', '/b'])
+    # /b falls to fourth place and is replaced
+    assert top_k(2, names, [4.0, 0.5, 2.5, 1.0], selected=set(['/a', '/b'])) == set(['/a', '/c'])
+
+
+def test_rank_reports_changes_only():
+    hot_path = HotPathFilter(k=1)
+    hot_path.observe_topics(['/t', '/u'], {'bw': [2.0, 1.0]})
+    hot_path.observe_nodes(['/a', '/b'], {'cpu_load_mean': [1.0, 2.0]})
+    assert hot_path.rank()
+    hot_path.observe_topics(['/t', '/u'], {'bw': [1.0, 1.5]})
+    assert not hot_path.rank()
+    hot_path.observe_topics(['/t', '/u', '/v'], {'bw': [1.0, 1.5, 3.0]})
+    assert hot_path.rank()
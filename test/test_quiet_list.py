@@ -0,0 +1,36 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'rqt_graphprofiler'))
+from quiet_list import QuietListMatcher
+
+
+def test_exact_names():
+    quiet = QuietListMatcher(['/rosout'])
+    assert quiet('/rosout')
+    assert not quiet('/rosout_agg')
+    assert '/rosout' in quiet
+
+
+def test_namespaces():
+    for pattern in ['/camera/', '/camera/*']:
+        quiet = QuietListMatcher([pattern])
+        assert quiet('/camera/image')
+        assert quiet('/camera/left/image')
+        assert not quiet('/camera')
+        assert not quiet('/cameras/image')
+
+
+def test_globs():
+    quiet = QuietListMatcher(['/rosprofiler_*', '/robot?/odom'])
+    assert quiet('/rosprofiler_1234')
+    assert quiet('/robot1/odom')
+    assert not quiet('/robot12/odom')
+    assert not quiet('/my/rosprofiler_1')
+
+
+def test_empty_list_matches_nothing():
+    quiet = QuietListMatcher()
+    assert not quiet('/anything')
+    # Remembered results stay correct
+    assert not quiet('/anything')
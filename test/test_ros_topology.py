@@ -0,0 +1,89 @@
+import os
+import sys
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(this_dir, '..', 'src', 'diarc'))
+sys.path.insert(0, os.path.join(this_dir, '..', 'src', 'rqt_graphprofiler'))
+import ros_topology as rsg
+from ros_topology import IndexAllocator
+from topology_reconciler import TopologyReconciler, TopologySnapshot
+
+
+def test_allocator_reuses_released_values():
+    allocator = IndexAllocator(1, 1)
+    assert [allocator.allocate() for i in range(3)] == [1, 2, 3]
+    allocator.release(2)
+    allocator.release(None)
+    assert allocator.fragmentation == 1.0 / 3
+    assert allocator.allocate() == 2
+    assert allocator.allocate() == 4
+    assert allocator.fragmentation == 0.0
+
+
+def test_allocator_counts_down_with_negative_step():
+    allocator = IndexAllocator(-1, -1)
+    assert [allocator.allocate() for i in range(3)] == [-1, -2, -3]
+    allocator.reset(1)
+    assert allocator.allocate() == -2
+
+
+def snapshot(node_names, topic_names):
+    result = TopologySnapshot()
+    result.nodes = dict((name, 'http://h1:1/') for name in node_names)
+    result.topics = dict((name, 'std_msgs/String') for name in topic_names)
+    result.publishers = set((node_names[0], name) for name in topic_names)
+    return result
+
+
+def graph_with(node_names, topic_names):
+    graph = rsg.RosSystemGraph()
+    reconciler = TopologyReconciler(graph)
+    reconciler.reconcile(snapshot(node_names, topic_names))
+    return graph, reconciler
+
+
+def test_name_lookups_follow_created_and_released_entities():
+    graph, reconciler = graph_with(['/a', '/b'], ['/t'])
+    assert sorted(graph.nodes) == ['/a', '/b']
+    assert graph.topics['/t'].name == '/t'
+    assert graph.node_index.search('b') == ['/b']
+    reconciler.reconcile(snapshot(['/a'], []))
+    assert sorted(graph.nodes) == ['/a']
+    assert len(graph.topics) == 0
+    assert '/b' not in graph.node_index
+    assert '/t' not in graph.topic_index
+
+
+def test_released_block_index_is_reused():
+    graph, reconciler = graph_with(['/a', '/b', '/c'], [])
+    index = graph.nodes['/b'].block.index
+    reconciler.reconcile(snapshot(['/a', '/c'], []))
+    assert graph.fragmentation() > 0
+    reconciler.reconcile(snapshot(['/a', '/c', '/d'], []))
+    assert graph.nodes['/d'].block.index == index
+
+
+def test_compact_renumbers_in_order():
+    graph, reconciler = graph_with(['/a', '/b', '/c', '/d'], ['/t', '/u', '/v'])
+    order = [name for index, name in sorted((node.block.index, name) for name, node in graph.nodes.items())]
+    reconciler.reconcile(snapshot(['/a', '/c', '/d'], ['/t', '/v']))
+    altitudes = sorted((topic.posBand.altitude, name) for name, topic in graph.topics.items())
+    graph.compact()
+    assert graph.fragmentation() == 0.0
+    remaining = [name for name in order if name in graph.nodes]
+    assert [graph.nodes[name].block.index for name in remaining] == list(range(len(remaining)))
+    assert [graph.topics[name].posBand.altitude for altitude, name in altitudes] == [1, 2]
+    assert sorted(topic.negBand.altitude for topic in graph.topics.values()) == [-2, -1]
+    # New entities continue after the compacted values
+    reconciler.reconcile(snapshot(['/a', '/c', '/d', '/e'], ['/t', '/v']))
+    assert graph.nodes['/e'].block.index == len(remaining)
+
+
+def test_find_host_ignores_case_and_domain():
+    graph, reconciler = graph_with(['/a'], [])
+    moved = snapshot(['/a'], [])
+    moved.nodes['/a'] = 'http://Robot1:1/'
+    reconciler.reconcile(moved)
+    assert graph.find_host('ROBOT1') is graph.nodes['/a'].host
+    assert graph.find_host('robot1.example.com') is graph.nodes['/a'].host
+    assert graph.find_host('robot2') is None
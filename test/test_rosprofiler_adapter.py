@@ -0,0 +1,98 @@
+""" Tests of ROSProfileAdapter without a view or master. Needs rospy and the
+ros_topology_msgs and ros_statistics_msgs messages. """
+import os
+import sys
+import threading
+
+import rospy
+from ros_statistics_msgs.msg import NodeStatistics
+from ros_topology_msgs.msg import Graph
+from ros_topology_msgs.msg import Node
+from ros_topology_msgs.msg import Topic
+from rosgraph_msgs.msg import TopicStatistics
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(this_dir, '..', 'src', 'diarc'))
+sys.path.insert(0, os.path.join(this_dir, '..', 'src', 'rqt_graphprofiler'))
+from replay import set_ros_time
+from rosprofiler_adapter import ROSProfileAdapter
+
+
+def graph(*nodes):
+    """ returns a Graph of (name, published topics, subscribed topics) nodes """
+    msg = Graph()
+    topics = set()
+    for i, (name, publishes, subscribes) in enumerate(nodes):
+        msg.nodes.append(Node(name=name, uri="http://host:%d/" % (40000 + i),
+                              publishes=publishes, subscribes=subscribes))
+        topics.update(publishes + subscribes)
+    for name in sorted(topics):
+        msg.topics.append(Topic(name=name, type="std_msgs/String"))
+    return msg
+
+
+def adapter_at(seconds):
+    set_ros_time(rospy.Time.from_sec(seconds))
+    return ROSProfileAdapter(None, live=False)
+
+
+def test_statistics_below_the_thresholds_reach_the_model():
+    adapter = adapter_at(100.0)
+    adapter._topology_callback(graph(('/a', ['/t'], []), ('/b', [], ['/t'])))
+    adapter._topic_statistics_callback(TopicStatistics(
+        topic='/t', node_pub='/a', node_sub='/b',
+        window_start=rospy.Time.from_sec(98.0), window_stop=rospy.Time.from_sec(100.0),
+        delivered_msgs=10, dropped_msgs=0, traffic=1000))
+    adapter._node_statistics_callback(NodeStatistics(
+        node='/a', window_start=rospy.Time.from_sec(98.0), window_stop=rospy.Time.from_sec(100.0),
+        samples=10, threads=2, cpu_load_mean=0.8, cpu_load_max=1.0,
+        virt_mem_mean=1000.0, virt_mem_max=1000.0))
+    adapter.statistics_update()
+    topic = adapter._topology.topics['/t']
+    assert topic.bw == 500.0
+    assert topic.hz == 5.0
+    node = adapter._topology.nodes['/a']
+    assert abs(node.cpu_load_mean - 0.8) < 1e-9
+    assert node.virt_mem_mean == 1000.0
+
+
+def test_update_applies_the_last_received_graph():
+    adapter = adapter_at(100.0)
+    adapter.set_removal_grace()
+    both = graph(('/a', ['/t'], []), ('/b', [], ['/t']))
+    adapter._topology_callback(both)
+    adapter.disable_auto_update()
+    adapter._topology_callback(graph(('/a', ['/t'], [])))
+    # Repeats the applied graph, so nothing needs to be reconciled now
+    adapter._topology_callback(graph(('/a', ['/t'], []), ('/b', [], ['/t'])))
+    assert adapter.skipped_topology_messages == 1
+    adapter.topology_update()
+    assert sorted(adapter._topology.nodes) == ['/a', '/b']
+
+
+def test_grace_expiry_while_a_graph_is_applied():
+    adapter = adapter_at(100.0)
+    adapter.set_removal_grace(seconds=1.0)
+    graphs = [graph(('/a', ['/t'], [])), graph(('/a', ['/t'], []), ('/b', [], ['/t']))]
+    adapter._topology_callback(graphs[1])
+    errors = list()
+
+    def receive():
+        try:
+            for i in range(500):
+                adapter._topology_callback(graphs[i % 2])
+        except Exception as e:
+            errors.append(e)
+    receiver = threading.Thread(target=receive)
+    receiver.start()
+    try:
+        # Every update finds the grace of the missing /b expired
+        for i in range(500):
+            set_ros_time(rospy.Time.from_sec(102.0 + i * 2.0))
+            adapter.statistics_update()
+    finally:
+        receiver.join()
+    assert errors == []
+    nodes = adapter._topology.nodes
+    assert len(adapter._topology.vertices) == len(nodes)
+    assert set(nodes) == set(adapter._reconciler.applied.nodes)
@@ -0,0 +1,69 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'rqt_graphprofiler'))
+from statistics_buffer import RingBuffer, StatisticsBuffer
+
+
+def values(records):
+    return [int(value) for value in records['value']]
+
+
+def test_drain_in_order_across_wraparound():
+    ring = RingBuffer(('value',), capacity=4)
+    for i in range(3):
+        ring.append((i,))
+    assert values(ring.drain()) == [0, 1, 2]
+    for i in range(3, 6):
+        ring.append((i,))
+    assert len(ring) == 3
+    assert values(ring.drain()) == [3, 4, 5]
+    assert values(ring.drain()) == []
+    assert ring.dropped == 0
+
+
+def test_lapped_reader_keeps_newest_records():
+    ring = RingBuffer(('value',), capacity=4)
+    for i in range(10):
+        ring.append((i,))
+    assert values(ring.drain()) == [6, 7, 8, 9]
+    assert ring.dropped == 6
+
+
+def test_record_being_written_is_left_for_next_drain():
+    ring = RingBuffer(('value',), capacity=4)
+    ring.append((0,))
+    # A writer has taken ticket 1 and marked its slot, but not finished
+    ticket = next(ring._tickets)
+    ring._sequence[ticket] = -(ticket + 1)
+    assert values(ring.drain()) == [0]
+    ring._data[ticket] = (1,)
+    ring._sequence[ticket] = ticket + 1
+    assert values(ring.drain()) == [1]
+
+
+def test_slot_overwritten_by_lapping_writer_is_not_delivered_as_old_ticket():
+    ring = RingBuffer(('value',), capacity=4)
+    for i in range(4):
+        ring.append((i,))
+    # Ticket 4 reuses the slot of ticket 0, and its data is written while
+    # the slot is marked as in progress
+    ticket = next(ring._tickets)
+    ring._sequence[0] = -(ticket + 1)
+    ring._data[0] = (4,)
+    assert values(ring.drain()) == [1, 2, 3]
+    assert ring.dropped == 1
+    ring._sequence[0] = ticket + 1
+    assert values(ring.drain()) == [4]
+    assert ring.dropped == 1
+
+
+def test_statistics_buffer_leaves_out_entities_without_samples():
+    buf = StatisticsBuffer(('value',), capacity=4)
+    buf.append('/a', (1,))
+    buf.append('/b', (2,))
+    assert sorted(buf.drain()) == ['/a', '/b']
+    buf.append('/a', (3,))
+    drained = buf.drain()
+    assert list(drained) == ['/a']
+    assert values(drained['/a']) == [3]
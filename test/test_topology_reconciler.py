@@ -0,0 +1,126 @@
+import os
+import sys
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(this_dir, '..', 'src', 'diarc'))
+sys.path.insert(0, os.path.join(this_dir, '..', 'src', 'rqt_graphprofiler'))
+import ros_topology as rsg
+from topology_reconciler import TopologyReconciler, TopologySnapshot, RemovalGrace
+
+
+def snapshot(nodes, topics, publishers=(), subscribers=()):
+    result = TopologySnapshot()
+    result.nodes = dict(nodes)
+    result.topics = dict((name, 'std_msgs/String') for name in topics)
+    result.publishers = set(publishers)
+    result.subscribers = set(subscribers)
+    return result
+
+
+def test_reconcile_adds_removes_and_moves():
+    graph = rsg.RosSystemGraph()
+    reconciler = TopologyReconciler(graph)
+    changes = reconciler.reconcile(snapshot({'/a': 'http://h1:1/', '/b': 'http://h1:2/'}, ['/t'],
+                                            [('/a', '/t')], [('/b', '/t')]))
+    assert changes.added_nodes == set(['/a', '/b'])
+    assert changes.added_topics == set(['/t'])
+    assert changes.added_publishers == set([('/a', '/t')])
+    assert sorted(graph.nodes) == ['/a', '/b']
+    assert [sub.node.name for sub in graph.topics['/t'].subscribers] == ['/b']
+
+    changes = reconciler.reconcile(snapshot({'/a': 'http://h2:1/', '/c': 'http://h1:3/'}, ['/t'],
+                                            [('/a', '/t')], [('/c', '/t')]))
+    assert changes.added_nodes == set(['/c'])
+    assert changes.removed_nodes == set(['/b'])
+    assert changes.moved_nodes == set(['/a'])
+    assert changes.removed_subscribers == set([('/b', '/t')])
+    assert changes.added_subscribers == set([('/c', '/t')])
+    assert sorted(graph.nodes) == ['/a', '/c']
+    assert graph.nodes['/a'].location == 'http://h2:1/'
+    assert graph.nodes['/a'].host.name == 'h2'
+    assert [sub.node.name for sub in graph.topics['/t'].subscribers] == ['/c']
+
+
+def test_reconcile_same_snapshot_changes_nothing():
+    graph = rsg.RosSystemGraph()
+    reconciler = TopologyReconciler(graph)
+    desired = snapshot({'/a': 'http://h1:1/'}, ['/t'], [('/a', '/t')])
+    reconciler.reconcile(desired)
+    assert reconciler.reconcile(snapshot({'/a': 'http://h1:1/'}, ['/t'], [('/a', '/t')])).empty()
+
+
+def test_reconcile_removes_topic_with_its_connections():
+    graph = rsg.RosSystemGraph()
+    reconciler = TopologyReconciler(graph)
+    reconciler.reconcile(snapshot({'/a': 'http://h1:1/'}, ['/t', '/u'], [('/a', '/t'), ('/a', '/u')]))
+    changes = reconciler.reconcile(snapshot({'/a': 'http://h1:1/'}, ['/u'], [('/a', '/u')]))
+    assert changes.removed_topics == set(['/t'])
+    assert sorted(graph.topics) == ['/u']
+    assert [pub.topic.name for pub in graph.nodes['/a'].publishers] == ['/u']
+
+
+def test_grace_keeps_missing_entities_until_time_expires():
+    grace = RemovalGrace(seconds=5.0)
+    applied = snapshot({'/a': 'http://h1:1/', '/b': 'http://h1:2/'}, ['/t'], [('/a', '/t')], [('/b', '/t')])
+    reported = snapshot({'/a': 'http://h1:1/'}, ['/t'], [('/a', '/t')])
+    desired, stale_nodes, stale_topics = grace.retain(reported, applied, 100.0, 1)
+    assert stale_nodes == set(['/b'])
+    assert stale_topics == set()
+    assert '/b' in desired.nodes
+    assert ('/b', '/t') in desired.subscribers
+    assert grace.pending()
+
+    desired, stale_nodes, stale_topics = grace.retain(reported, desired, 104.0, 2)
+    assert stale_nodes == set(['/b'])
+    desired, stale_nodes, stale_topics = grace.retain(reported, desired, 105.0, 3)
+    assert stale_nodes == set()
+    assert '/b' not in desired.nodes
+    assert not grace.pending()
+
+
+def test_grace_expires_after_messages():
+    grace = RemovalGrace(messages=2)
+    applied = snapshot({'/a': 'http://h1:1/'}, [])
+    reported = snapshot({}, [])
+    assert grace.retain(reported, applied, 0.0, 1)[1] == set(['/a'])
+    assert grace.retain(reported, applied, 0.0, 2)[1] == set(['/a'])
+    assert grace.retain(reported, applied, 0.0, 3)[1] == set()
+
+
+def test_grace_forgets_entities_that_return():
+    grace = RemovalGrace(seconds=5.0)
+    applied = snapshot({'/a': 'http://h1:1/'}, [])
+    grace.retain(snapshot({}, []), applied, 0.0, 1)
+    assert grace.pending()
+    desired, stale_nodes, stale_topics = grace.retain(applied, applied, 1.0, 2)
+    assert stale_nodes == set()
+    assert not grace.pending()
+    # Missing again, the grace period starts over
+    assert grace.retain(snapshot({}, []), applied, 10.0, 3)[1] == set(['/a'])
+
+
+def test_grace_removes_ignored_entities_at_once():
+    grace = RemovalGrace(seconds=5.0)
+    applied = snapshot({'/a': 'http://h1:1/'}, ['/t'])
+    desired, stale_nodes, stale_topics = grace.retain(snapshot({}, []), applied, 0.0, 1,
+                                                      ignore_node=lambda name: name == '/a',
+                                                      ignore_topic=lambda name: False)
+    assert stale_nodes == set()
+    assert stale_topics == set(['/t'])
+
+
+def test_grace_without_limits_removes_at_once():
+    grace = RemovalGrace()
+    applied = snapshot({'/a': 'http://h1:1/'}, [])
+    desired, stale_nodes, stale_topics = grace.retain(snapshot({}, []), applied, 0.0, 1)
+    assert stale_nodes == set()
+    assert desired.nodes == {}
+
+
+def test_grace_expires_by_time_without_new_messages():
+    grace = RemovalGrace(seconds=5.0, messages=10)
+    applied = snapshot({'/a': 'http://h1:1/'}, [])
+    grace.retain(snapshot({}, []), applied, 100.0, 1)
+    assert not grace.expired(104.0)
+    assert grace.expired(105.0)
+    assert not RemovalGrace(messages=1).expired(1000.0)